@@ -0,0 +1,203 @@
+#
+# aircraftbatch.py
+#
+# Columnar (NumPy) position data of all aircraft of one refresh.
+#
+# Locating aircraft one at a time means a dozen scalar trig calls per aircraft,
+# plus the receiver's own sin/cos over and over again.  AircraftBatch copies
+# lat/lon/alt/speed/track into arrays once and computes the haversine distance,
+# bearing and elevation of the whole refresh in a single vectorized pass.
+#
+
+from functools import cached_property, lru_cache
+from operator import attrgetter
+
+import numpy as np
+
+import geomath
+
+# Below this many aircraft the NumPy call overhead costs more than it saves.
+MIN_BATCH_SIZE = 16
+
+EARTH_RADIUS_MI = 3956  # same radius as geomath.distance()
+FT_PER_MILE = 5280
+
+
+@lru_cache(maxsize=8)
+def receiver_trig(latitude, longitude):
+    """
+    Returns (lat, lon, sin(lat), cos(lat)) of the receiver in radians, only
+    computed once per receiver position.
+    """
+    lat = np.radians(latitude)
+    return lat, np.radians(longitude), np.sin(lat), np.cos(lat)
+
+
+def _column(aircraft, name):
+    """
+    Returns attribute name of every aircraft as a float array, NaN for None.
+    """
+    return np.array(list(map(attrgetter(name), aircraft)), dtype=float)
+
+
+class AircraftBatch:
+    """
+    The aircraft of one refresh as arrays.
+
+    aircraft is the list of AircraftData the columns were taken from, they stay
+    the per-aircraft view for tracker.py and the post templates.  locate()
+    computes distance (miles), az and el (degrees) for all of them and writes
+    the results back into those objects.  Aircraft without a position get the
+    same dist=-1, az=0, el=0 as the scalar code path, aircraft rejected by the
+    alarm zone pre-filter get None.
+    """
+
+    def __init__(self, aircraft):
+        self.aircraft = aircraft
+        self.lat = _column(aircraft, "lat")
+        self.lon = _column(aircraft, "lon")
+        self.alt = _column(aircraft, "altitude")
+        self.distance = None
+        self.az = None
+        self.el = None
+        self.slant = None
+
+    # Not needed to locate the aircraft, so only copied when asked for.
+    @cached_property
+    def speed(self):
+        return _column(self.aircraft, "speed")
+
+    @cached_property
+    def track(self):
+        return _column(self.aircraft, "track")
+
+    @cached_property
+    def vert_rate(self):
+        return _column(self.aircraft, "vert_rate")
+
+    @cached_property
+    def seen_pos(self):
+        return _column(self.aircraft, "seen_pos")
+
+    def __len__(self):
+        return len(self.aircraft)
+
+    def __getitem__(self, i):
+        return self.aircraft[i]
+
+    def _sphere(self, lat1, lon1, sin_lat1, cos_lat1, located):
+        """
+        Returns the haversine distance and initial bearing of the located
+        aircraft.
+        """
+        lat2 = np.radians(self.lat[located])
+        dlon = np.radians(self.lon[located]) - lon1
+        sin_lat2 = np.sin(lat2)
+        cos_lat2 = np.cos(lat2)
+
+        # haversine, see geomath.distance()
+        a = np.sin((lat2 - lat1) / 2) ** 2 + cos_lat1 * cos_lat2 * np.sin(dlon / 2) ** 2
+        dist = 2 * np.arcsin(np.sqrt(a)) * EARTH_RADIUS_MI
+
+        # initial bearing, see geomath.bearing()
+        x = np.sin(dlon) * cos_lat2
+        y = cos_lat1 * sin_lat2 - sin_lat1 * cos_lat2 * np.cos(dlon)
+        az = (np.degrees(np.arctan2(x, y)) + 360) % 360
+        return dist, az
+
+    def _plane(self, frame, located):
+        """
+        Returns the distance and azimuth of the located aircraft in the flat
+        frame, see geomath.LocalFrame.locate().
+        """
+        dlat = self.lat[located] - frame.lat
+        dlon = self.lon[located] - frame.lon
+        east = dlon * (frame.kx - frame.kx_slope * dlat)
+        north = dlat * frame.ky
+        dist = np.hypot(east, north)
+        az = (np.degrees(np.arctan2(east, north)) - dlon * frame.convergence) % 360
+        return dist, az
+
+    def _ecef(self, frame, located):
+        """
+        Returns the distance, azimuth, elevation and slant range of the
+        located aircraft, see geomath.EcefFrame.locate(): the unit vectors of
+        all of them are turned into the frame of the receiver with one matrix
+        multiply.
+        """
+        lat = np.radians(self.lat[located])
+        lon = np.radians(self.lon[located])
+        cos_lat = np.cos(lat)
+        unit = np.stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+        east, north, up = np.asarray(frame.rotation) @ unit
+
+        horizontal = np.hypot(east, north)
+        dist = np.arctan2(horizontal, up) * EARTH_RADIUS_MI
+        az = np.degrees(np.arctan2(east, north)) % 360
+
+        r = EARTH_RADIUS_MI + np.nan_to_num(self.alt[located]) / FT_PER_MILE
+        horizontal *= r
+        up = up * r - frame.radius
+        return (
+            dist,
+            az,
+            np.degrees(np.arctan2(up, horizontal)),
+            np.hypot(horizontal, up),
+        )
+
+    def locate(self, rec_latitude, rec_longitude, zone=None, frame=None):
+        """
+        Computes distance, azimuth, elevation and slant range from the
+        receiver for every aircraft in the batch, or with an
+        alarmzone.AlarmZone only for those that might be inside it.  With a
+        geomath.LocalFrame the distance and azimuth are those of the flat
+        frame, with a geomath.EcefFrame the elevation and slant range are the
+        true ones.  Returns self.
+        """
+        has_pos = ~(np.isnan(self.lat) | np.isnan(self.lon))
+        located = has_pos
+        if zone is not None:
+            located = has_pos & zone.might_contain_many(
+                self.lat, self.lon, np.nan_to_num(self.alt)
+            )
+
+        if isinstance(frame, geomath.EcefFrame):
+            dist, az, el, slant = self._ecef(frame, located)
+        else:
+            if frame is not None:
+                dist, az = self._plane(frame, located)
+            else:
+                dist, az = self._sphere(
+                    *receiver_trig(rec_latitude, rec_longitude), located
+                )
+            alt = np.nan_to_num(self.alt[located]) / FT_PER_MILE
+            ratio = np.divide(alt, dist, out=np.zeros_like(dist), where=dist > 0)
+            el = np.degrees(np.arctan(ratio))
+            slant = np.hypot(dist, alt)
+
+        self.distance = np.full(len(self), -1.0)
+        self.az = np.zeros(len(self))
+        self.el = np.zeros(len(self))
+        self.slant = np.full(len(self), np.nan)
+        self.distance[located] = dist
+        self.az[located] = az
+        self.el[located] = el
+        self.slant[located] = slant
+        self.distance[has_pos & ~located] = np.nan
+
+        for a, d, z, e, r in zip(
+            self.aircraft,
+            self.distance.tolist(),
+            self.az.tolist(),
+            self.el.tolist(),
+            self.slant.tolist(),
+        ):
+            if d != d:  # NaN: outside the alarm zone, not located
+                a.distance = a.az = a.el = a.slant = None
+            else:
+                a.distance = d
+                a.az = z
+                a.el = e
+                if r == r:
+                    a.slant = r
+        return self
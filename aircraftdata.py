@@ -1,7 +1,143 @@
 # Using the hexdb.io calls to get data from ICAO hex
 # Reference: https://hexdb.io/
 
+import concurrent.futures
+
 import requests
+from requests.adapters import HTTPAdapter
+
+import circuitbreaker
+
+# Seconds to wait for hexdb.io to connect, and to answer, per request.
+TIMEOUT = (3.05, 10)
+
+# Requests to hexdb.io at the same time.
+WORKERS = 8
+
+# The requests share their keep-alive connections.
+session = requests.Session()
+session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=WORKERS))
+
+# Asked to find out whether hexdb.io is back, "n/a" will do.
+PROBE_URL = "https://hexdb.io/hex-reg?hex=484a6e"
+
+
+def _probe():
+    return session.get(PROBE_URL, timeout=TIMEOUT).status_code in (200, 404)
+
+
+# Fails the requests fast after failures in a row, until _probe() finds
+# hexdb.io back.
+breaker = circuitbreaker.CircuitBreaker("hexdb.io", _probe)
+
+# Only runs single requests, which never wait for the pool themselves.
+_pool = concurrent.futures.ThreadPoolExecutor(WORKERS, thread_name_prefix="hexdb")
+
+# The answer while hexdb.io is down, which isn't cached.
+PLACEHOLDER = "n/a"
+
+# lookupcache.LookupCache for the answers, set by tracker.py.  None: every
+# lookup asks hexdb.io.
+cache = None
+
+# aircraftdb.AircraftDB asked before hexdb.io for regis, plane and oper, set by
+# tracker.py.  None: hexdb.io answers them all.
+db = None
+
+# Requests to hexdb.io per lookup, what a cached answer saves.
+REQUESTS = {"regis": 1, "plane": 1, "oper": 1, "route": 6}
+
+
+def _lookup(kind, key, fetch):
+    """
+    Returns the answer of fetch(key), from the cache when it has it, or
+    PLACEHOLDER when hexdb.io is down.
+    """
+    if cache is not None:
+        value = cache.get(kind, key)
+        if value is not None:
+            return value
+    try:
+        value = fetch(key)
+    except (requests.RequestException, circuitbreaker.CircuitOpen):
+        return PLACEHOLDER
+    if cache is not None:
+        # "n/a" may be known later, it is asked again sooner.
+        cache.put(kind, key, value, unknown=value == "n/a")
+    return value
+
+
+def _offline(kind, hex):
+    """
+    Returns the answer of the aircraft database, or None.
+    """
+    if db is None:
+        return None
+    return db.get(kind, hex)
+
+
+def _get(url):
+    """
+    Returns the response of hexdb.io to url.  Raises CircuitOpen while
+    hexdb.io is down, a RequestException when the request fails.
+    """
+    breaker.check()
+    try:
+        response = session.get(url, timeout=TIMEOUT)
+        # hexdb.io answers "n/a" with a 404.  Anything else, like a 429 when
+        # asked too often, is no answer: it isn't cached and counts as failed.
+        if response.status_code != 200 and not (
+            response.status_code == 404 and response.text == "n/a"
+        ):
+            raise requests.HTTPError(response.status_code, response=response)
+    except requests.RequestException:
+        breaker.failure()
+        raise
+    breaker.success()
+    return response
+
+
+def _get_all(*urls):
+    """
+    Returns the responses of urls, requested at the same time.
+    """
+    return list(_pool.map(_get, urls))
+
+
+def lookup_all(hex, flight):
+    """
+    Returns {"regis", "plane", "oper", "route"} of an aircraft, all looked
+    up at the same time: two round trips to hexdb.io instead of nine.
+    """
+    if db is not None:
+        db.refresh()
+    found = {
+        "regis": _pool.submit(regis, hex),
+        "plane": _pool.submit(plane, hex),
+        "oper": _pool.submit(oper, hex),
+    }
+    # route() waits for requests of its own, so it can't run in the pool.
+    route_found = route(flight)
+    found = {name: future.result() for name, future in found.items()}
+    found["route"] = route_found
+    return found
+
+
+def cache_summary():
+    """
+    Returns a line about the lookups answered by the cache.
+    """
+    if cache is None:
+        return "hexdb.io lookups are not cached"
+    hits = sum(cache.hits.values())
+    disk_hits = sum(cache.disk_hits.values())
+    lookups = hits + disk_hits + sum(cache.misses.values())
+    saved = sum(
+        (cache.hits[kind] + cache.disk_hits[kind]) * n for kind, n in REQUESTS.items()
+    )
+    return "hexdb.io cache: {} of {} lookups cached ({} from disk), {} requests saved".format(
+        hits + disk_hits, lookups, disk_hits, saved
+    )
 
 
 def regis(hex):
@@ -10,7 +146,11 @@ def regis(hex):
     """
     if hex is None:
         return None
-    regis = requests.get(f"https://hexdb.io/hex-reg?hex={hex}")
+    return _offline("regis", hex) or _lookup("regis", hex, _regis)
+
+
+def _regis(hex):
+    regis = _get(f"https://hexdb.io/hex-reg?hex={hex}")
     if regis.text == "n/a":
         return "n/a"
     return regis.text
@@ -22,7 +162,11 @@ def plane(hex):
     """
     if hex is None:
         return None
-    plane = requests.get(f"https://hexdb.io/hex-type?hex={hex}")
+    return _offline("plane", hex) or _lookup("plane", hex, _plane)
+
+
+def _plane(hex):
+    plane = _get(f"https://hexdb.io/hex-type?hex={hex}")
     if plane.text == "n/a":
         return "n/a"
     return plane.text
@@ -34,7 +178,11 @@ def oper(hex):
     """
     if hex is None:
         return None
-    oper = requests.get(f"https://hexdb.io/hex-airline?hex={hex}")
+    return _offline("oper", hex) or _lookup("oper", hex, _oper)
+
+
+def _oper(hex):
+    oper = _get(f"https://hexdb.io/hex-airline?hex={hex}")
     if oper.text == "n/a":
         return "n/a"
     return oper.text
@@ -46,16 +194,20 @@ def route(flight):
     """
     if flight is None:
         return None
+    return _lookup("route", flight, _route)
+
+
+def _route(flight):
     # ICAOroute = requests.get(f"https://hexdb.io/callsign-route?callsign={flight}")
-    origin = requests.get(f"https://hexdb.io/callsign-origin_icao?callsign={flight}")
-    destination = requests.get(f"https://hexdb.io/callsign-des_icao?callsign={flight}")
-    origin_IATA = requests.get(f"https://hexdb.io/icao-iata?icao={origin.text}")
-    destination_IATA = requests.get(
-        f"https://hexdb.io/icao-iata?icao={destination.text}"
+    origin, destination = _get_all(
+        f"https://hexdb.io/callsign-origin_icao?callsign={flight}",
+        f"https://hexdb.io/callsign-des_icao?callsign={flight}",
     )
-    origin_name = requests.get(f"https://hexdb.io/icao-airport?icao={origin.text}")
-    destination_name = requests.get(
-        f"https://hexdb.io/icao-airport?icao={destination.text}"
+    origin_IATA, destination_IATA, origin_name, destination_name = _get_all(
+        f"https://hexdb.io/icao-iata?icao={origin.text}",
+        f"https://hexdb.io/icao-iata?icao={destination.text}",
+        f"https://hexdb.io/icao-airport?icao={origin.text}",
+        f"https://hexdb.io/icao-airport?icao={destination.text}",
     )
 
     route = (
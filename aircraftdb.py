@@ -0,0 +1,249 @@
+#
+# aircraftdb.py
+#
+# Offline database of registration, type and operator by ICAO hex.
+#
+# import_file() builds the database from a bulk aircraft dataset: the
+# aircraft.csv(.gz) of tar1090-db or the BaseStation.sqb of Virtual Radar
+# Server / BaseStation.  The file is sorted by hex:
+#
+#   header   magic, version and number of aircraft
+#   keys     the hex of every aircraft as a uint32, ascending
+#   offsets  uint32 offset of the record of every aircraft in the data
+#   data     per aircraft "registration\x1ftype\x1foperator\n", UTF-8
+#
+# AircraftDB maps the file into memory and finds an aircraft by a binary
+# search of the keys, so opening it takes no time and the pages that are never
+# read take no memory.  The importer writes a new file next to the old one
+# and renames it over it; refresh() picks up the new file, lookups that are
+# still reading the old one finish on its mapping.
+#
+#   python -m aircraftdb aircraft.csv.gz /var/lib/abovegrq/aircraft.db
+#
+
+import bisect
+import csv
+import gzip
+import io
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+import threading
+from array import array
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"AGDB"
+VERSION = 1
+HEADER = struct.Struct("<4sII")  # magic, version, number of aircraft
+
+SEPARATOR = "\x1f"
+
+# Index of the fields in the records.
+FIELDS = {"regis": 0, "plane": 1, "oper": 2}
+
+
+def icao_key(hex):
+    """
+    Returns the ICAO address of hex as an int, or None for a hex that isn't
+    an ICAO address, like the "~" addresses of TIS-B.
+    """
+    try:
+        key = int(hex, 16)
+    except (TypeError, ValueError):
+        return None
+    return key if 0 <= key < 1 << 24 else None
+
+
+def read_tar1090_csv(path):
+    """
+    Yields (hex, registration, type, operator) of the aircraft.csv(.gz) of
+    tar1090-db: icao;registration;type code;flags;description;year;owner.
+    The description is the type, the type code when it has none.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", newline="") as f:
+        for row in csv.reader(f, delimiter=";"):
+            if not row:
+                continue
+            row += [""] * (7 - len(row))
+            yield row[0], row[1], row[4] or row[2], row[6]
+
+
+def read_basestation(path):
+    """
+    Yields (hex, registration, type, operator) of the Aircraft table of a
+    BaseStation.sqb.
+    """
+    db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        rows = db.execute(
+            "SELECT ModeS, Registration, Manufacturer, Type, RegisteredOwners"
+            " FROM Aircraft"
+        )
+        for hex, regis, manufacturer, plane, owners in rows:
+            plane = plane or ""
+            if manufacturer and not plane.startswith(manufacturer):
+                plane = f"{manufacturer} {plane}".strip()
+            yield hex, regis or "", plane, owners or ""
+    finally:
+        db.close()
+
+
+def read_dataset(path):
+    """
+    Yields (hex, registration, type, operator) of a dataset, by its extension.
+    """
+    if path.endswith((".sqb", ".sqlite", ".db")):
+        return read_basestation(path)
+    return read_tar1090_csv(path)
+
+
+def _clean(text):
+    return " ".join(text.replace(SEPARATOR, " ").split())
+
+
+def write(path, aircraft):
+    """
+    Writes the database of aircraft, (hex, registration, type, operator)
+    tuples, to path.  The file is written next to it and renamed, so a
+    reader never sees half of it.  Returns the number of aircraft.
+    """
+    records = {}
+    for hex, *fields in aircraft:
+        key = icao_key(hex)
+        if key is None or not any(fields):
+            continue
+        records[key] = SEPARATOR.join(_clean(f or "") for f in fields)
+
+    keys = array("I", sorted(records))
+    offsets = array("I")
+    data = io.BytesIO()
+    for key in keys:
+        offsets.append(data.tell())
+        data.write(records[key].encode() + b"\n")
+    if sys.byteorder == "big":
+        keys.byteswap()
+        offsets.byteswap()
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(keys)))
+        f.write(keys.tobytes())
+        f.write(offsets.tobytes())
+        f.write(data.getbuffer())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return len(keys)
+
+
+def import_file(source, path):
+    """
+    Builds the database at path from the dataset source.  Returns the number
+    of aircraft.
+    """
+    return write(path, read_dataset(source))
+
+
+class _Table:
+    """
+    One mapped database file.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.stat = os.fstat(f.fileno())
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count = HEADER.unpack_from(
+            self.map.read(HEADER.size).ljust(HEADER.size)
+        )
+        if magic != MAGIC or version != VERSION:
+            self.map.close()
+            raise ValueError(f"{path} is not an aircraft database")
+        start = HEADER.size
+        middle = start + 4 * self.count
+        self.data = middle + 4 * self.count
+        if sys.byteorder == "little":
+            view = memoryview(self.map)
+            self.keys = view[start:middle].cast("I")
+            self.offsets = view[middle : self.data].cast("I")
+        else:
+            self.keys = array("I", self.map[start:middle])
+            self.offsets = array("I", self.map[middle : self.data])
+            self.keys.byteswap()
+            self.offsets.byteswap()
+
+    def find(self, key):
+        i = bisect.bisect_left(self.keys, key)
+        if i == self.count or self.keys[i] != key:
+            return None
+        start = self.data + self.offsets[i]
+        end = self.map.find(b"\n", start)
+        return self.map[start:end].decode().split(SEPARATOR)
+
+
+class AircraftDB:
+    """
+    The database at path, mapped into memory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._table = _Table(path)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._table.count
+
+    def lookup(self, hex):
+        """
+        Returns [registration, type, operator] of hex, "" where unknown, or
+        None for an aircraft that isn't in the database.
+        """
+        key = icao_key(hex)
+        if key is None:
+            return None
+        return self._table.find(key)
+
+    def get(self, kind, hex):
+        """
+        Returns the answer of lookup kind ("regis", "plane" or "oper") for hex,
+        or None when the database doesn't know it.
+        """
+        found = self.lookup(hex)
+        if found is None:
+            return None
+        return found[FIELDS[kind]] or None
+
+    def refresh(self):
+        """
+        Maps the file at path again when it was replaced.  Returns True when
+        it was.
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        with self._lock:
+            old = self._table.stat
+            if (stat.st_ino, stat.st_mtime_ns) == (old.st_ino, old.st_mtime_ns):
+                return False
+            try:
+                # The old mapping is closed when its last lookup is done.
+                self._table = _Table(self.path)
+            except (OSError, ValueError) as e:
+                logger.warning("Keeping the aircraft database: %s", e)
+                return False
+        logger.info("Aircraft database has %d aircraft", len(self))
+        return True
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m aircraftdb aircraft.csv[.gz]|BaseStation.sqb db")
+    print("{} aircraft".format(import_file(sys.argv[1], sys.argv[2])))
@@ -0,0 +1,473 @@
+#
+# alarmzone.py
+#
+# The alarm zones, compiled into cheap tests.
+#
+# An aircraft is in the alarm zone when it is closer than distance_alarm, or
+# seen higher than elevation_alarm above the horizon.  Deciding that exactly
+# needs the haversine distance and an atan() per aircraft, while nearly all of
+# them are far away.  AlarmZone rejects those with a lat/lon box and squared
+# distances in a flat local plane around the receiver, and replaces the
+# elevation angle by comparing altitude to distance * tan(elevation_alarm).
+# With the ecef geometry the elevation is the true one, lower than that of the
+# flat test by the curvature of the earth: contains() then decides on a.el,
+# and the flat pre-filter, which lets more aircraft through, stays safe.
+#
+# Other zones, like the approach and departure corridors of a runway, are
+# configured in [zone:<name>] sections as a polygon or as a corridor along a
+# path, between two altitudes.  Their outline is projected once into the same
+# flat plane, so testing an aircraft is a point-in-polygon or distance-to-path
+# test without any trig.  ZoneSet files the zones by the grid cells their box
+# covers: an aircraft is only tested against the zones around it, whatever the
+# number of zones.
+#
+
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    # Only needed for might_contain_many(), which gets NumPy arrays anyway.
+    np = None
+
+EARTH_RADIUS_MI = 3956  # same radius as geomath.distance()
+FT_PER_MILE = 5280
+MI_PER_DEG_LAT = EARTH_RADIUS_MI * math.pi / 180
+
+# The flat plane is only exact at the receiver: it uses the longitude scale of
+# the receiver for all aircraft, see flat_error().  might_contain() widens the
+# zone by that error and by this margin on top, so it never rejects an aircraft
+# that is actually inside the zone.
+MARGIN = 1.05
+
+# Highest altitude (ft) considered for the lat/lon bounding box.
+MAX_ALTITUDE = 60000
+
+# Key of a ZoneSet cell: row * CELL_KEY + column.
+CELL_KEY = 1_000_000
+
+# Up to this many zones, testing all aircraft against each zone is faster than
+# grouping them by cell first.
+GROUPED_ZONES = 16
+
+
+def flat_error(latitude, miles):
+    """
+    Returns how many times the flat distance of an aircraft up to miles from
+    a receiver at latitude can be too long.  North of the receiver, or south
+    of it on the southern hemisphere, the meridians are closer together: up to
+    cos(latitude) / cos(latitude + half the latitude difference).
+    """
+    far = min(abs(latitude) + miles / MI_PER_DEG_LAT / 2, 89.9)
+    return math.cos(math.radians(latitude)) / math.cos(math.radians(far))
+
+
+class AlarmZone:
+    """
+    The alarm zone around the receiver at (latitude, longitude).
+
+    might_contain() is the cheap pre-filter, it only needs lat, lon and
+    altitude: when it returns False the aircraft is certainly outside the zone.
+    contains() is the exact test on a located AircraftData; with
+    true_elevation it compares the elevation of an EcefFrame to
+    elevation_alarm instead of the altitude to the flat distance.
+    """
+
+    def __init__(
+        self,
+        latitude,
+        longitude,
+        distance_alarm,
+        elevation_alarm,
+        name="aboveme",
+        true_elevation=False,
+    ):
+        self.name = name
+        self.true_elevation = true_elevation
+        self.lat = latitude
+        self.lon = longitude
+        self.distance_alarm = distance_alarm
+        self.elevation_alarm = elevation_alarm
+
+        # Any aircraft above the ground is higher than 0 degrees: no pre-filter.
+        self.everywhere = elevation_alarm <= 0
+        if self.everywhere or elevation_alarm >= 90:
+            self.ft_per_mile_tan = math.inf
+        else:
+            # el > elevation_alarm  <=>  alt > dist * ft_per_mile_tan
+            self.ft_per_mile_tan = FT_PER_MILE * math.tan(math.radians(elevation_alarm))
+
+        # Miles per degree in the local plane.
+        self.ky = MI_PER_DEG_LAT
+        self.kx = MI_PER_DEG_LAT * math.cos(math.radians(latitude))
+
+        # The flat plane error grows with the distance, up to the farthest
+        # aircraft that can be in the zone.
+        reach = max(distance_alarm, MAX_ALTITUDE / self.ft_per_mile_tan)
+        self.margin = MARGIN * flat_error(latitude, reach)
+
+        # Squared radius of the distance circle, and how far away (in miles) an
+        # aircraft still is seen above elevation_alarm, per foot of altitude.
+        self.distance_sq = (distance_alarm * self.margin) ** 2
+        self.reach_per_ft = self.margin / self.ft_per_mile_tan
+
+        reach *= self.margin
+        self.box_lat = reach / self.ky
+        self.box_lon = reach / self.kx
+
+    def might_contain(self, lat, lon, alt):
+        """
+        Returns False if an aircraft at lat, lon (degrees) and alt (feet) is
+        certainly outside the alarm zone.
+        """
+        if self.everywhere:
+            return True
+        dlat = lat - self.lat
+        dlon = lon - self.lon
+        if abs(dlat) > self.box_lat or abs(dlon) > self.box_lon:
+            return False
+        dy = dlat * self.ky
+        dx = dlon * self.kx
+        d_sq = dx * dx + dy * dy
+        if d_sq < self.distance_sq:
+            return True
+        reach = alt * self.reach_per_ft
+        return alt > 0 and d_sq < reach * reach
+
+    def bounds(self):
+        """
+        Returns (lat_min, lat_max, lon_min, lon_max) of the pre-filter box.
+        """
+        return (
+            self.lat - self.box_lat,
+            self.lat + self.box_lat,
+            self.lon - self.box_lon,
+            self.lon + self.box_lon,
+        )
+
+    def radius(self, alt):
+        """
+        Returns the distance (miles) within which an aircraft at alt (feet) is
+        in the alarm zone.
+        """
+        if self.everywhere:
+            return math.inf
+        if alt is None or alt <= 0:
+            return self.distance_alarm
+        return max(self.distance_alarm, alt / self.ft_per_mile_tan)
+
+    def might_contain_many(self, lat, lon, alt):
+        """
+        might_contain() for NumPy arrays, returns a boolean array.
+        """
+        if self.everywhere:
+            return lat == lat
+        dy = (lat - self.lat) * self.ky
+        dx = (lon - self.lon) * self.kx
+        d_sq = dx * dx + dy * dy
+        reach = alt * self.reach_per_ft
+        return (d_sq < self.distance_sq) | ((alt > 0) & (d_sq < reach * reach))
+
+    def contains(self, a):
+        """
+        Returns True if the located aircraft a is inside the alarm zone.
+        """
+        if a.lat is None or a.lon is None or a.distance is None:
+            return False
+        if a.distance < self.distance_alarm:
+            return True
+        if self.everywhere:
+            return a.el > self.elevation_alarm
+        if self.true_elevation:
+            return a.distance > 0 and a.el > self.elevation_alarm
+        return a.distance > 0 and a.altitude > a.distance * self.ft_per_mile_tan
+
+
+class PlaneZone:
+    """
+    A zone given by its outline in the flat plane around the receiver at
+    (latitude, longitude), between min_altitude and max_altitude (feet).
+    points are (lat, lon) tuples, margin (miles) is how far the zone extends
+    beyond them.
+    """
+
+    everywhere = False
+
+    def __init__(
+        self,
+        name,
+        latitude,
+        longitude,
+        points,
+        min_altitude=0,
+        max_altitude=MAX_ALTITUDE,
+        margin=0,
+    ):
+        self.name = name
+        self.lat = latitude
+        self.lon = longitude
+        self.min_altitude = min_altitude
+        self.max_altitude = max_altitude
+        self.ky = MI_PER_DEG_LAT
+        self.kx = MI_PER_DEG_LAT * math.cos(math.radians(latitude))
+        self.x = [(lon - longitude) * self.kx for _, lon in points]
+        self.y = [(lat - latitude) * self.ky for lat, _ in points]
+
+        lats = [lat for lat, _ in points]
+        lons = [lon for _, lon in points]
+        self.lat_min = min(lats) - margin / self.ky
+        self.lat_max = max(lats) + margin / self.ky
+        self.lon_min = min(lons) - margin / self.kx
+        self.lon_max = max(lons) + margin / self.kx
+        # The circle around the receiver that holds the whole zone.
+        self.reach = max(map(math.hypot, self.x, self.y)) + margin
+
+    def bounds(self):
+        return self.lat_min, self.lat_max, self.lon_min, self.lon_max
+
+    def radius(self, alt):
+        """
+        Returns the distance (miles) from the receiver beyond which no
+        aircraft is in the zone.
+        """
+        return self.reach
+
+    def might_contain(self, lat, lon, alt):
+        """
+        Returns True if an aircraft at lat, lon (degrees) and alt (feet) is in
+        the zone, the test is exact.
+        """
+        alt = alt or 0
+        if not self.min_altitude <= alt <= self.max_altitude:
+            return False
+        if not (
+            self.lat_min <= lat <= self.lat_max and self.lon_min <= lon <= self.lon_max
+        ):
+            return False
+        return self._inside((lon - self.lon) * self.kx, (lat - self.lat) * self.ky)
+
+    def might_contain_many(self, lat, lon, alt):
+        """
+        might_contain() for NumPy arrays, returns a boolean array.
+        """
+        result = (
+            (alt >= self.min_altitude)
+            & (alt <= self.max_altitude)
+            & (lat >= self.lat_min)
+            & (lat <= self.lat_max)
+            & (lon >= self.lon_min)
+            & (lon <= self.lon_max)
+        )
+        candidates = np.flatnonzero(result)
+        if len(candidates):
+            result[candidates] = self._inside_many(
+                (lon[candidates] - self.lon) * self.kx,
+                (lat[candidates] - self.lat) * self.ky,
+            )
+        return result
+
+    def contains(self, a):
+        """
+        Returns True if aircraft a is inside the zone.
+        """
+        if a.lat is None or a.lon is None:
+            return False
+        return self.might_contain(a.lat, a.lon, a.altitude)
+
+
+class PolygonZone(PlaneZone):
+    """
+    The zone inside the polygon through points (lat, lon).
+    """
+
+    def __init__(self, name, latitude, longitude, points, **band):
+        if len(points) < 3:
+            raise ValueError(f"Zone {name}: a polygon needs at least 3 points")
+        super().__init__(name, latitude, longitude, points, **band)
+        # The edges from each point to the next, the last one closes it.
+        self.edges = list(
+            zip(self.x, self.y, self.x[1:] + self.x[:1], self.y[1:] + self.y[:1])
+        )
+        if np is not None:
+            x1, y1, x2, y2 = np.array(self.edges).T
+            # Horizontal edges are never crossed, their slope isn't used.
+            slope = np.divide(x2 - x1, y2 - y1, out=np.zeros_like(x1), where=y2 != y1)
+            self._edges_many = (x1, y1, y2, slope)
+
+    def _inside(self, x, y):
+        # Even-odd rule: count the edges crossed by a ray to the east.
+        inside = False
+        for x1, y1, x2, y2 in self.edges:
+            if (y1 <= y) != (y2 <= y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+                inside = not inside
+        return inside
+
+    def _inside_many(self, x, y):
+        x1, y1, y2, slope = self._edges_many
+        y = y[:, None]
+        crossed = ((y1 <= y) != (y2 <= y)) & (x[:, None] < x1 + (y - y1) * slope)
+        return np.count_nonzero(crossed, axis=1) % 2 == 1
+
+
+class CorridorZone(PlaneZone):
+    """
+    The zone within width / 2 miles of the path through points (lat, lon),
+    like the extended centerline of a runway.
+    """
+
+    def __init__(self, name, latitude, longitude, points, width, **band):
+        if len(points) < 2:
+            raise ValueError(f"Zone {name}: a corridor needs at least 2 points")
+        half = width / 2
+        super().__init__(name, latitude, longitude, points, margin=half, **band)
+        self.half_sq = half * half
+        # Each segment as its start, direction and squared length.
+        self.segments = []
+        for x1, y1, x2, y2 in zip(self.x, self.y, self.x[1:], self.y[1:]):
+            dx = x2 - x1
+            dy = y2 - y1
+            self.segments.append((x1, y1, dx, dy, dx * dx + dy * dy or 1e-12))
+        if np is not None:
+            self._segments_many = np.array(self.segments).T
+
+    def _inside(self, x, y):
+        for x1, y1, dx, dy, length_sq in self.segments:
+            t = min(max(((x - x1) * dx + (y - y1) * dy) / length_sq, 0), 1)
+            ex = x - x1 - t * dx
+            ey = y - y1 - t * dy
+            if ex * ex + ey * ey <= self.half_sq:
+                return True
+        return False
+
+    def _inside_many(self, x, y):
+        x1, y1, dx, dy, length_sq = self._segments_many
+        x = x[:, None] - x1
+        y = y[:, None] - y1
+        t = np.clip((x * dx + y * dy) / length_sq, 0, 1)
+        ex = x - t * dx
+        ey = y - t * dy
+        return (ex * ex + ey * ey <= self.half_sq).any(axis=1)
+
+
+class ZoneSet:
+    """
+    Several zones tested as one: an aircraft is in the set when it is in any
+    of them.  Takes the place of a single zone for the parsers, the scheduler
+    and the predictions, which use the flat plane of the first zone.
+    """
+
+    def __init__(self, zones, cell_degrees=0.1):
+        self.zones = list(zones)
+        first = self.zones[0]
+        self.lat = first.lat
+        self.lon = first.lon
+        self.kx = first.kx
+        self.ky = first.ky
+        self.cell_degrees = cell_degrees
+        self.everywhere = any(z.everywhere for z in self.zones)
+        # Zones without a box are tried for every aircraft.
+        self._always = [z for z in self.zones if z.everywhere]
+        self._cells = {}  # {row * CELL_KEY + column: [zones]}
+        for z in self.zones:
+            if z.everywhere:
+                continue
+            lat_min, lat_max, lon_min, lon_max = z.bounds()
+            for row in range(self._cell(lat_min), self._cell(lat_max) + 1):
+                for column in range(self._cell(lon_min), self._cell(lon_max) + 1):
+                    self._cells.setdefault(row * CELL_KEY + column, []).append(z)
+        if np is not None:
+            self._cell_keys = np.array(list(self._cells), dtype=np.int64)
+
+    def __iter__(self):
+        return iter(self.zones)
+
+    def __len__(self):
+        return len(self.zones)
+
+    def _cell(self, degrees):
+        return math.floor(degrees / self.cell_degrees)
+
+    def candidates(self, lat, lon):
+        """
+        Returns the zones that may hold a position at lat, lon.
+        """
+        zones = self._cells.get(self._cell(lat) * CELL_KEY + self._cell(lon), [])
+        return self._always + zones if self._always else zones
+
+    def might_contain(self, lat, lon, alt):
+        return any(z.might_contain(lat, lon, alt) for z in self.candidates(lat, lon))
+
+    def might_contain_many(self, lat, lon, alt):
+        """
+        might_contain() for NumPy arrays.  With more than a few zones the
+        aircraft are grouped by cell, and each group is only tested against the
+        zones of its cell.
+        """
+        if len(self.zones) <= GROUPED_ZONES:
+            result = np.zeros(len(lat), dtype=bool)
+            for z in self.zones:
+                result |= z.might_contain_many(lat, lon, alt)
+            return result
+
+        result = np.zeros(len(lat), dtype=bool)
+        for z in self._always:
+            result |= z.might_contain_many(lat, lon, alt)
+        # No position: a cell far outside any zone.
+        rows = np.floor(np.nan_to_num(lat, nan=1000) / self.cell_degrees)
+        columns = np.floor(np.nan_to_num(lon, nan=1000) / self.cell_degrees)
+        keys = (rows * CELL_KEY + columns).astype(np.int64)
+        order = np.argsort(keys, kind="stable")
+        cells, starts = np.unique(keys[order], return_index=True)
+        ends = np.append(starts[1:], len(keys))
+        wanted = np.isin(cells, self._cell_keys)
+        for cell, start, end in zip(
+            cells[wanted].tolist(), starts[wanted].tolist(), ends[wanted].tolist()
+        ):
+            i = order[start:end]
+            for z in self._cells[cell]:
+                result[i] |= z.might_contain_many(lat[i], lon[i], alt[i])
+        return result
+
+    def containing(self, a):
+        """
+        Returns the zones the located aircraft a is in.
+        """
+        if a.lat is None or a.lon is None:
+            return []
+        return [z for z in self.candidates(a.lat, a.lon) if z.contains(a)]
+
+    def contains(self, a):
+        return bool(self.containing(a))
+
+    def radius(self, alt):
+        return max(z.radius(alt) for z in self.zones)
+
+
+def zones_from_config(config, latitude, longitude):
+    """
+    Returns the zones of the [zone:<name>] sections of config, around the
+    receiver at latitude, longitude.
+    """
+    zones = []
+    for section in config.sections():
+        if not section.startswith("zone:"):
+            continue
+        name = section[len("zone:") :]
+        options = config[section]
+        points = [
+            tuple(float(v) for v in point.split(","))
+            for point in options["points"].split()
+        ]
+        band = dict(
+            min_altitude=options.getfloat("min_altitude", 0),
+            max_altitude=options.getfloat("max_altitude", MAX_ALTITUDE),
+        )
+        kind = options.get("type", "polygon")
+        if kind == "polygon":
+            zones.append(PolygonZone(name, latitude, longitude, points, **band))
+        elif kind == "corridor":
+            width = options.getfloat("width", 1)
+            zones.append(CorridorZone(name, latitude, longitude, points, width, **band))
+        else:
+            raise ValueError(f"Zone {name}: unknown type {kind}")
+    return zones
@@ -0,0 +1,102 @@
+"""
+Memory and allocations of the refresh loop: fresh objects vs. reused ones.
+
+Parses the same synthetic feed over and over (with the positions moving a
+little between refreshes), once with a new parser for every refresh, which
+allocates a new AircraftData for every aircraft as before, and once with one
+parser that updates the objects in place.
+
+    uv run python -m benchmarks.bench_alloc
+"""
+
+import gc
+import sys
+import tracemalloc
+from datetime import datetime
+
+from benchmarks import synthetic
+
+synthetic.require_config()
+
+import flightdata
+
+REFRESHES = 50
+
+
+class DictAircraftData:
+    """
+    AircraftData as it was before __slots__, for the size comparison.
+    """
+
+    def __init__(self):
+        for name in flightdata.AircraftData.__slots__:
+            setattr(self, name, None)
+
+
+def feeds(n):
+    payload = synthetic.dump1090_payload(n)
+    for i in range(REFRESHES):
+        for a in payload["aircraft"]:
+            if "lat" in a:
+                a["lat"] += 0.001
+            a["messages"] += 1
+        yield payload
+
+
+def run(n, reuse):
+    """
+    Returns (peak bytes allocated during a refresh, peak bytes overall,
+    gen0 collections).
+    """
+    time = datetime.fromtimestamp(1706360400.0)
+    parser = flightdata.Dump1090DataParser()
+    aircraft = None
+    gc.collect()
+    collections = gc.get_stats()[0]["collections"]
+    tracemalloc.start()
+    allocated = 0
+    peak = 0
+    for payload in feeds(n):
+        if not reuse:
+            parser = flightdata.Dump1090DataParser()
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        aircraft = parser.aircraft_data(payload, time)
+        refresh_peak = tracemalloc.get_traced_memory()[1]
+        allocated = max(allocated, refresh_peak - before)
+        peak = max(peak, refresh_peak)
+    tracemalloc.stop()
+    del aircraft
+    return allocated, peak, gc.get_stats()[0]["collections"] - collections
+
+
+def main():
+    flightdata.receiver_latitude, flightdata.receiver_longitude = synthetic.RECEIVER
+    # The size of a slotted object doesn't depend on the values.
+    slots_size = sys.getsizeof(flightdata.AircraftData.__new__(flightdata.AircraftData))
+    dict_object = DictAircraftData()
+    dict_size = sys.getsizeof(dict_object) + sys.getsizeof(dict_object.__dict__)
+    print(
+        "AircraftData: {} bytes with __slots__, {} bytes with __dict__\n".format(
+            slots_size, dict_size
+        )
+    )
+
+    print("| aircraft | objects | refresh KiB | peak KiB | gen0 GCs |")
+    print("|---------:|:--------|------------:|---------:|---------:|")
+    for n in synthetic.SIZES:
+        for reuse in (False, True):
+            allocated, peak, collections = run(n, reuse)
+            print(
+                "| {:>8} | {:<7} | {:>11.1f} | {:>8.1f} | {:>8} |".format(
+                    n,
+                    "reused" if reuse else "fresh",
+                    allocated / 1024,
+                    peak / 1024,
+                    collections,
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Size and parse throughput of a refresh: aircraft.json vs. binCraft.
+
+    uv run python -m benchmarks.bench_bincraft
+"""
+
+import gzip
+import json
+import timeit
+from datetime import datetime
+
+from benchmarks import synthetic
+
+synthetic.require_config()
+
+import bincraft
+import flightdata
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def main():
+    flightdata.receiver_latitude, flightdata.receiver_longitude = synthetic.RECEIVER
+    json_parser = flightdata.Dump1090DataParser()
+    bincraft_parser = bincraft.BinCraftDataParser()
+    time = datetime.fromtimestamp(1706360400.0)
+
+    print(
+        "| aircraft | json KiB | json.gz KiB | binCraft KiB | .zst KiB "
+        "| json ms | binCraft ms | speedup |"
+    )
+    print(
+        "|---------:|---------:|------------:|-------------:|---------:"
+        "|--------:|------------:|--------:|"
+    )
+    for n in synthetic.SIZES:
+        payload = synthetic.dump1090_payload(n)
+        raw_json = json.dumps(payload).encode()
+        raw_bincraft = synthetic.bincraft(payload)
+        zst = "-"
+        if zstandard is not None:
+            zst = "{:.1f}".format(
+                len(zstandard.ZstdCompressor().compress(raw_bincraft)) / 1024
+            )
+        number = max(1, 20000 // n)
+
+        def parse_json(raw=raw_json):
+            json_parser.aircraft_data(json_parser.decode(raw), time)
+
+        def parse_bincraft(raw=raw_bincraft):
+            bincraft_parser.aircraft_data(bincraft_parser.decode(raw), time)
+
+        t_json = min(timeit.repeat(parse_json, number=number, repeat=5)) / number
+        t_bin = min(timeit.repeat(parse_bincraft, number=number, repeat=5)) / number
+        print(
+            "| {:>8} | {:>8.1f} | {:>11.1f} | {:>12.1f} | {:>8} "
+            "| {:>7.2f} | {:>11.2f} | {:>6.1f}x |".format(
+                n,
+                len(raw_json) / 1024,
+                len(gzip.compress(raw_json)) / 1024,
+                len(raw_bincraft) / 1024,
+                zst,
+                t_json * 1e3,
+                t_bin * 1e3,
+                t_json / t_bin,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Distance / bearing / elevation of a whole refresh: scalar vs. AircraftBatch.
+
+    uv run python -m benchmarks.bench_locate
+"""
+
+import copy
+import timeit
+from datetime import datetime
+
+from benchmarks import synthetic
+
+synthetic.require_config()
+
+import aircraftbatch
+import flightdata
+
+
+def main():
+    flightdata.receiver_latitude, flightdata.receiver_longitude = synthetic.RECEIVER
+    parser = flightdata.Dump1090DataParser()
+    time = datetime.fromtimestamp(1706360400.0)
+
+    print("| aircraft | scalar ms | batch ms | speedup |")
+    print("|---------:|----------:|---------:|--------:|")
+    for n in synthetic.SIZES:
+        payload = synthetic.dump1090_payload(n)
+        aircraft = [parser._parse_aircraft_data(a, time) for a in payload["aircraft"]]
+        work = copy.deepcopy(aircraft)
+        number = max(1, 20000 // n)
+
+        def scalar(work=work):
+            for a in work:
+                parser._locate(a)
+
+        def batch(work=work):
+            aircraftbatch.AircraftBatch(work).locate(*synthetic.RECEIVER)
+
+        t_scalar = min(timeit.repeat(scalar, number=number, repeat=5)) / number
+        t_batch = min(timeit.repeat(batch, number=number, repeat=5)) / number
+        print(
+            "| {:>8} | {:>9.3f} | {:>8.3f} | {:>6.1f}x |".format(
+                n, t_scalar * 1e3, t_batch * 1e3, t_scalar / t_batch
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
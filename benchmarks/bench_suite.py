@@ -0,0 +1,198 @@
+"""
+Microbenchmarks of the hot path: the JSON decoders, the parsers and geomath,
+for 10, 1k and 10k aircraft.
+
+Every benchmark is one operation over all aircraft of a synthetic refresh.
+It reports operations per second, the cost per aircraft and the memory
+allocated during one operation (peak traced by tracemalloc), so a change to
+the hot path can be judged by numbers:
+
+    uv run python -m benchmarks.bench_suite
+    uv run python -m benchmarks.bench_suite geomath   # only names containing it
+"""
+
+import itertools
+import json
+import math
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime
+
+from benchmarks import synthetic
+
+synthetic.require_config()
+
+import alarmzone
+import flightdata
+import geomath
+import jsondecode
+
+SIZES = (10, 1000, 10000)
+
+TIME = datetime.fromtimestamp(1706360400.0)
+
+
+def parser_benchmarks(n):
+    """
+    Yields (name, function) for the parsers: "cold" parses every aircraft with
+    a new parser, "warm" parses the same refresh again, which reuses them.
+    """
+    for name, parser_class, payload in (
+        ("Dump1090", flightdata.Dump1090DataParser, synthetic.dump1090_payload(n)),
+        ("VRS", flightdata.VRSDataParser, synthetic.vrs_payload(n)),
+    ):
+        warm = parser_class()
+        warm.aircraft_data(payload, TIME)
+
+        def cold(parser_class=parser_class, payload=payload):
+            parser_class().aircraft_data(payload, TIME)
+
+        def again(parser=warm, payload=payload):
+            parser.aircraft_data(payload, TIME)
+
+        yield f"{name}DataParser.aircraft_data cold", cold
+        yield f"{name}DataParser.aircraft_data warm", again
+
+    # Every aircraft has new messages, with and without an alarm zone that
+    # defers the details of the aircraft outside it.
+    payloads = [synthetic.dump1090_payload(n), synthetic.dump1090_payload(n)]
+    for a in payloads[1]["aircraft"]:
+        a["messages"] += 1
+    zone = alarmzone.AlarmZone(*synthetic.RECEIVER, 2, 75)
+    for label, parser in (
+        ("new messages", flightdata.Dump1090DataParser()),
+        ("new messages, zone", flightdata.Dump1090DataParser(zone)),
+    ):
+        refreshes = itertools.cycle(payloads)
+
+        def update(parser=parser, refreshes=refreshes):
+            parser.aircraft_data(next(refreshes), TIME)
+
+        update()
+        yield f"Dump1090DataParser.aircraft_data {label}", update
+
+
+def decoder_benchmarks(n):
+    """
+    Yields (name, function) for decoding the fetched bytes of aircraft.json
+    and parsing them, as FlightData.update() does, with every installed
+    decoder.
+    """
+    raw = json.dumps(synthetic.dump1090_payload(n)).encode()
+    for name, loads in jsondecode.backends().items():
+        parser = flightdata.Dump1090DataParser()
+
+        def decode(loads=loads):
+            loads(raw)
+
+        def update(loads=loads, parser=parser):
+            parser.aircraft_data(loads(raw), TIME)
+
+        yield f"{name} decode", decode
+        yield f"{name} decode + Dump1090DataParser.aircraft_data warm", update
+
+    # Typed: straight into the structs of jsondecode.Dump1090Document.
+    typed = jsondecode.get_dump1090_decoder("msgspec")
+    if typed is not None:
+        parser = flightdata.Dump1090DataParser()
+
+        def decode_typed():
+            typed(raw)
+
+        def update_typed(parser=parser):
+            parser.aircraft_data(typed(raw), TIME)
+
+        yield "msgspec typed decode", decode_typed
+        yield (
+            "msgspec typed decode + Dump1090DataParser.aircraft_data warm",
+            update_typed,
+        )
+
+
+def geomath_benchmarks(n):
+    """
+    Yields (name, function) for geomath, from the receiver to every aircraft.
+    """
+    aircraft = synthetic.dump1090_aircraft(n)
+    points = [(a["lat"], a["lon"]) for a in aircraft if "lat" in a]
+    tracks = [a.get("track") for a in aircraft]
+    receiver = synthetic.RECEIVER
+
+    def distance():
+        for p in points:
+            geomath.distance(receiver, p)
+
+    def bearing():
+        for p in points:
+            geomath.bearing(receiver, p)
+
+    def heading_str():
+        for t in tracks:
+            geomath.heading_str(t)
+
+    frame = geomath.LocalFrame(*receiver)
+    positions = [(a["lat"], a["lon"], a["alt_baro"]) for a in aircraft if "lat" in a]
+
+    def distance_bearing_elevation():
+        for p in points:
+            d = geomath.distance(receiver, p)
+            geomath.bearing(receiver, p)
+            math.atan(3000 / (d * 5280)) if d > 0 else 0.0
+
+    def local_frame():
+        for p in positions:
+            frame.locate(*p)
+
+    ecef = geomath.EcefFrame(*receiver)
+
+    def ecef_frame():
+        for p in positions:
+            ecef.locate(*p)
+
+    yield "geomath.distance", distance
+    yield "geomath.bearing", bearing
+    yield "geomath.heading_str", heading_str
+    yield "geomath distance + bearing + elevation", distance_bearing_elevation
+    yield "geomath.LocalFrame.locate", local_frame
+    yield "geomath.EcefFrame.locate", ecef_frame
+
+
+def allocated(function):
+    """
+    Returns the peak bytes allocated during one call of function.
+    """
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        function()
+        return tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+
+
+def main(selection=""):
+    flightdata.receiver_latitude, flightdata.receiver_longitude = synthetic.RECEIVER
+
+    print("| benchmark | aircraft | ops/s | µs/aircraft | KiB/op |")
+    print("|:----------|---------:|------:|------------:|-------:|")
+    for n in SIZES:
+        for name, function in (
+            *parser_benchmarks(n),
+            *decoder_benchmarks(n),
+            *geomath_benchmarks(n),
+        ):
+            if selection not in name:
+                continue
+            number = max(1, 20000 // n)
+            t = min(timeit.repeat(function, number=number, repeat=5)) / number
+            print(
+                "| {} | {} | {:.1f} | {:.3f} | {:.1f} |".format(
+                    name, n, 1 / t, t / n * 1e6, allocated(function) / 1024
+                )
+            )
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
@@ -0,0 +1,74 @@
+"""
+Cost of the alarm zone tests per refresh as zones are added.
+
+Adds corridors spread over the area of the feed to the [aboveme] zone and
+times the scalar pre-filter of a whole refresh, which only tests the zones
+around each aircraft, and the vectorized one.
+
+    uv run python -m benchmarks.bench_zones
+"""
+
+import math
+import random
+import timeit
+
+from benchmarks import synthetic
+
+synthetic.require_config()
+
+import alarmzone
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ZONE_COUNTS = (1, 10, 50, 200)
+
+
+def corridors(n, seed=5):
+    """
+    Returns n runway approach corridors of 5 miles, spread over the area of
+    the synthetic feed like the airports of a wide-area receiver.
+    """
+    rnd = random.Random(seed)
+    lat, lon = synthetic.RECEIVER
+    zones = []
+    for i in range(n):
+        start = (lat + rnd.uniform(-3, 3), lon + rnd.uniform(-5, 5))
+        angle = rnd.uniform(0, 2 * math.pi)
+        end = (start[0] + 0.07 * math.cos(angle), start[1] + 0.12 * math.sin(angle))
+        zones.append(alarmzone.CorridorZone(f"c{i}", lat, lon, [start, end], 1))
+    return zones
+
+
+def main():
+    payload = synthetic.dump1090_aircraft(10000)
+    positions = [(a["lat"], a["lon"], a["alt_baro"]) for a in payload if "lat" in a]
+    circle = alarmzone.AlarmZone(*synthetic.RECEIVER, 2, 75)
+
+    print("| zones | scalar ms | batch ms |")
+    print("|------:|----------:|---------:|")
+    for n in ZONE_COUNTS:
+        zones = alarmzone.ZoneSet([circle, *corridors(n - 1)])
+
+        def scalar(zones=zones):
+            for p in positions:
+                zones.might_contain(*p)
+
+        t_scalar = min(timeit.repeat(scalar, number=1, repeat=5))
+        t_batch = "-"
+        if np is not None:
+            lat, lon, alt = (np.array(c) for c in zip(*positions))
+
+            def batch(zones=zones, lat=lat, lon=lon, alt=alt):
+                zones.might_contain_many(lat, lon, alt)
+
+            t_batch = "{:.2f}".format(
+                min(timeit.repeat(batch, number=1, repeat=5)) * 1e3
+            )
+        print("| {:>5} | {:>9.2f} | {:>8} |".format(n, t_scalar * 1e3, t_batch))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Synthetic receiver feeds for the benchmarks.
+
+The modules under test read config.ini when they are imported, so the
+benchmarks are run from the project directory like tracker.py:
+
+    uv run python -m benchmarks.bench_locate
+"""
+
+import math
+import os
+import random
+import struct
+import sys
+
+# Same receiver as tests/test-config.ini, near EHGG.
+RECEIVER = (53.215119, 6.570963)
+
+SIZES = (100, 1000, 10000)
+
+
+def require_config():
+    if not os.path.exists("config.ini"):
+        sys.exit(
+            "config.ini not found: run the benchmarks from the project directory, "
+            "or copy tests/test-config.ini to config.ini"
+        )
+
+
+def dump1090_aircraft(n, seed=1):
+    """
+    Returns n aircraft as found in the aircraft list of aircraft.json.
+    """
+    rnd = random.Random(seed)
+    aircraft = []
+    for i in range(n):
+        a = {
+            "hex": "{:06x}".format(0x480000 + i),
+            "flight": "KLM{:<5}".format(i % 10000),
+            "squawk": "{:04o}".format(rnd.randrange(0o10000)),
+            "messages": rnd.randrange(10, 100000),
+            "seen": round(rnd.uniform(0, 30), 1),
+            "rssi": round(rnd.uniform(-35, -3), 1),
+        }
+        if rnd.random() < 0.9:
+            a["lat"] = round(RECEIVER[0] + rnd.uniform(-3, 3), 6)
+            a["lon"] = round(RECEIVER[1] + rnd.uniform(-5, 5), 6)
+            a["alt_baro"] = rnd.randrange(0, 45000, 25)
+            a["gs"] = round(rnd.uniform(80, 550), 1)
+            a["track"] = round(rnd.uniform(0, 360), 1)
+            a["baro_rate"] = rnd.randrange(-3000, 3000, 64)
+            a["seen_pos"] = round(rnd.uniform(0, 10), 1)
+        aircraft.append(a)
+    return aircraft
+
+
+def dump1090_payload(n, seed=1):
+    """
+    Returns an aircraft.json document with n aircraft.
+    """
+    return {
+        "now": 1706360400.0,
+        "messages": 12345678,
+        "aircraft": dump1090_aircraft(n, seed),
+    }
+
+
+def vrs_payload(n, seed=1):
+    """
+    Returns a Virtual Radar Server AircraftList.json document with n aircraft.
+    """
+    aircraft = []
+    for a in dump1090_aircraft(n, seed):
+        ac = {
+            "Icao": a["hex"],
+            "Call": a["flight"].strip(),
+            "Sqk": a["squawk"],
+            "CMsgs": a["messages"],
+            "Sig": 150,
+        }
+        if "lat" in a:
+            ac.update(
+                Lat=a["lat"], Long=a["lon"], Alt=a["alt_baro"], Spd=a["gs"],
+                Trak=a["track"], Vsi=a["baro_rate"],
+            )  # fmt: skip
+        aircraft.append(ac)
+    return {"acList": aircraft, "stm": 1706360400000}
+
+
+def bincraft(payload, stride=112):
+    """
+    Encodes an aircraft.json document (as returned by dump1090_payload()) as
+    readsb binCraft, see bincraft.py for the layout.
+    """
+    now_ms = round(payload["now"] * 1000)
+    out = bytearray(stride)
+    struct.pack_into("<III", out, 0, now_ms & 0xFFFFFFFF, now_ms >> 32, stride)
+    struct.pack_into("<I", out, 28, payload["messages"])
+    for a in payload["aircraft"]:
+        rec = bytearray(stride)
+        addr = int(a["hex"].lstrip("~"), 16) | (0x1000000 if a["hex"][0] == "~" else 0)
+        valid = [0, 0, 0, 0]
+        struct.pack_into("<i2xH", rec, 0, addr, round(a["seen"] * 10))
+        struct.pack_into("<H", rec, 62, a["messages"] & 0xFFFF)
+        rec[67] = (5 if a.get("mlat") else 0) << 4
+        rec[105] = round(math.sqrt(max(10 ** (a["rssi"] / 10) - 1.125e-5, 0) * 65025))
+        if "lat" in a:
+            struct.pack_into("<H", rec, 4, round(a["seen_pos"] * 10))
+            struct.pack_into(
+                "<ii", rec, 8, round(a["lon"] * 1e6), round(a["lat"] * 1e6)
+            )
+            valid[0] |= 64
+        if a.get("alt_baro") == "ground":
+            rec[68] = 1
+        elif "alt_baro" in a:
+            struct.pack_into("<h", rec, 20, a["alt_baro"] // 25)
+            valid[0] |= 16
+        if "baro_rate" in a:
+            struct.pack_into("<h", rec, 16, a["baro_rate"] // 8)
+            valid[2] |= 1
+        if "gs" in a:
+            struct.pack_into("<h", rec, 34, round(a["gs"] * 10))
+            valid[0] |= 128
+        if "mach" in a:
+            struct.pack_into("<h", rec, 36, round(a["mach"] * 1000))
+            valid[1] |= 4
+        if "track" in a:
+            struct.pack_into("<h", rec, 40, round(a["track"] * 90))
+            valid[1] |= 8
+        if "squawk" in a:
+            struct.pack_into("<H", rec, 32, int(a["squawk"], 16))
+            valid[3] |= 4
+        if "flight" in a:
+            rec[78:86] = a["flight"].encode("ascii").ljust(8, b"\0")[:8]
+            valid[0] |= 8
+        rec[73:77] = bytes(valid)
+        out += rec
+    return bytes(out)
@@ -0,0 +1,214 @@
+#
+# bincraft.py
+#
+# Parser for the binCraft format of readsb / tar1090.
+#
+# Besides aircraft.json, readsb can write the same aircraft state as binCraft:
+# fixed size little-endian records, optionally zstd compressed.  tar1090 uses it
+# for its own web interface (data/aircraft.binCraft.zst).  It's a fraction of
+# the size of aircraft.json, and decoding a record is one struct unpack instead
+# of building a dict with some 30 members.
+#
+# Layout, as decoded by tar1090 (html/formatter.js, wqi()):
+#
+#   header  u32[0..1] now (ms, low/high word), u32[2] record size (stride),
+#           u32[7] messages; the header takes the first stride bytes
+#   record  s32[0] hex (bit 24: non-ICAO address, '~' prefix)
+#           u16[2] seen_pos, u16[3] seen (1/10 s)
+#           s32[2] lon, s32[3] lat (1e-6 degrees)
+#           s16[8] baro_rate (8 ft/min), s16[10] alt_baro (25 ft)
+#           u16[16] squawk (as hex digits), s16[17] gs (1/10 kt),
+#           s16[18] mach (1/1000), s16[20] track (1/90 degree), u16[31] messages
+#           u8[67] >> 4 source type (5 = mlat), u8[68] & 15 airground (1 = ground)
+#           u8[73..76] validity bits, u8[78..85] callsign, u8[105] signal
+#
+
+import math
+import struct
+import sys
+from datetime import datetime
+
+import flightdata
+import geomath
+
+try:
+    import zstandard
+except ImportError:
+    # Only needed for aircraft.binCraft.zst: `uv sync --extra bincraft`
+    zstandard = None
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+HEADER = struct.Struct("<III16xI")  # now low, now high, stride, messages
+
+# The fields of a record used by AircraftData, up to and including the signal
+# byte.  Records are padded to the stride given in the header.
+RECORD_FORMAT = "<iHHiih2xh10xHhh2xh20xH3xBB4xBBBBx8s19xB"
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+
+# Validity bits
+CALLSIGN_VALID = 8  # u8[73]
+ALT_BARO_VALID = 16
+POSITION_VALID = 64
+GS_VALID = 128
+MACH_VALID = 4  # u8[74]
+TRACK_VALID = 8
+BARO_RATE_VALID = 1  # u8[75]
+SQUAWK_VALID = 4  # u8[76]
+
+# Bound on the interned hex and callsign caches of the parser.
+MAX_STRINGS = 20000
+
+TYPE_MLAT = 5
+AIRGROUND_GROUND = 1
+
+
+def _records(stride):
+    """
+    Returns the struct for records of the given size.
+    """
+    record = _record_structs.get(stride)
+    if record is None:
+        if stride < RECORD_SIZE:
+            raise ValueError(f"binCraft record size {stride} is too small")
+        record = _record_structs[stride] = struct.Struct(
+            RECORD_FORMAT + f"{stride - RECORD_SIZE}x"
+        )
+    return record
+
+
+_record_structs = {}
+
+
+def decompress(data):
+    """
+    Returns the binCraft data, decompressed if it is zstd compressed.
+    """
+    if data[:4] != ZSTD_MAGIC:
+        return data
+    if zstandard is None:
+        raise ValueError(
+            "binCraft data is zstd compressed, install zstandard "
+            "or use the uncompressed aircraft.binCraft"
+        )
+    return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+
+def decode(data):
+    """
+    Decodes a binCraft file into a dict like aircraft.json.  The records are
+    not copied: "aircraft" iterates over tuples unpacked straight from data,
+    so it can only be read once.
+    """
+    data = memoryview(decompress(data))
+    if len(data) < HEADER.size:
+        raise ValueError("binCraft data is too short")
+    now_low, now_high, stride, messages = HEADER.unpack_from(data)
+    records = _records(stride)
+    end = len(data) - (len(data) - stride) % stride
+    return {
+        "now": now_low / 1000 + now_high * 4294967.296,
+        "messages": messages,
+        "aircraft": records.iter_unpack(data[stride:end]),
+    }
+
+
+class BinCraftDataParser(flightdata.AircraftDataParser):
+    aircraft_key = "aircraft"
+
+    def __init__(self, zone=None):
+        super().__init__(zone)
+        # Interned strings by their binary value, so the same aircraft doesn't
+        # cost a new hex and callsign string every refresh.
+        self._hexes = {}
+        self._callsigns = {}
+
+    def decode(self, raw_data):
+        return decode(raw_data)
+
+    def _begin_refresh(self):
+        super()._begin_refresh()
+        if len(self._hexes) + len(self._callsigns) > MAX_STRINGS:
+            self._hexes.clear()
+            self._callsigns.clear()
+
+    def time(self, json_data):
+        return json_data["now"]
+
+    def _parse_aircraft_data(self, a, time):
+        (
+            addr, seen_pos, seen, lon, lat, baro_rate, alt_baro, squawk, gs, mach,
+            track, messages, source, airground, valid0, valid1, valid2, valid3,
+            callsign, signal,
+        ) = a  # fmt: skip
+
+        dhex = self._hexes.get(addr)
+        if dhex is None:
+            dhex = self._hexes[addr] = sys.intern(
+                ("~" if addr & 0x1000000 else "") + f"{addr & 0xFFFFFF:06X}"
+            )
+
+        if valid0 & POSITION_VALID:
+            seen_pos = seen_pos / 10
+        else:
+            seen_pos = None
+        ac = self._unchanged(dhex, messages, seen / 10, seen_pos, time)
+        if ac is not None:
+            return ac
+
+        flight = None
+        if valid0 & CALLSIGN_VALID:
+            flight = self._callsigns.get(callsign)
+            if flight is None:
+                flight = self._callsigns[callsign] = sys.intern(
+                    callsign.split(b"\0", 1)[0].decode("ascii", "replace")
+                )
+
+        if valid0 & POSITION_VALID:
+            lat = lat / 1e6
+            lon = lon / 1e6
+        else:
+            lat = lon = None
+
+        if airground & 15 == AIRGROUND_GROUND or not valid0 & ALT_BARO_VALID:
+            alt = 0.0
+        else:
+            alt = float(alt_baro * 25)
+
+        speed = 0
+        if valid0 & GS_VALID:
+            speed = geomath.knots_to_mph(gs / 10)
+        if valid1 & MACH_VALID:
+            speed = geomath.mach2mph(mach / 1000)
+
+        return self._aircraft(
+            dhex,
+            f"{squawk:04x}" if valid3 & SQUAWK_VALID else None,
+            flight,
+            None,
+            lat,
+            lon,
+            alt,
+            baro_rate * 8 if valid2 & BARO_RATE_VALID else 0,
+            track / 90 if valid1 & TRACK_VALID else None,
+            speed,
+            messages,
+            seen / 10,
+            source >> 4 == TYPE_MLAT,
+            None,  # NUCP
+            seen_pos,
+            10.0 * math.log10(signal * signal / 65025 + 1.125e-5),
+            -1,  # distance, az and el are filled in by _locate()
+            0,
+            0,
+            time,
+        )
+
+    def stream_aircraft_data(self, stream, header):
+        """
+        binCraft files are small and can't be parsed before the header has been
+        read anyway, so this reads the whole stream and parses that.
+        """
+        data = self.decode(stream.read())
+        header.update((k, v) for k, v in data.items() if k != self.aircraft_key)
+        yield from self.aircraft_data(data, datetime.fromtimestamp(data["now"]))
@@ -0,0 +1,91 @@
+#
+# circuitbreaker.py
+#
+# Fail fast while a remote service is down.
+#
+# When hexdb.io is down every lookup waits for its timeout, and a post waits
+# for all of them.  The CircuitBreaker counts the failed requests in a row;
+# after `failures` of them it opens and the requests fail at once with
+# CircuitOpen.  A background thread then calls probe() every `interval`
+# seconds and closes the breaker again when it succeeds, so no request of the
+# tracker has to find out whether the service is back.
+#
+
+import threading
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+FAILURES = 5
+INTERVAL = 60
+
+
+class CircuitOpen(Exception):
+    """
+    Raised instead of a request while the breaker is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    Opens after failures failed requests in a row, and closes when probe()
+    returns True, tried every interval seconds in the background.
+    """
+
+    def __init__(self, name, probe, failures=FAILURES, interval=INTERVAL):
+        self.name = name
+        self.probe = probe
+        self.failures = failures
+        self.interval = interval
+        self.failed = 0  # failed requests in a row
+        self.opened = 0  # times the breaker opened
+        self.is_open = False
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+
+    def check(self):
+        """
+        Raises CircuitOpen while the breaker is open.
+        """
+        if self.is_open:
+            raise CircuitOpen(f"{self.name} is down")
+
+    def success(self):
+        self.failed = 0
+
+    def failure(self):
+        """
+        Counts a failed request, opens the breaker after failures of them.
+        """
+        with self._lock:
+            self.failed += 1
+            if self.is_open or self.failed < self.failures:
+                return
+            self.is_open = True
+            self.opened += 1
+            self._closed.clear()
+        logger.warning("%s is down, probing every %ss", self.name, self.interval)
+        threading.Thread(
+            target=self._probe, name=f"probe-{self.name}", daemon=True
+        ).start()
+
+    def _probe(self):
+        while not self._closed.wait(self.interval):
+            try:
+                if not self.probe():
+                    continue
+            except Exception as e:
+                logger.debug("Probe of %s failed: %s", self.name, e)
+                continue
+            self.close()
+
+    def close(self):
+        """
+        Closes the breaker, the requests are made again.
+        """
+        with self._lock:
+            self.failed = 0
+            self.is_open = False
+            self._closed.set()
+        logger.warning("%s is back", self.name)
@@ -0,0 +1,114 @@
+#
+# cpa.py
+#
+# Closest point of approach of the aircraft to the receiver.
+#
+# The alarms only know the closest approach afterwards: the sample with the
+# smallest distance, once the aircraft has left the zone for wait_x_updates
+# refreshes.  predict() extrapolates every aircraft along its track at its
+# speed and vertical rate, in the flat plane of the alarm zone, and returns
+# when it will be closest to the receiver, how close and how high above the
+# horizon.  A negative time means the closest approach has passed already.
+#
+# All aircraft of a refresh are predicted in one vectorized pass when NumPy is
+# available.
+#
+
+import math
+from collections import namedtuple
+
+from alarmzone import FT_PER_MILE
+
+try:
+    import numpy as np
+
+    import aircraftbatch
+except ImportError:
+    # NumPy is optional, without it every aircraft is predicted on its own.
+    aircraftbatch = None
+
+# time: seconds from now, distance: miles, altitude: feet, elevation: degrees
+Approach = namedtuple("Approach", "time distance altitude elevation")
+
+
+def _elevation(altitude, distance):
+    if distance > 0:
+        return math.degrees(math.atan(altitude / (distance * FT_PER_MILE)))
+    return 90.0 if altitude > 0 else 0.0
+
+
+def predict_one(a, zone):
+    """
+    Returns the Approach of aircraft a, or None when it can't be predicted.
+    """
+    if a.lat is None or a.lon is None or a.track is None or a.speed is None:
+        return None
+    # Position relative to the receiver, in miles.
+    east = (a.lon - zone.lon) * zone.kx
+    north = (a.lat - zone.lat) * zone.ky
+    track = math.radians(a.track)
+    ve = a.speed * math.sin(track) / 3600  # miles per second
+    vn = a.speed * math.cos(track) / 3600
+    v_sq = ve * ve + vn * vn
+    t = -(east * ve + north * vn) / v_sq if v_sq > 0 else 0.0
+    distance = math.hypot(east + ve * t, north + vn * t)
+    altitude = max(0.0, (a.altitude or 0) + (a.vert_rate or 0) * t / 60)
+    return Approach(
+        t - (a.seen_pos or 0), distance, altitude, _elevation(altitude, distance)
+    )
+
+
+def predict(aircraft, zone):
+    """
+    Returns the Approach of every aircraft that can be predicted, by hex.
+    """
+    if aircraftbatch is None or len(aircraft) < aircraftbatch.MIN_BATCH_SIZE:
+        approaches = {}
+        for a in aircraft:
+            approach = predict_one(a, zone)
+            if approach is not None:
+                approaches[a.hex] = approach
+        return approaches
+
+    batch = aircraftbatch.AircraftBatch(aircraft)
+    known = ~(
+        np.isnan(batch.lat)
+        | np.isnan(batch.lon)
+        | np.isnan(batch.track)
+        | np.isnan(batch.speed)
+    )
+    east = (batch.lon[known] - zone.lon) * zone.kx
+    north = (batch.lat[known] - zone.lat) * zone.ky
+    track = np.radians(batch.track[known])
+    ve = batch.speed[known] * np.sin(track) / 3600
+    vn = batch.speed[known] * np.cos(track) / 3600
+    v_sq = ve * ve + vn * vn
+    t = np.divide(
+        -(east * ve + north * vn), v_sq, out=np.zeros_like(v_sq), where=v_sq > 0
+    )
+    distance = np.hypot(east + ve * t, north + vn * t)
+    altitude = np.maximum(
+        0.0,
+        np.nan_to_num(batch.alt[known])
+        + np.nan_to_num(batch.vert_rate[known]) * t / 60,
+    )
+    ratio = np.divide(
+        altitude,
+        distance * FT_PER_MILE,
+        out=np.where(altitude > 0, np.inf, 0.0),
+        where=distance > 0,
+    )
+    elevation = np.degrees(np.arctan(ratio))
+    t -= np.nan_to_num(batch.seen_pos[known])
+
+    hexes = [a.hex for a, k in zip(aircraft, known.tolist()) if k]
+    return {
+        h: Approach(*values)
+        for h, *values in zip(
+            hexes,
+            t.tolist(),
+            distance.tolist(),
+            altitude.tolist(),
+            elevation.tolist(),
+        )
+    }
@@ -1,6 +1,11 @@
+import concurrent.futures
 import configparser
 
+import bincraft
+import fanin
 import flightdata
+import recorder
+import sbs
 import screenshot
 
 
@@ -15,6 +20,18 @@ DRIVERS = {
     "virtualradarserver": dict(
         data=flightdata.VRSDataParser, map=screenshot.VRSDisplay
     ),
+    # readsb / tar1090 binary format, data_url is .../data/aircraft.binCraft(.zst)
+    "bincraft": dict(data=bincraft.BinCraftDataParser, map=screenshot.Dump1090Display),
+    # Replays a log written with the record option, data_url is its path
+    "replay": dict(
+        data=None, map=screenshot.Dump1090Display, source=recorder.ReplayFlightData
+    ),
+    # Push based, data_url is the SBS-1 port of dump1090/readsb: tcp://<host>:30003
+    "sbs": dict(
+        data=sbs.SBSDataParser,
+        map=screenshot.Dump1090Display,
+        source=sbs.SBSFlightData,
+    ),
 }
 
 
@@ -36,15 +53,61 @@ def get_map_source():
     return get_driver()["map"](g_map_url)
 
 
-def get_data_source():
-    return flightdata.FlightData(data_url=g_data_url, parser=get_driver()["data"]())
+def get_data_source(zone=None):
+    driver = get_driver()
+    if g_driver == "replay":
+        # Parsed like the driver the log was recorded with.
+        return driver["source"](
+            data_url=g_data_url,
+            parser=DRIVERS[g_replay_driver]["data"](zone),
+            speed=g_replay_speed,
+        )
+
+    if g_record and g_driver == "sbs":
+        raise Error("Can't record the sbs driver, it gets no aircraft.json to log")
+
+    def source(data_url, log=None):
+        if "source" in driver:
+            return driver["source"](data_url=data_url, parser=driver["data"](zone))
+        if g_refresh_deadline:
+            return flightdata.AsyncFlightData(
+                data_url=data_url,
+                parser=driver["data"](zone),
+                deadline=g_refresh_deadline,
+                recorder=log,
+            )
+        return flightdata.FlightData(
+            data_url=data_url,
+            parser=driver["data"](zone),
+            stream=g_stream_json,
+            recorder=log,
+        )
+
+    if len(g_data_urls) == 1:
+        return source(g_data_url, recorder.Recorder(g_record) if g_record else None)
+    if g_record:
+        print("Not recording: record only works with a single data_url")
+    # More than one receiver: connect to all of them at the same time.
+    with concurrent.futures.ThreadPoolExecutor(len(g_data_urls)) as pool:
+        sources = list(pool.map(source, g_data_urls))
+    return fanin.MultiFlightData(sources, deadline=g_receiver_deadline)
 
 
 parser = configparser.ConfigParser()
 parser.read("config.ini")
 aboveme = parser["aboveme"]
 g_driver = aboveme.get("driver", DEFAULT_DRIVER)
-g_data_url = parser.get("aboveme", "data_url")
+# One or more receivers, separated by whitespace or on continuation lines.
+g_data_urls = parser.get("aboveme", "data_url").split()
+g_data_url = g_data_urls[0]
+g_receiver_deadline = aboveme.getfloat(
+    "receiver_deadline", fallback=aboveme.getfloat("sleep_time", fallback=5)
+)
+g_stream_json = aboveme.getboolean("stream_json", fallback=False)
+g_refresh_deadline = aboveme.getfloat("refresh_deadline", fallback=0)
+g_record = aboveme.get("record", fallback=None)
+g_replay_driver = aboveme.get("replay_driver", DEFAULT_DRIVER)
+g_replay_speed = aboveme.getfloat("replay_speed", fallback=1)
 g_map_baseurl = parser.get("aboveme", "map_url")
 # g_map_parameters = parser.get('aboveme', 'map_parameters')
 g_map_parameters = parser.get("aboveme", "map_params_screenshot")
@@ -0,0 +1,180 @@
+#
+# fanin.py
+#
+# Several receivers merged into one data source.
+#
+# With more than one antenna around the airport, most aircraft are seen by all
+# of them.  MultiFlightData refreshes the data source of every receiver at the
+# same time, each in its own thread, and merges their aircraft by hex: of the
+# same aircraft seen by several receivers it keeps the one with the freshest
+# position (lowest seen_pos), or with equally fresh positions the strongest
+# signal.  The tracker sees a single FlightData with one aircraft per hex.
+#
+# A receiver that hasn't answered within the deadline doesn't hold up the
+# others: its aircraft of the previous refresh are used again until it does.
+#
+
+import concurrent.futures
+import math
+
+import flightdata
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _rank(a):
+    """
+    Sort key of the same aircraft seen by different receivers, best first.
+    """
+    return (
+        a.seen_pos is None,
+        a.seen_pos or 0,
+        -(a.rssi if a.rssi is not None else -math.inf),
+    )
+
+
+class MergeParser(flightdata.AircraftDataParser):
+    """
+    "Parses" the AircraftData picked from the receivers into the merged
+    AircraftData, so the merged aircraft get the same reuse, delta and index
+    as those of a single receiver.  They are located by the receivers already.
+    """
+
+    def merge(self, aircraft_list, time):
+        self._begin_refresh()
+        merged = [self._parse_aircraft_data(a, time) for a in aircraft_list]
+        self._end_refresh()
+        return merged
+
+    def _parse_aircraft_data(self, a, time):
+        merged = self._unchanged(a.hex, a.messages, a.seen, a.seen_pos, time)
+        if merged is not None:
+            return merged
+        if a._pending is not None:
+            # Outside the alarm zones of the receiver, its details can wait.
+            merged = self._deferred(a.hex, a.core(), time, a._pending)
+            merged.distance, merged.az, merged.el = a.distance, a.az, a.el
+            merged.slant = a.slant
+            return merged
+        merged = self._aircraft(
+            a.hex,
+            a.squawk,
+            a.flight,
+            a.registration,
+            a.lat,
+            a.lon,
+            a.altitude,
+            a.vert_rate,
+            a.track,
+            a.speed,
+            a.messages,
+            a.seen,
+            a.mlat,
+            a.nucp,
+            a.seen_pos,
+            a.rssi,
+            a.distance,
+            a.az,
+            a.el,
+            time,
+        )
+        merged.slant = a.slant
+        return merged
+
+
+class MultiFlightData:
+    """
+    One FlightData for the data sources of several receivers.
+
+    deadline is how long refresh() waits for the receivers, in seconds.  It
+    should be shorter than sleep_time.  late counts the times a receiver
+    missed it.
+    """
+
+    def __init__(self, sources, deadline=5):
+        self.sources = sources
+        self.deadline = deadline
+        self.parser = MergeParser()
+        self.pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=len(sources), thread_name_prefix="fanin"
+        )
+        self.pending = [None] * len(sources)  # refreshes still running
+        self.late = 0
+        self.aircraft = None
+        self.time = None
+        self.delta = flightdata.Delta()
+        self.index = {}
+        # Receiver of each merged aircraft, by hex.
+        self._origin = {}
+        # The sources have refreshed once when they were created.
+        self._merge(range(len(sources)))
+
+    def refresh(self):
+        for i, source in enumerate(self.sources):
+            if self.pending[i] is None:
+                self.pending[i] = self.pool.submit(source.refresh)
+        concurrent.futures.wait(self.pending, timeout=self.deadline)
+
+        ready = []
+        late = []
+        for i, future in enumerate(self.pending):
+            if not future.done():
+                self.late += 1
+                late.append(i)
+                logger.warning(
+                    f"Receiver {self.sources[i].data_url} missed the deadline"
+                )
+                continue
+            self.pending[i] = None
+            if future.exception() is not None:
+                # Like a FlightData that failed: none of its aircraft.
+                logger.error(
+                    f"Refreshing {self.sources[i].data_url} failed: "
+                    f"{future.exception()}"
+                )
+                continue
+            ready.append(i)
+        self._merge(ready, late)
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        for source in self.sources:
+            if hasattr(source, "close"):
+                source.close()
+
+    def _merge(self, ready, late=()):
+        """
+        Merges the aircraft of the receivers that are ready with those of the
+        previous refresh from the late ones, in one pass over all of them.
+        """
+        best = {}
+        origin = {}
+        unknown = []  # no hex, can't be matched
+
+        def candidate(a, i):
+            if a.hex is None:
+                unknown.append(a)
+                return
+            other = best.get(a.hex)
+            if other is None or _rank(a) < _rank(other):
+                best[a.hex] = a
+                origin[a.hex] = i
+
+        for i in ready:
+            for a in self.sources[i].aircraft or ():
+                candidate(a, i)
+        if late:
+            # The previous merged aircraft are copies, unlike the aircraft of
+            # the late receivers which may be updated while we read them.
+            for dhex, i in self._origin.items():
+                if i in late:
+                    candidate(self.index[dhex], i)
+
+        times = [s.time for s in self.sources if s.time is not None]
+        self.time = max(times) if times else None
+        self.aircraft = self.parser.merge(list(best.values()) + unknown, self.time)
+        self._origin = origin
+        self.delta = self.parser.delta
+        self.index = self.parser.index
@@ -24,12 +24,17 @@
 # DEALINGS IN THE SOFTWARE.
 
 
-from urllib.request import urlopen
+from http.client import HTTPException
 from urllib.error import URLError
-import json
-from time import sleep
+import asyncio
+from time import monotonic, sleep
 import geomath
+import httpfetch
+import jsondecode
+import jsonstream
 import math
+import sys
+from operator import attrgetter
 from datetime import datetime
 from configparser import ConfigParser
 
@@ -37,6 +42,12 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+try:
+    import aircraftbatch
+except ImportError:
+    # NumPy is optional, without it every aircraft is located on its own.
+    aircraftbatch = None
+
 # Read the configuration file for this application.
 parser = ConfigParser()
 parser.read("config.ini")
@@ -44,34 +55,253 @@ parser.read("config.ini")
 # Assign receiver variables.
 receiver_latitude = float(parser.get("receiver", "latitude"))
 receiver_longitude = float(parser.get("receiver", "longitude"))
+# Feet above sea level, only used by the ecef geometry.
+receiver_altitude = float(parser.get("receiver", "altitude", fallback="0"))
+# "haversine" (exact), "enu": a flat frame at the receiver, see
+# geomath.LocalFrame for its error, or "ecef": true elevation and slant range.
+receiver_geometry = parser.get("receiver", "geometry", fallback="haversine")
+if receiver_geometry not in ("haversine", "enu", "ecef"):
+    raise ValueError(f"Unknown geometry {receiver_geometry} in [receiver]")
+receiver_frame = None
+if receiver_geometry == "enu":
+    receiver_frame = geomath.LocalFrame(receiver_latitude, receiver_longitude)
+elif receiver_geometry == "ecef":
+    receiver_frame = geomath.EcefFrame(
+        receiver_latitude, receiver_longitude, receiver_altitude
+    )
+
+# Decoder of the fetched JSON: "auto" picks orjson or msgspec when installed.
+json_decoder = parser.get("aboveme", "json_decoder", fallback="auto")
+json_loads = jsondecode.get_decoder(json_decoder)
+# With msgspec, aircraft.json of dump1090 is decoded into typed structs.
+dump1090_decode = jsondecode.get_dump1090_decoder(json_decoder)
 
 
 class FlightData:
-    def __init__(self, data_url=None, parser=None):
+    def __init__(
+        self, data_url=None, parser=None, fetcher=None, stream=False, recorder=None
+    ):
         self.data_url = data_url
         self.parser = parser
+        self.stream = stream  # parse aircraft straight off the socket
+        self.recorder = recorder  # recorder.Recorder that logs the fetched data
+        self.fetcher = fetcher or httpfetch.HTTPFetcher(data_url, timeout=10)
         self.aircraft = None
+        self.time = None
+        self.delta = Delta()  # what changed in the last refresh
+        self.index = {}  # aircraft of the last refresh by hex
+        self.parses_skipped = 0  # refreshes where the receiver had nothing new
         self.refresh()
 
+    @property
+    def bytes_saved(self):
+        return self.fetcher.bytes_saved
+
     def refresh(self):
         try:
-            self.req = urlopen(self.data_url, timeout=10)
-            self.raw_data = self.req.read()
-            self.json_data = json.loads(self.raw_data.decode())
-            self.time = datetime.fromtimestamp(self.parser.time(self.json_data))
-            self.aircraft = self.parser.aircraft_data(self.json_data, self.time)
-        except (URLError, TimeoutError) as e:
+            if self.stream:
+                self.refresh_stream()
+                return
+            raw_data = self.fetcher.fetch()
+            if raw_data is None:
+                # Not modified since the last refresh: keep the current aircraft.
+                self.parses_skipped += 1
+                self.delta = Delta()
+                return
+            self.update(raw_data)
+        except (URLError, TimeoutError, OSError, HTTPException) as e:
             logger.error(f"Network error fetching flight data: {e}", exc_info=True)
-            self.aircraft = []  # Return empty list instead of None
-        except json.JSONDecodeError as e:
+            self.fail()
+        except jsondecode.DecodeError as e:
             logger.error(f"Invalid JSON from flight data source: {e}", exc_info=True)
-            self.aircraft = []
+            self.fail()
         except Exception as e:
             logger.error(f"Unexpected error refreshing flight data: {e}", exc_info=True)
-            self.aircraft = []
+            self.fail()
+
+    def update(self, raw_data):
+        """
+        Parses the fetched raw_data into the aircraft.
+        """
+        self.raw_data = raw_data
+        if self.recorder is not None:
+            self.recorder.write(raw_data)
+        self.json_data = self.parser.decode(self.raw_data)
+        self.time = datetime.fromtimestamp(self.parser.time(self.json_data))
+        self.aircraft = self.parser.aircraft_data(self.json_data, self.time)
+        self.delta = self.parser.delta
+        self.index = self.parser.index
+
+    def refresh_stream(self):
+        """
+        Refreshes without holding the whole document in memory, the aircraft
+        are parsed one by one while the response is being read.
+        """
+        stream = self.fetcher.open()
+        if stream is None:
+            self.parses_skipped += 1
+            self.delta = Delta()
+            return
+        if self.recorder is not None:
+            stream = self.recorder.tee(stream)
+        header = {}
+        with stream:
+            aircraft = list(self.parser.stream_aircraft_data(stream, header))
+        self.json_data = header
+        self.time = datetime.fromtimestamp(self.parser.time(header))
+        self.aircraft = aircraft
+        self.delta = self.parser.delta
+        self.index = self.parser.index
+
+    def fail(self):
+        self.aircraft = []  # Return empty list instead of None
+        # All aircraft are gone, they enter again on the next good refresh.
+        self.delta = self.parser.clear()
+        self.index = {}
+        # Make sure the next refresh downloads the full file again.
+        self.fetcher.invalidate()
+
+
+class AsyncFlightData(FlightData):
+    """
+    FlightData that fetches with asyncio, within a deadline.
+
+    refresh_async() is the coroutine, refresh() runs it on the data source's
+    own event loop.  A refresh that doesn't finish within deadline seconds is
+    cancelled.  When a refresh is late or fails, the aircraft of the last good
+    refresh are kept (with the same time, and an empty delta), until they are
+    older than max_stale seconds.
+    """
+
+    def __init__(
+        self,
+        data_url=None,
+        parser=None,
+        fetcher=None,
+        deadline=5,
+        max_stale=60,
+        recorder=None,
+    ):
+        self.deadline = deadline
+        self.max_stale = max_stale
+        self.deadlines_missed = 0
+        self.last_good = None  # time.monotonic() of the last good refresh
+        self.loop = asyncio.new_event_loop()
+        super().__init__(
+            data_url=data_url,
+            parser=parser,
+            fetcher=fetcher or httpfetch.AsyncHTTPFetcher(data_url, timeout=deadline),
+            recorder=recorder,
+        )
+
+    def refresh(self):
+        self.loop.run_until_complete(self.refresh_async())
+
+    async def refresh_async(self):
+        try:
+            async with asyncio.timeout(self.deadline):
+                raw_data = await self.fetcher.fetch()
+        except TimeoutError:
+            self.deadlines_missed += 1
+            logger.warning(f"No flight data within {self.deadline}s, request cancelled")
+            # The request was cancelled halfway, the connection can't be reused.
+            self.fetcher.close()
+            self.stale()
+            return
+        except (URLError, OSError, HTTPException) as e:
+            logger.error(f"Network error fetching flight data: {e}")
+            self.stale()
+            return
+        except Exception as e:
+            logger.error(f"Unexpected error fetching flight data: {e}", exc_info=True)
+            self.stale()
+            return
+
+        if raw_data is None:
+            self.parses_skipped += 1
+            self.delta = Delta()
+            self.last_good = monotonic()
+            return
+        try:
+            self.update(raw_data)
+        except Exception as e:
+            logger.error(f"Invalid flight data: {e}", exc_info=True)
+            self.stale()
+            return
+        self.last_good = monotonic()
+
+    def stale(self):
+        """
+        Keeps the aircraft of the last good refresh, if they're recent enough.
+        """
+        if self.last_good is None or monotonic() - self.last_good > self.max_stale:
+            self.fail()
+        else:
+            self.delta = Delta()
+
+    def close(self):
+        self.fetcher.close()
+        self.loop.close()
+
+
+class Delta:
+    """
+    What changed from one refresh to the next.
+
+        entered - AircraftData of the aircraft that weren't there before
+        left    - AircraftData of the aircraft that are gone, as last seen
+        changed - {hex: names of the changed attributes} of the other aircraft
+                  that have new data
+
+    Aircraft without new messages are in neither, only their seen and seen_pos
+    went up.  Aircraft without a hex can't be followed and aren't included.
+    The details of aircraft outside the alarm zone aren't compared, see
+    AircraftData.defer().
+    """
+
+    __slots__ = ("entered", "left", "changed")
+
+    def __init__(self, entered=None, left=None, changed=None):
+        self.entered = entered if entered is not None else []
+        self.left = left if left is not None else []
+        self.changed = changed if changed is not None else {}
+
+    def __bool__(self):
+        return bool(self.entered or self.left or self.changed)
+
+    def __repr__(self):
+        return "<Delta entered={} left={} changed={}>".format(
+            len(self.entered), len(self.left), len(self.changed)
+        )
 
 
 class AircraftData:
+    # Slots keep the per-aircraft memory small, there can be thousands of these.
+    __slots__ = (
+        "hex",
+        "squawk",
+        "flight",
+        "registration",
+        "lat",
+        "lon",
+        "altitude",
+        "vert_rate",
+        "track",
+        "speed",
+        "messages",
+        "seen",
+        "mlat",
+        "nucp",
+        "seen_pos",
+        "rssi",
+        "distance",
+        "az",
+        "el",
+        "time",
+        "slant",
+        "_pending",
+    )
+
     def __init__(
         self,
         dhex,
@@ -115,6 +345,95 @@ class AircraftData:
         self.az = az
         self.el = el
         self.time = time
+        # Slant range in miles, computed with distance, az and el.
+        self.slant = None
+        # (parse, member) of the details not parsed yet, see defer().
+        self._pending = None
+
+    # The parsers reuse the object of an aircraft from one refresh to the next,
+    # updating it in place with the same arguments as the constructor.
+    update = __init__
+
+    def defer(self, dhex, core, time, details):
+        """
+        Updates this aircraft with only the fields in _CORE, in that order.
+        The details (squawk, flight, registration, mlat and nucp) are parsed
+        when one of them is first read, or by materialize(): details is
+        (parse, member), parse(member) returns them.
+        """
+        if self.__class__ is AircraftData:
+            # The details of the last refresh are outdated.
+            for name in _DETAILS:
+                delattr(self, name)
+            self.__class__ = DeferredAircraftData
+        self.hex = dhex
+        (
+            self.lat, self.lon, self.altitude, self.vert_rate, self.track,
+            self.speed, self.messages, self.seen, self.seen_pos, self.rssi,
+        ) = core  # fmt: skip
+        self.distance = -1
+        self.az = 0
+        self.el = 0
+        self.time = time
+        self.slant = None
+        self._pending = details
+
+    def core(self):
+        """
+        Returns the fields of _CORE, as passed to defer().
+        """
+        return _core_values(self)
+
+    def materialize(self):
+        """
+        Parses the details of an aircraft updated by defer(), returns self.
+        """
+        if self._pending is not None:
+            parse, member = self._pending
+            self._pending = None
+            (
+                self.squawk, self.flight, self.registration, self.mlat, self.nucp
+            ) = parse(member)  # fmt: skip
+            self.__class__ = AircraftData
+        return self
+
+    def changes(self, args):
+        """
+        Returns the names of the attributes that update(self.hex, *args) would
+        change, leaving out the ones that change every refresh anyway: seen,
+        seen_pos, time, and distance, az and el which are computed afterwards.
+        """
+        values = _tracked_values(self)
+        if values == args[:_TRACKED_COUNT]:
+            return ()
+        return tuple(
+            name
+            for name, old, new in zip(_TRACKED, values, args)
+            if old != new and name not in _AGE
+        )
+
+    def core_changes(self, core):
+        """
+        Like changes(), for defer(self.hex, core, ...): the details aren't
+        compared.
+        """
+        values = _core_values(self)
+        if values == core:
+            return ()
+        return tuple(
+            name
+            for name, old, new in zip(_CORE, values, core)
+            if old != new and name not in _AGE
+        )
+
+    def copy(self):
+        """
+        Returns a snapshot of this aircraft that the next refresh won't change.
+        """
+        other = AircraftData.__new__(AircraftData)
+        for name in AircraftData.__slots__:
+            setattr(other, name, getattr(self, name))
+        return other
 
     def __str__(self):
         return "<{} {} dist={} el={}>".format(
@@ -129,41 +448,278 @@ class AircraftData:
         return "/".join(idents)
 
 
+class DeferredAircraftData(AircraftData):
+    """
+    An AircraftData of which the details haven't been parsed yet, see
+    AircraftData.defer().  Reading one of them parses them, which turns it
+    into a plain AircraftData.  A class of its own so only these aircraft pay
+    for __getattr__().
+    """
+
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        # Only called for attributes that aren't set.
+        if name not in _DETAILS:
+            raise AttributeError(name)
+        return getattr(self.materialize(), name)
+
+
+# The attributes set from the feed, in the order of the constructor arguments
+# after the hex.
+_TRACKED = AircraftData.__slots__[1:16]
+_TRACKED_COUNT = len(_TRACKED)
+_tracked_values = attrgetter(*_TRACKED)
+_AGE = ("seen", "seen_pos")
+# Only needed to post about an aircraft, not to follow it.
+_DETAILS = ("squawk", "flight", "registration", "mlat", "nucp")
+_CORE = tuple(name for name in _TRACKED if name not in _DETAILS)
+_core_values = attrgetter(*_CORE)
+
+
 class AircraftDataParser(object):
-    def __init__(self):
-        pass
+    # Top level key of the aircraft array, for stream_aircraft_data().
+    aircraft_key = None
+
+    def __init__(self, zone=None):
+        # With an alarmzone.AlarmZone, aircraft that are certainly outside the
+        # zone are not located: their distance, az and el are left None.  The
+        # parsers that support it also defer their details, see
+        # AircraftData.defer(), until they might be inside.
+        self.zone = zone
+        # AircraftData of the previous and the current refresh, by hex.
+        self._previous = {}
+        self._current = {}
+        # Aircraft of the refresh in progress that need to be located.
+        self._updated = []
+        self.delta = Delta()
+
+    @property
+    def index(self):
+        """
+        The AircraftData of the last refresh by hex.
+        """
+        return self._current
 
     def aircraft_data(self, json_data, time):
-        raise NotImplementedError
+        return self._parse_all(
+            json_data[self.aircraft_key], self._parse_aircraft_data, time
+        )
+
+    def _parse_all(self, aircraft, parse, time):
+        """
+        Returns the AircraftData of every aircraft of the feed, parse(a, time)
+        parses one of them.
+        """
+        self._begin_refresh()
+        aircraft_list = [parse(a, time) for a in aircraft]
+        self._locate_all(self._updated)
+        if self.zone is not None:
+            self._promote(self._updated)
+        self._end_refresh()
+        return aircraft_list
+
+    def clear(self):
+        """
+        Forgets all aircraft, returns the Delta in which they all left.  After
+        a refresh that failed halfway through, those are the aircraft of the
+        last refresh and the ones it had parsed already.
+        """
+        left = {**self._previous, **self._current}
+        self._previous, self._current = {}, {}
+        self._updated = []
+        self.delta = Delta(left=list(left.values()))
+        return self.delta
+
+    def decode(self, raw_data):
+        """
+        Decodes the bytes fetched from the data_url.
+        """
+        return json_loads(raw_data)
 
     def time(self, json_data):
         raise NotImplementedError
 
+    def _parse_aircraft_data(self, a, time):
+        """
+        Returns the AircraftData for one aircraft of the feed, without the
+        distance, azimuth and elevation from the receiver.
+        """
+        raise NotImplementedError
+
+    def _begin_refresh(self):
+        self._previous, self._current = self._current, {}
+        self._updated = []
+        self.delta = Delta()
+
+    def _end_refresh(self):
+        # Whatever wasn't seen again in this refresh is gone.
+        self.delta.left = list(self._previous.values())
+        self._previous = {}
+        self._updated = []
+
+    def _unchanged(self, dhex, messages, seen, seen_pos, time):
+        """
+        Returns the AircraftData of the previous refresh if the aircraft has no
+        new messages since, with only its age brought up to date.  Otherwise
+        returns None, and the aircraft must be parsed.
+        """
+        a = self._previous.get(dhex) if messages is not None else None
+        if a is None or a.messages != messages:
+            return None
+        del self._previous[dhex]
+        self._current[dhex] = a
+        a.seen = seen
+        a.seen_pos = seen_pos
+        a.time = time
+        return a
+
+    def _aircraft(self, dhex, *args):
+        """
+        Returns the AircraftData for an aircraft of the refresh in progress.
+        The object of the previous refresh with the same hex is updated and
+        reused, rather than allocating a new one for every aircraft every time.
+        """
+        a = self._previous.pop(dhex, None) if dhex else None
+        if a is None:
+            a = AircraftData(dhex, *args)
+            if dhex:
+                self.delta.entered.append(a)
+        else:
+            changed = a.changes(args)
+            a.update(dhex, *args)
+            if changed:
+                self.delta.changed[dhex] = changed
+        if dhex:
+            self._current[dhex] = a
+        self._updated.append(a)
+        return a
+
+    def _deferred(self, dhex, core, time, details):
+        """
+        Like _aircraft(), for an aircraft of which only the core fields have
+        been parsed, see AircraftData.defer().
+        """
+        a = self._previous.pop(dhex, None) if dhex else None
+        if a is None:
+            a = DeferredAircraftData.__new__(DeferredAircraftData)
+            if dhex:
+                self.delta.entered.append(a)
+        else:
+            changed = a.core_changes(core)
+            if changed:
+                self.delta.changed[dhex] = changed
+        a.defer(dhex, core, time, details)
+        if dhex:
+            self._current[dhex] = a
+        self._updated.append(a)
+        return a
+
+    def _promote(self, aircraft_list):
+        """
+        Parses the details of the located aircraft, those that might be in
+        the alarm zone.
+        """
+        for a in aircraft_list:
+            if a._pending is not None and a.distance is not None and a.distance >= 0:
+                a.materialize()
+
+    def _locate(self, a):
+        """
+        Fills in the distance, azimuth and elevation of one aircraft.
+        """
+        if a.lat is None or a.lon is None:
+            return a
+        if self.zone is not None and not self.zone.might_contain(
+            a.lat, a.lon, a.altitude
+        ):
+            a.distance = a.az = a.el = a.slant = None
+            return a
+        if receiver_frame is not None:
+            a.distance, a.az, a.el, a.slant = receiver_frame.locate(
+                a.lat, a.lon, a.altitude
+            )
+            return a
+        rec_pos = (receiver_latitude, receiver_longitude)
+        ac_pos = (a.lat, a.lon)
+        a.distance = geomath.distance(rec_pos, ac_pos)
+        a.az = geomath.bearing(rec_pos, ac_pos)
+        if a.distance > 0:
+            # dist is in miles -> 5280 ft/mile
+            a.el = math.degrees(math.atan(a.altitude / (a.distance * 5280)))
+        else:
+            a.el = 0.0
+        a.slant = math.hypot(a.distance, a.altitude / 5280)
+        return a
+
+    def _locate_all(self, aircraft_list):
+        """
+        Fills in the distance, azimuth and elevation of all aircraft of a
+        refresh, in one vectorized pass when NumPy is available.
+        """
+        if (
+            aircraftbatch is not None
+            and len(aircraft_list) >= aircraftbatch.MIN_BATCH_SIZE
+        ):
+            aircraftbatch.AircraftBatch(aircraft_list).locate(
+                receiver_latitude, receiver_longitude, self.zone, receiver_frame
+            )
+        else:
+            for a in aircraft_list:
+                self._locate(a)
+        return aircraft_list
+
+    def stream_aircraft_data(self, stream, header):
+        """
+        Parses the JSON document read from the binary stream, yielding each
+        aircraft as soon as it has been received.  The other top level members
+        end up in header.  The timestamp must come before the aircraft array,
+        as it does in the files written by dump1090 / tar1090.
+        """
+        self._begin_refresh()
+        time = None
+        for a in jsonstream.iter_array(stream, self.aircraft_key, header):
+            if time is None:
+                time = datetime.fromtimestamp(self.time(header))
+            updated = len(self._updated)
+            ac = self._parse_aircraft_data(a, time)
+            if len(self._updated) > updated:
+                self._locate(ac)
+                if self.zone is not None:
+                    self._promote((ac,))
+            yield ac
+        self._end_refresh()
+
 
 class VRSDataParser(AircraftDataParser):
+    aircraft_key = "acList"
+
     def _parse_aircraft_data(self, a, time):
-        alt = a.get("Alt", 0)
-        dist = -1
-        az = 0
-        el = 0
-        if "Lat" in a and "Long" in a:
-            rec_pos = (receiver_latitude, receiver_longitude)
-            ac_pos = (a["Lat"], a["Long"])
-            dist = geomath.distance(rec_pos, ac_pos)
-            az = geomath.bearing(rec_pos, ac_pos)
-            el = math.degrees(math.atan(alt / (dist * 5280)))
-        speed = 0
-        if "Spd" in a:
-            speed = geomath.knots_to_mph(a["Spd"])
+        dhex = sys.intern(a.get("Icao", None).upper())
         if "PosTime" in a:
             last_seen_time = datetime.fromtimestamp(a["PosTime"] / 1000.0)
             seen = (time - last_seen_time).total_seconds()
         else:
             seen = 0
-        ac_data = AircraftData(
-            a.get("Icao", None).upper(),
+        ac_data = self._unchanged(dhex, a.get("CMsgs", None), seen, None, time)
+        if ac_data is not None:
+            return ac_data
+        alt = a.get("Alt", 0)
+        speed = 0
+        if "Spd" in a:
+            speed = geomath.knots_to_mph(a["Spd"])
+        rssi = 10.0 * math.log10(a.get("Sig", 0) / 255.0 + 1e-5)
+        if self.zone is not None:
+            core = (
+                a.get("Lat", None), a.get("Long", None), alt, a.get("Vsi", 0),
+                a.get("Trak", None), speed, a.get("CMsgs", None), seen, None, rssi,
+            )  # fmt: skip
+            return self._deferred(dhex, core, time, (self._details, a))
+        call = a.get("Call", None)
+        ac_data = self._aircraft(
+            dhex,
             a.get("Sqk", None),
-            a.get("Call", None),
+            sys.intern(call) if call else call,
             a.get("Reg", None),
             a.get("Lat", None),
             a.get("Long", None),
@@ -176,70 +732,64 @@ class VRSDataParser(AircraftDataParser):
             a.get("Mlat", False),
             None,  # NUCP
             None,  # Seen pos
-            10.0 * math.log10(a.get("Sig", 0) / 255.0 + 1e-5),
-            dist,
-            az,
-            el,
+            rssi,
+            -1,  # distance, az and el are filled in by _locate()
+            0,
+            0,
             time,
         )
         return ac_data
 
-    def aircraft_data(self, json_data, time):
-        aircraft_list = [
-            self._parse_aircraft_data(d, time) for d in json_data["acList"]
-        ]
-        return aircraft_list
+    @staticmethod
+    def _details(a):
+        """
+        Returns squawk, flight, registration, mlat and nucp of aircraft a, as
+        parsed above.
+        """
+        call = a.get("Call", None)
+        return (
+            a.get("Sqk", None),
+            sys.intern(call) if call else call,
+            a.get("Reg", None),
+            a.get("Mlat", False),
+            None,  # NUCP
+        )
 
     def time(self, json_data):
         return json_data["stm"] / 1000.0
 
 
 class Dump1090DataParser(AircraftDataParser):
-    def aircraft_data(self, json_data, time):
-        aircraft_list = []
-        for a in json_data["aircraft"]:
-            alt_raw = a.get("alt_baro", a.get("altitude", 0))
-            # API may use string 'ground'
-            if isinstance(alt_raw, str) and alt_raw.lower() == "ground":
+    aircraft_key = "aircraft"
+
+    def _parse_aircraft_data(self, a, time):
+        dhex = sys.intern(a["hex"].upper()) if "hex" in a else None
+        aircraftdata = self._unchanged(
+            dhex, a.get("messages"), a.get("seen"), a.get("seen_pos"), time
+        )
+        if aircraftdata is not None:
+            return aircraftdata
+        alt_raw = a.get("alt_baro", a.get("altitude", 0))
+        # API may use string 'ground'
+        if isinstance(alt_raw, str) and alt_raw.lower() == "ground":
+            alt = 0.0
+        else:
+            try:
+                alt = float(alt_raw)
+            except (TypeError, ValueError):
                 alt = 0.0
-            else:
-                try:
-                    alt = float(alt_raw)
-                except (TypeError, ValueError):
-                    alt = 0.0
-            if alt == "ground":
-                alt = 0
-            dist = -1
-            az = 0
-            el = 0
-            if "lat" in a and "lon" in a:
-                dist = geomath.distance(
-                    (receiver_latitude, receiver_longitude), (a["lat"], a["lon"])
-                )
-                az = geomath.bearing(
-                    (receiver_latitude, receiver_longitude), (a["lat"], a["lon"])
-                )
-                try:
-                    if dist and dist > 0:
-                        # Ensure units are consistent (dist expected in miles -> 5280 ft/mile)
-                        el = math.degrees(math.atan(alt / (dist * 5280)))
-                    else:
-                        el = 0.0
-                except Exception:
-                    el = 0.0
-            speed = 0
-            if "speed" in a:
-                speed = geomath.knots_to_mph(a["speed"])
-            if "gs" in a:
-                speed = geomath.knots_to_mph(a["gs"])
-            if "mach" in a:
-                speed = geomath.mach2mph(a["mach"])
-
-            aircraftdata = AircraftData(
-                a["hex"].upper() if "hex" in a else None,
-                a["squawk"] if "squawk" in a else None,
-                a["flight"] if "flight" in a else None,
-                None,
+        if alt == "ground":
+            alt = 0
+        speed = 0
+        if "speed" in a:
+            speed = geomath.knots_to_mph(a["speed"])
+        if "gs" in a:
+            speed = geomath.knots_to_mph(a["gs"])
+        if "mach" in a:
+            speed = geomath.mach2mph(a["mach"])
+
+        if self.zone is not None:
+            core = (
                 a["lat"] if "lat" in a else None,
                 a["lon"] if "lon" in a else None,
                 alt,
@@ -248,21 +798,125 @@ class Dump1090DataParser(AircraftDataParser):
                 speed,
                 a["messages"] if "messages" in a else None,
                 a["seen"] if "seen" in a else None,
-                a["mlat"] if "mlat" in a else None,
-                a["nucp"] if "nucp" in a else None,
                 a["seen_pos"] if "seen_pos" in a else None,
                 a["rssi"] if "rssi" in a else None,
-                dist,
-                az,
-                el,
-                time,
             )
+            return self._deferred(dhex, core, time, (self._details, a))
+        aircraftdata = self._aircraft(
+            dhex,
+            a["squawk"] if "squawk" in a else None,
+            sys.intern(a["flight"]) if "flight" in a else None,
+            None,
+            a["lat"] if "lat" in a else None,
+            a["lon"] if "lon" in a else None,
+            alt,
+            a["vert_rate"] if "vert_rate" in a else 0,
+            a["track"] if "track" in a else None,
+            speed,
+            a["messages"] if "messages" in a else None,
+            a["seen"] if "seen" in a else None,
+            a["mlat"] if "mlat" in a else None,
+            a["nucp"] if "nucp" in a else None,
+            a["seen_pos"] if "seen_pos" in a else None,
+            a["rssi"] if "rssi" in a else None,
+            -1,  # distance, az and el are filled in by _locate()
+            0,
+            0,
+            time,
+        )
+        return aircraftdata
 
-            aircraft_list.append(aircraftdata)
-        return aircraft_list
+    @staticmethod
+    def _details(a):
+        """
+        Returns squawk, flight, registration, mlat and nucp of aircraft a, as
+        parsed above.
+        """
+        return (
+            a["squawk"] if "squawk" in a else None,
+            sys.intern(a["flight"]) if "flight" in a else None,
+            None,
+            a["mlat"] if "mlat" in a else None,
+            a["nucp"] if "nucp" in a else None,
+        )
+
+    def decode(self, raw_data):
+        if dump1090_decode is not None:
+            return dump1090_decode(raw_data)
+        return json_loads(raw_data)
+
+    def aircraft_data(self, json_data, time):
+        if isinstance(json_data, dict):
+            return super().aircraft_data(json_data, time)
+        return self._parse_all(json_data.aircraft, self._parse_typed, time)
+
+    def _parse_typed(self, a, time):
+        """
+        _parse_aircraft_data() for a jsondecode.Dump1090Aircraft.
+        """
+        dhex = sys.intern(a.hex.upper()) if a.hex is not None else None
+        aircraftdata = self._unchanged(dhex, a.messages, a.seen, a.seen_pos, time)
+        if aircraftdata is not None:
+            return aircraftdata
+        alt = a.alt_baro if a.alt_baro is not None else a.altitude
+        if alt is None or isinstance(alt, str):
+            # Missing, or "ground".
+            alt = 0.0
+        speed = 0
+        if a.speed is not None:
+            speed = geomath.knots_to_mph(a.speed)
+        if a.gs is not None:
+            speed = geomath.knots_to_mph(a.gs)
+        if a.mach is not None:
+            speed = geomath.mach2mph(a.mach)
+        vert_rate = a.vert_rate if a.vert_rate is not None else 0
+
+        if self.zone is not None:
+            core = (
+                a.lat, a.lon, alt, vert_rate, a.track, speed,
+                a.messages, a.seen, a.seen_pos, a.rssi,
+            )  # fmt: skip
+            return self._deferred(dhex, core, time, (self._details_typed, a))
+        return self._aircraft(
+            dhex,
+            a.squawk,
+            sys.intern(a.flight) if a.flight is not None else None,
+            None,
+            a.lat,
+            a.lon,
+            alt,
+            vert_rate,
+            a.track,
+            speed,
+            a.messages,
+            a.seen,
+            a.mlat,
+            a.nucp,
+            a.seen_pos,
+            a.rssi,
+            -1,  # distance, az and el are filled in by _locate()
+            0,
+            0,
+            time,
+        )
+
+    @staticmethod
+    def _details_typed(a):
+        """
+        _details() of a jsondecode.Dump1090Aircraft.
+        """
+        return (
+            a.squawk,
+            sys.intern(a.flight) if a.flight is not None else None,
+            None,
+            a.mlat,
+            a.nucp,
+        )
 
     def time(self, json_data):
-        return json_data["now"]
+        if isinstance(json_data, dict):
+            return json_data["now"]
+        return json_data.now
 
 
 if __name__ == "__main__":
@@ -272,6 +926,11 @@ if __name__ == "__main__":
     while True:
         os.system("clear")
         print("Now: {}".format(flightdata.time.strftime("%Y-%m-%d %H:%M:%S")))
+        print(
+            "Bytes saved: {}, parses skipped: {}".format(
+                flightdata.bytes_saved, flightdata.parses_skipped
+            )
+        )
         print(
             "|  icao   | flight  | miles |   az  |  el  |  alt  | mi/h  | vert  | rssi  | mesgs | seen |"
         )
@@ -8,6 +8,12 @@
 
 import math
 
+EARTH_RADIUS_MI = 3956  # Radius of earth in miles, see distance()
+FT_PER_MILE = 5280
+# Relative distance error of LocalFrame 10 miles out at the equator, with a
+# margin, see LocalFrame.distance_error().
+DISTANCE_ERROR = 3.5e-7
+
 
 def heading_str(heading):
     """
@@ -147,3 +153,120 @@ def bearing(pointA, pointB):
     compass_bearing = (initial_bearing + 360) % 360
 
     return compass_bearing
+
+
+class LocalFrame:
+    """
+    A flat East-North-Up frame at the receiver at (latitude, longitude), for
+    aircraft within some tens of miles.
+
+    locate() gives the distance, azimuth and elevation of an aircraft with a
+    few multiplications and an atan2() instead of the haversine distance()
+    and bearing().  The plane uses the longitude scale halfway between the
+    receiver and the aircraft, and the azimuth is corrected for the
+    convergence of the meridians.  Against distance() and bearing() on the
+    same sphere the relative distance error grows with the square of the
+    distance and with 1 / cos(latitude)^2, see distance_error().  Up to
+                   relative distance error    azimuth error
+                   at 53N      at 70N         up to 70N
+        10 miles:  1e-6        3e-6           0.0001 degrees
+        25 miles:  7e-6        2e-5           0.0003 degrees
+        100 miles: 1e-4        3e-4           0.005 degrees
+    The elevation is computed as before, from the distance and the altitude.
+    """
+
+    def __init__(self, latitude, longitude):
+        self.lat = latitude
+        self.lon = longitude
+        lat = math.radians(latitude)
+        self.ky = EARTH_RADIUS_MI * math.pi / 180  # miles per degree
+        self.kx = self.ky * math.cos(lat)
+        # Change of kx per degree of latitude, halved: kx at the midpoint.
+        self.kx_slope = self.ky * math.sin(lat) * math.pi / 360
+        # Half the meridian convergence per degree of longitude.
+        self.convergence = math.sin(lat) / 2
+
+    def distance_error(self, miles):
+        """
+        Returns the bound of the relative error of the distance of an aircraft
+        up to miles from the receiver, measured up to 80 degrees of latitude.
+        """
+        return (
+            DISTANCE_ERROR * (miles / 10) ** 2 / math.cos(math.radians(self.lat)) ** 2
+        )
+
+    def locate(self, lat, lon, alt):
+        """
+        Returns (distance in miles, azimuth, elevation in degrees, slant
+        range in miles) of an aircraft at lat, lon (degrees) and alt (feet).
+        """
+        dlat = lat - self.lat
+        dlon = lon - self.lon
+        east = dlon * (self.kx - self.kx_slope * dlat)
+        north = dlat * self.ky
+        distance = math.hypot(east, north)
+        az = (math.degrees(math.atan2(east, north)) - dlon * self.convergence) % 360
+        if distance > 0:
+            el = math.degrees(math.atan(alt / (distance * FT_PER_MILE)))
+        else:
+            el = 0.0
+        return distance, az, el, math.hypot(distance, alt / FT_PER_MILE)
+
+
+class EcefFrame:
+    """
+    The frame of a receiver at (latitude, longitude) and altitude (feet), for
+    true elevations and slant ranges, also of aircraft low on the horizon.
+
+    locate() puts the aircraft in Earth-Centered, Earth-Fixed coordinates on
+    the sphere of distance() and turns them into East-North-Up ones at the
+    receiver with one rotation, computed here once.  The distance and azimuth
+    are the great circle ones of distance() and bearing().  The elevation
+    takes the curvature of the earth and the receiver altitude into account:
+    a low aircraft 100 miles out is below the horizon, not at 0.5 degrees.
+    """
+
+    def __init__(self, latitude, longitude, altitude=0):
+        self.lat = latitude
+        self.lon = longitude
+        self.altitude = altitude
+        lat = math.radians(latitude)
+        lon = math.radians(longitude)
+        sin_lat, cos_lat = math.sin(lat), math.cos(lat)
+        sin_lon, cos_lon = math.sin(lon), math.cos(lon)
+        # The rows are the east, north and up unit vectors of the receiver.
+        self.rotation = (
+            (-sin_lon, cos_lon, 0.0),
+            (-sin_lat * cos_lon, -sin_lat * sin_lon, cos_lat),
+            (cos_lat * cos_lon, cos_lat * sin_lon, sin_lat),
+        )
+        # Distance of the receiver to the center of the earth, in miles.
+        self.radius = EARTH_RADIUS_MI + altitude / FT_PER_MILE
+
+    def locate(self, lat, lon, alt):
+        """
+        Returns (distance in miles, azimuth, elevation in degrees, slant
+        range in miles) of an aircraft at lat, lon (degrees) and alt (feet).
+        """
+        lat = math.radians(lat)
+        lon = math.radians(lon)
+        cos_lat = math.cos(lat)
+        x = cos_lat * math.cos(lon)
+        y = cos_lat * math.sin(lon)
+        z = math.sin(lat)
+        (ex, ey, _), (nx, ny, nz), (ux, uy, uz) = self.rotation
+        east = ex * x + ey * y
+        north = nx * x + ny * y + nz * z
+        up = ux * x + uy * y + uz * z
+
+        # The unit vector of the aircraft in the frame of the receiver.
+        horizontal = math.hypot(east, north)
+        distance = math.atan2(horizontal, up) * EARTH_RADIUS_MI
+        az = math.degrees(math.atan2(east, north)) % 360
+
+        # Scaled to the aircraft, relative to the receiver.
+        r = EARTH_RADIUS_MI + alt / FT_PER_MILE
+        horizontal *= r
+        up = up * r - self.radius
+        el = math.degrees(math.atan2(up, horizontal))
+        return distance, az, el, math.hypot(horizontal, up)
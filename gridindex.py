@@ -0,0 +1,144 @@
+#
+# gridindex.py
+#
+# The aircraft of a data source in a uniform lat/lon grid.
+#
+# Finding the aircraft near some position means a scan of fd.aircraft, which
+# stops scaling with wide-area feeds and more than one zone to test.  GridIndex
+# files the aircraft by grid cell and follows the refresh Delta: only the
+# aircraft that entered, left or moved are filed again.  A radius or box query
+# only looks at the cells it covers, so its cost grows with the number of
+# aircraft around the position instead of with all of them.
+#
+# The parsers update the AircraftData in place, so the cells hold the current
+# aircraft.  Aircraft without a hex aren't in the Delta and aren't indexed.
+#
+
+import math
+
+import geomath
+from alarmzone import MI_PER_DEG_LAT
+
+# 0.1 degrees is 7 miles north-south, about the size of an alarm zone.
+CELL_DEGREES = 0.1
+
+_MOVED = frozenset(("lat", "lon"))
+
+
+class GridIndex:
+    """
+    Aircraft by grid cell of cell_degrees square.  Call update() after every
+    refresh of the data source.
+    """
+
+    def __init__(self, cell_degrees=CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.columns = math.ceil(360 / cell_degrees)
+        self.cells = {}  # {(row, column): {hex: AircraftData}}
+        self._cell_of = {}  # {hex: (row, column)}
+
+    def __len__(self):
+        return len(self._cell_of)
+
+    def _cell(self, lat, lon):
+        return (
+            math.floor(lat / self.cell_degrees),
+            math.floor((lon + 180) / self.cell_degrees) % self.columns,
+        )
+
+    def add(self, a):
+        """
+        Files aircraft a in the cell of its position, or takes it out of the
+        index when it has none.
+        """
+        if a.lat is None or a.lon is None:
+            self.remove(a.hex)
+            return
+        cell = self._cell(a.lat, a.lon)
+        old = self._cell_of.get(a.hex)
+        if old == cell:
+            self.cells[cell][a.hex] = a
+            return
+        if old is not None:
+            self.remove(a.hex)
+        self.cells.setdefault(cell, {})[a.hex] = a
+        self._cell_of[a.hex] = cell
+
+    def remove(self, dhex):
+        cell = self._cell_of.pop(dhex, None)
+        if cell is None:
+            return
+        aircraft = self.cells[cell]
+        del aircraft[dhex]
+        if not aircraft:
+            del self.cells[cell]
+
+    def update(self, fd):
+        """
+        Applies the Delta of the last refresh of fd.
+        """
+        for a in fd.delta.left:
+            self.remove(a.hex)
+        for a in fd.delta.entered:
+            self.add(a)
+        for dhex, fields in fd.delta.changed.items():
+            if not _MOVED.isdisjoint(fields):
+                self.add(fd.index[dhex])
+
+    def _columns(self, lon_min, lon_max):
+        first = math.floor((lon_min + 180) / self.cell_degrees)
+        last = math.floor((lon_max + 180) / self.cell_degrees)
+        if last - first + 1 >= self.columns:
+            return range(self.columns)
+        return [c % self.columns for c in range(first, last + 1)]
+
+    def box(self, lat_min, lat_max, lon_min, lon_max):
+        """
+        Returns the aircraft with lat_min <= lat <= lat_max and a longitude
+        from lon_min east to lon_max, which may cross 180 degrees.
+        """
+        crosses = lon_max < lon_min
+        found = []
+        columns = self._columns(lon_min, lon_max + 360 if crosses else lon_max)
+        for row in range(
+            math.floor(lat_min / self.cell_degrees),
+            math.floor(lat_max / self.cell_degrees) + 1,
+        ):
+            for column in columns:
+                aircraft = self.cells.get((row, column))
+                if aircraft is None:
+                    continue
+                for a in aircraft.values():
+                    if not lat_min <= a.lat <= lat_max:
+                        continue
+                    if crosses:
+                        if lon_min <= a.lon or a.lon <= lon_max:
+                            found.append(a)
+                    elif lon_min <= a.lon <= lon_max:
+                        found.append(a)
+        return found
+
+    def radius(self, lat, lon, miles):
+        """
+        Returns the aircraft within miles of lat, lon, with their distance:
+        [(distance, AircraftData)], closest first.
+        """
+        dlat = miles / MI_PER_DEG_LAT
+        lat_min = max(-90.0, lat - dlat)
+        lat_max = min(90.0, lat + dlat)
+        # The longitude span is widest at the latitude furthest from the equator.
+        cos_lat = math.cos(math.radians(max(abs(lat_min), abs(lat_max))))
+        if cos_lat * 180 <= dlat:
+            lon_min, lon_max = -180.0, 180.0
+        else:
+            dlon = dlat / cos_lat
+            lon_min = (lon - dlon + 180) % 360 - 180
+            lon_max = (lon + dlon + 180) % 360 - 180
+
+        found = []
+        for a in self.box(lat_min, lat_max, lon_min, lon_max):
+            d = geomath.distance((lat, lon), (a.lat, a.lon))
+            if d <= miles:
+                found.append((d, a))
+        found.sort(key=lambda f: f[0])
+        return found
@@ -0,0 +1,396 @@
+#
+# httpfetch.py
+#
+# Keep-alive, conditional and compressed fetching of the receiver data files.
+#
+# tar1090 rewrites aircraft.json about once a second, so polling it at the same
+# rate means a good part of the requests ask for a file we already have.  The
+# fetcher below keeps one HTTP/1.1 connection open, sends the ETag and
+# Last-Modified validators back so an unchanged file costs a tiny 304, and
+# asks for gzip so a changed file costs a fraction of its size on the wire.
+#
+
+import asyncio
+import gzip
+import http.client
+import ssl
+from urllib.error import HTTPError
+from urllib.parse import urlsplit
+from urllib.request import urlopen
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean the server closed our idle keep-alive connection.  These are
+# retried once on a fresh connection before giving up.
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    BrokenPipeError,
+    ConnectionResetError,
+)
+
+# Longest status or header line AsyncHTTPFetcher accepts.
+MAX_LINE = 65536
+
+
+class HTTPFetcher:
+    """
+    Fetches a single URL over a persistent connection.
+
+    fetch() returns the (decompressed) body as bytes, or None when the server
+    answered 304 Not Modified.  URLs with a scheme other than http or https
+    are read with urlopen() and are never reported as unchanged.
+
+    Counters:
+        requests       - number of fetch() calls that reached the server
+        not_modified   - number of 304 answers
+        bytes_received - bytes read from the wire (compressed size)
+        bytes_saved    - bytes not transferred thanks to 304s and gzip
+    """
+
+    def __init__(self, url, timeout=10):
+        self.url = url
+        self.timeout = timeout
+        parts = urlsplit(url)
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = parts.path or "/"
+        if parts.query:
+            self.path += "?" + parts.query
+        self.conn = None
+        self.etag = None
+        self.last_modified = None
+        self.last_size = 0
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes_received = 0
+        self.bytes_saved = 0
+
+    def fetch(self):
+        """
+        Returns the body of the URL as bytes, or None if it did not change
+        since the previous fetch.
+        """
+        stream = self.open()
+        if stream is None:
+            return None
+        with stream:
+            return stream.read()
+
+    def open(self):
+        """
+        Starts a fetch and returns a ResponseStream to read the body from, or
+        None if it did not change since the previous fetch.
+
+        The stream must be closed before the next open(), so the keep-alive
+        connection is free again.
+        """
+        if self.scheme not in ("http", "https"):
+            self.requests += 1
+            return ResponseStream(self, urlopen(self.url, timeout=self.timeout))
+
+        try:
+            response = self._request()
+        except STALE_CONNECTION_ERRORS:
+            # The server dropped the idle connection, try once more on a new one.
+            logger.debug(
+                "Keep-alive connection to %s was closed, reconnecting", self.host
+            )
+            self.close()
+            response = self._request()
+        self.requests += 1
+
+        if response.status == 304:
+            self.bytes_received += len(response.read())
+            self.not_modified += 1
+            self.bytes_saved += self.last_size
+            return None
+        if response.status != 200:
+            self.bytes_received += len(response.read())
+            self.invalidate()
+            raise HTTPError(
+                self.url, response.status, response.reason, response.headers, None
+            )
+
+        self.etag = response.getheader("ETag")
+        self.last_modified = response.getheader("Last-Modified")
+        compressed = response.getheader("Content-Encoding", "").lower() == "gzip"
+        return ResponseStream(self, response, compressed)
+
+    def invalidate(self):
+        """
+        Forgets the validators, so the next fetch() downloads the full file.
+        """
+        self.etag = None
+        self.last_modified = None
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def _finished(self, stream, reuse=True):
+        self.bytes_received += stream.wire_size
+        if stream.compressed:
+            self.bytes_saved += stream.size - stream.wire_size
+        self.last_size = stream.wire_size
+        if not reuse or getattr(stream.raw, "will_close", True):
+            self.close()
+
+    def _request(self):
+        if self.conn is None:
+            if self.scheme == "https":
+                self.conn = http.client.HTTPSConnection(
+                    self.host, self.port, timeout=self.timeout
+                )
+            else:
+                self.conn = http.client.HTTPConnection(
+                    self.host, self.port, timeout=self.timeout
+                )
+        headers = {"Accept-Encoding": "gzip"}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        try:
+            self.conn.request("GET", self.path, headers=headers)
+            return self.conn.getresponse()
+        except Exception:
+            # Never reuse a connection in an unknown state.
+            self.close()
+            raise
+
+
+class ResponseStream:
+    """
+    File-like body of a fetched URL, gunzipped on the fly if needed.
+
+    Closing it reads whatever is left of the response, so the connection can be
+    used for the next request, and updates the counters of its HTTPFetcher.
+    """
+
+    def __init__(self, fetcher, response, compressed=False):
+        self.fetcher = fetcher
+        self.raw = response
+        self.response = response
+        self.compressed = compressed
+        self.wire_size = 0  # bytes read from the response
+        self.size = 0  # bytes handed out by read()
+        self.body = None
+        if compressed:
+            self.body = gzip.GzipFile(fileobj=_WireReader(self), mode="rb")
+
+    def read(self, size=-1):
+        if self.body is None:
+            data = self._read_wire(size)
+        else:
+            data = self.body.read(size)
+        self.size += len(data)
+        return data
+
+    def close(self, drain=True):
+        if self.response is None:
+            return
+        response, self.response = self.response, None
+        try:
+            while drain and self._read_wire(65536, response):
+                pass
+        finally:
+            response.close()
+            self.fetcher._finished(self, reuse=drain)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # After an error the connection is in an unknown state, don't reuse it.
+        self.close(drain=exc_type is None)
+
+    def _read_wire(self, size=-1, response=None):
+        data = (response or self.response).read(size)
+        self.wire_size += len(data)
+        return data
+
+
+class _WireReader:
+    """
+    The raw side of a ResponseStream, for GzipFile to read from.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def read(self, size=-1):
+        return self.stream._read_wire(size)
+
+
+class AsyncHTTPFetcher:
+    """
+    HTTPFetcher for asyncio, with the same validators, gzip and counters on a
+    keep-alive connection of its own.  Only http and https URLs.
+
+    A fetch() that is cancelled, for instance by a deadline, leaves the
+    connection in an unknown state: call close() before the next one.
+    """
+
+    def __init__(self, url, timeout=10):
+        self.url = url
+        self.timeout = timeout
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Can't fetch {url} with asyncio, only http(s)")
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        default_port = 443 if parts.scheme == "https" else 80
+        self.port = parts.port or default_port
+        # The Host header names the port too unless it is the default
+        self.host_header = f"[{self.host}]" if ":" in self.host else self.host
+        if self.port != default_port:
+            self.host_header += f":{self.port}"
+        self.path = parts.path or "/"
+        if parts.query:
+            self.path += "?" + parts.query
+        self.reader = None
+        self.writer = None
+        self.etag = None
+        self.last_modified = None
+        self.last_size = 0
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes_received = 0
+        self.bytes_saved = 0
+
+    async def fetch(self):
+        """
+        Returns the body of the URL as bytes, or None if it did not change
+        since the previous fetch.
+        """
+        reused = self.writer is not None
+        try:
+            status, reason, headers, body = await self._request()
+        except (*STALE_CONNECTION_ERRORS, http.client.IncompleteRead):
+            self.close()
+            if not reused:
+                raise
+            logger.debug(
+                "Keep-alive connection to %s was closed, reconnecting", self.host
+            )
+            status, reason, headers, body = await self._request()
+        self.requests += 1
+        self.bytes_received += len(body)
+
+        if status == 304:
+            self.not_modified += 1
+            self.bytes_saved += self.last_size
+            return None
+        if status != 200:
+            self.invalidate()
+            raise HTTPError(self.url, status, reason, headers, None)
+
+        self.etag = headers.get("etag")
+        self.last_modified = headers.get("last-modified")
+        self.last_size = len(body)
+        if headers.get("content-encoding", "").lower() == "gzip":
+            wire_size = len(body)
+            body = gzip.decompress(body)
+            self.bytes_saved += len(body) - wire_size
+        return body
+
+    def invalidate(self):
+        """
+        Forgets the validators, so the next fetch() downloads the full file.
+        """
+        self.etag = None
+        self.last_modified = None
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+    async def _request(self):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.wait_for(
+                asyncio.open_connection(
+                    self.host,
+                    self.port,
+                    ssl=ssl.create_default_context()
+                    if self.scheme == "https"
+                    else None,
+                    limit=MAX_LINE,
+                ),
+                self.timeout,
+            )
+        lines = [
+            f"GET {self.path} HTTP/1.1",
+            f"Host: {self.host_header}",
+            "Accept-Encoding: gzip",
+        ]
+        if self.etag:
+            lines.append(f"If-None-Match: {self.etag}")
+        if self.last_modified:
+            lines.append(f"If-Modified-Since: {self.last_modified}")
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        try:
+            await self.writer.drain()
+            return await asyncio.wait_for(self._response(), self.timeout)
+        except asyncio.IncompleteReadError as e:
+            # Like http.client, so it is handled as any other network error.
+            self.close()
+            raise http.client.IncompleteRead(e.partial, e.expected) from e
+        except ValueError as e:
+            self.close()
+            raise http.client.HTTPException(
+                f"Invalid response from {self.host}: {e}"
+            ) from e
+        except BaseException:
+            # Never reuse a connection in an unknown state.
+            self.close()
+            raise
+
+    async def _response(self):
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise http.client.RemoteDisconnected("Remote end closed connection")
+        try:
+            version, status, *reason = status_line.decode("latin-1").split(None, 2)
+            status = int(status)
+        except ValueError:
+            raise http.client.BadStatusLine(status_line) from None
+        reason = reason[0].strip() if reason else ""
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if status == 304 or status == 204 or 100 <= status < 200:
+            body = b""
+        elif headers.get("transfer-encoding", "").lower() == "chunked":
+            body = await self._read_chunked()
+        elif "content-length" in headers:
+            body = await self.reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await self.reader.read()
+            headers["connection"] = "close"
+
+        if version == "HTTP/1.0" or headers.get("connection", "").lower() == "close":
+            self.close()
+        return status, reason, headers, body
+
+    async def _read_chunked(self):
+        chunks = []
+        while True:
+            size = int((await self.reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                # Trailers, up to the empty line.
+                while (await self.reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(chunks)
+            chunks.append(await self.reader.readexactly(size))
+            await self.reader.readexactly(2)  # CRLF after the chunk
@@ -0,0 +1,108 @@
+#
+# jsondecode.py
+#
+# The JSON decoder for the documents fetched from the data sources.
+#
+# Decoding aircraft.json takes about as long as parsing its aircraft.  orjson
+# and msgspec decode the fetched bytes two to three times faster than the json
+# module, so one of them is used when it is installed (`uv sync --extra json`).
+# All of them take the bytes as they are, without a decoded str copy first.
+#
+# msgspec can also decode aircraft.json of dump1090 straight into typed
+# structs, see Dump1090Document: only the members the parser reads are kept,
+# no dict is built per aircraft and the parser reads attributes instead of
+# looking up keys.  A member of the wrong type fails the refresh like invalid
+# JSON does.
+#
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+# Raised on invalid JSON by any of the backends.
+DecodeError = (json.JSONDecodeError,) + ((msgspec.DecodeError,) if msgspec else ())
+
+if msgspec is not None:
+
+    class Dump1090Aircraft(msgspec.Struct):
+        """
+        The members of an aircraft of aircraft.json that Dump1090DataParser
+        reads, None when missing.
+        """
+
+        hex: str | None = None
+        squawk: str | None = None
+        flight: str | None = None
+        lat: float | None = None
+        lon: float | None = None
+        # Feet, or "ground".
+        alt_baro: float | str | None = None
+        altitude: float | str | None = None
+        vert_rate: float | None = None
+        track: float | None = None
+        speed: float | None = None
+        gs: float | None = None
+        mach: float | None = None
+        messages: int | None = None
+        seen: float | None = None
+        seen_pos: float | None = None
+        rssi: float | None = None
+        # A flag in dump1090, the list of MLAT derived members in readsb.
+        mlat: Any = None
+        nucp: int | None = None
+
+    class Dump1090Document(msgspec.Struct):
+        """
+        aircraft.json of dump1090 / tar1090 / readsb.
+        """
+
+        now: float
+        aircraft: list[Dump1090Aircraft] = []
+
+
+def backends():
+    """
+    Returns {name: loads} of the installed decoders, fastest first.
+    """
+    found = {}
+    if orjson is not None:
+        found["orjson"] = orjson.loads
+    if msgspec is not None:
+        found["msgspec"] = msgspec.json.Decoder().decode
+    found["json"] = json.loads
+    return found
+
+
+def get_decoder(name="auto"):
+    """
+    Returns the loads function of decoder name, or of the fastest installed
+    one for "auto".
+    """
+    found = backends()
+    if name == "auto":
+        return next(iter(found.values()))
+    if name not in ("orjson", "msgspec", "json"):
+        raise ValueError(f"Unknown json_decoder {name}, use orjson, msgspec or json")
+    if name not in found:
+        raise ValueError(f"json_decoder {name} is not installed")
+    return found[name]
+
+
+def get_dump1090_decoder(name="auto"):
+    """
+    Returns a function that decodes aircraft.json of dump1090 into a
+    Dump1090Document, or None when decoder name isn't msgspec, or "auto"
+    without msgspec installed.
+    """
+    if msgspec is None or name not in ("auto", "msgspec"):
+        return None
+    return msgspec.json.Decoder(Dump1090Document).decode
@@ -0,0 +1,129 @@
+#
+# jsonstream.py
+#
+# Incremental walking of a JSON document, one array element at a time.
+#
+# aircraft.json from an aggregator can hold thousands of aircraft.  Instead of
+# reading the whole response, decoding it to a str and building the complete
+# object tree, iter_array() reads the response in chunks and hands out each
+# element of the aircraft array as soon as it has been received in full.
+#
+
+import codecs
+import json
+
+CHUNK_SIZE = 65536
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+# In valid JSON a value is never directly followed by one of these, so seeing
+# one means a number was cut short by the end of the buffer ("1706." or "1e").
+_NUMBER_CONTINUATION = "0123456789+-.eE"
+
+
+class _Reader:
+    """
+    A growing window of decoded text on top of a binary stream.
+    """
+
+    def __init__(self, stream, chunk_size):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def more(self):
+        """
+        Reads the next chunk, returns False at the end of the stream.
+        """
+        if self.eof:
+            return False
+        data = self.stream.read(self.chunk_size)
+        self.eof = not data
+        # Drop what has been consumed so the buffer doesn't grow with the document.
+        self.buf = self.buf[self.pos :] + self.decoder.decode(data, final=self.eof)
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """
+        Returns the next non-whitespace character, without consuming it.
+        """
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.more():
+                raise json.JSONDecodeError("Unexpected end of data", self.buf, self.pos)
+
+    def expect(self, chars):
+        c = self.peek()
+        if c not in chars:
+            raise json.JSONDecodeError(
+                "Expecting one of {!r}".format(chars), self.buf, self.pos
+            )
+        self.pos += 1
+        return c
+
+    def value(self):
+        """
+        Decodes the next complete JSON value.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.more():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next chunk.
+            if (
+                end == len(self.buf) or self.buf[end] in _NUMBER_CONTINUATION
+            ) and self.more():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_array(stream, key, header=None, chunk_size=CHUNK_SIZE):
+    """
+    Yields the elements of the array stored under `key` in the top level JSON
+    object read from the binary `stream`, one at a time.
+
+    All other top level members are stored in the `header` dict, when given.
+    Members that come before the array are available as soon as its first
+    element is yielded, the rest once the generator is exhausted.
+
+    Raises json.JSONDecodeError on malformed or truncated input.
+    """
+    if header is None:
+        header = {}
+    reader = _Reader(stream, chunk_size)
+    reader.expect("{")
+    if reader.peek() == "}":
+        reader.pos += 1
+        return
+    while True:
+        name = reader.value()
+        if not isinstance(name, str):
+            raise json.JSONDecodeError(
+                "Expecting property name", reader.buf, reader.pos
+            )
+        reader.expect(":")
+        if name == key and reader.peek() == "[":
+            reader.pos += 1
+            if reader.peek() == "]":
+                reader.pos += 1
+            else:
+                while True:
+                    yield reader.value()
+                    if reader.expect(",]") == "]":
+                        break
+        else:
+            header[name] = reader.value()
+        if reader.expect(",}") == "}":
+            return
@@ -0,0 +1,140 @@
+#
+# lookupcache.py
+#
+# Cache of the hexdb.io answers of aircraftdata.py.
+#
+# The same airframes and callsigns pass over every day, and without a cache
+# every post costs nine requests to hexdb.io.  LookupCache keeps the answers in
+# a bounded in-process LRU in front of an SQLite database, so they survive a
+# restart.  Each kind of lookup has its own time to live: a registration
+# hardly ever changes, the route flown under a callsign does.  An unknown
+# answer is kept for a shorter time, it may be known by then.
+#
+
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+
+HOUR = 3600
+
+# Time to live of the answers in seconds, by kind of lookup.
+TTLS = {
+    "regis": 30 * 24 * HOUR,
+    "plane": 30 * 24 * HOUR,
+    "oper": 7 * 24 * HOUR,
+    "route": 24 * HOUR,
+}
+
+# Time to live of an unknown ("n/a") answer, which may be known later.
+UNKNOWN_TTL = 6 * HOUR
+
+CAPACITY = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS lookups (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (kind, key)
+)
+"""
+
+
+class LookupCache:
+    """
+    Answers by (kind, key), in memory and, with a path, in an SQLite database
+    in WAL mode.  At most capacity answers are kept in memory, the least
+    recently used ones are dropped first.  ttls overrides TTLS for some kinds,
+    unknown_ttl is the time to live of unknown answers.
+
+    hits, disk_hits and misses count the get() calls by kind: answers from
+    memory, from the database, and not cached.
+    """
+
+    def __init__(
+        self,
+        path=None,
+        capacity=CAPACITY,
+        ttls=None,
+        clock=time.time,
+        unknown_ttl=UNKNOWN_TTL,
+    ):
+        self.capacity = capacity
+        self.ttls = {**TTLS, **(ttls or {})}
+        self.unknown_ttl = unknown_ttl
+        self.clock = clock
+        self.hits = Counter()
+        self.disk_hits = Counter()
+        self.misses = Counter()
+        self._memory = OrderedDict()  # {(kind, key): (expires, value)}
+        # The lookups may come from more than one thread.
+        self._lock = threading.Lock()
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            with self._db:
+                self._db.execute(_SCHEMA)
+                self._db.execute(
+                    "DELETE FROM lookups WHERE expires <= ?", (self.clock(),)
+                )
+
+    def get(self, kind, key):
+        """
+        Returns the cached answer of lookup kind for key, or None.
+        """
+        now = self.clock()
+        with self._lock:
+            entry = self._memory.get((kind, key))
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end((kind, key))
+                    self.hits[kind] += 1
+                    return entry[1]
+                del self._memory[(kind, key)]
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT expires, value FROM lookups WHERE kind = ? AND key = ?",
+                    (kind, key),
+                ).fetchone()
+                if row is not None and row[0] > now:
+                    self._remember((kind, key), row)
+                    self.disk_hits[kind] += 1
+                    return row[1]
+            self.misses[kind] += 1
+            return None
+
+    def put(self, kind, key, value, unknown=False):
+        """
+        Caches value as the answer of lookup kind for key, for a shorter time
+        when it is unknown.
+        """
+        ttl = self.ttls[kind]
+        if unknown:
+            ttl = min(ttl, self.unknown_ttl)
+        entry = (self.clock() + ttl, value)
+        with self._lock:
+            self._remember((kind, key), entry)
+            if self._db is not None:
+                with self._db:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO lookups VALUES (?, ?, ?, ?)",
+                        (kind, key, value, entry[0]),
+                    )
+
+    def _remember(self, kind_key, entry):
+        self._memory[kind_key] = entry
+        self._memory.move_to_end(kind_key)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+    def __len__(self):
+        return len(self._memory)
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,126 @@
+#
+# prefetch.py
+#
+# Look up the aircraft in the background before they are posted.
+#
+# post_aircraft_update() asks hexdb.io for the registration, type, operator and
+# route of an aircraft when it has already left the alarm zone, so every
+# request adds to the time until the post.  The Prefetcher starts these
+# lookups on a few worker threads as soon as an aircraft (or its callsign) can
+# reach the zone within `lead` seconds, and aircraftdata.cache keeps the
+# answers for the post.  Each aircraft is looked up once, and at most
+# max_pending lookups wait at a time: in a busy sky the rest are dropped and
+# tried again on a later refresh, they can't pile up on hexdb.io.
+#
+
+import concurrent.futures
+import threading
+from collections import OrderedDict
+
+import aircraftdata
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+WORKERS = 2
+MAX_PENDING = 32
+
+# Seconds before an aircraft can reach the alarm zone to look it up.
+LEAD = 300
+
+# Lookups remembered, so they aren't started again.
+REMEMBER = 4096
+
+
+def flight_key(a):
+    """
+    Returns the callsign of aircraft a as post_aircraft_update() looks it up.
+    """
+    return (a.flight or a.hex).replace(" ", "")
+
+
+class Prefetcher:
+    """
+    Runs lookup(hex, flight) in the background, aircraftdata.lookup_all by
+    default.  submitted, dropped and failed count the lookups.
+    """
+
+    def __init__(
+        self,
+        lookup=None,
+        workers=WORKERS,
+        max_pending=MAX_PENDING,
+        lead=LEAD,
+        remember=REMEMBER,
+    ):
+        self.lookup = lookup
+        self.max_pending = max_pending
+        self.lead = lead
+        self.remember = remember
+        self.submitted = 0
+        self.dropped = 0
+        self.failed = 0
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            workers, thread_name_prefix="prefetch"
+        )
+        self._futures = OrderedDict()  # {(hex, flight): future}, oldest first
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, hex, flight):
+        """
+        Starts the lookup of hex and flight unless it was started before or
+        too many are waiting.  Returns True when it was started.
+        """
+        key = (hex, flight)
+        with self._lock:
+            if key in self._futures:
+                return False
+            if self._pending >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending += 1
+            self.submitted += 1
+            self._futures[key] = self._executor.submit(self._fetch, hex, flight)
+            while len(self._futures) > self.remember:
+                oldest = next(iter(self._futures))
+                if not self._futures[oldest].done():
+                    break
+                del self._futures[oldest]
+        return True
+
+    def _fetch(self, hex, flight):
+        try:
+            (self.lookup or aircraftdata.lookup_all)(hex, flight)
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            logger.warning("Prefetch of %s failed: %s", hex, e)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def watch(self, aircraft, time_to_zone):
+        """
+        Starts the lookups of the aircraft that time_to_zone(a) says can reach
+        the alarm zone within lead seconds.
+        """
+        for a in aircraft:
+            if time_to_zone(a) <= self.lead:
+                self.submit(a.hex, flight_key(a))
+
+    def wait(self, hex, flight, timeout=None):
+        """
+        Waits for a running lookup of hex and flight, so it isn't asked twice.
+        """
+        future = self._futures.get((hex, flight))
+        if future is not None:
+            concurrent.futures.wait([future], timeout)
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
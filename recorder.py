@@ -0,0 +1,176 @@
+#
+# recorder.py
+#
+# Record the flight data as it is fetched, and replay it later.
+#
+# The log is an append-only gzip file with one frame per refresh: the time it
+# was fetched and the length of the data, followed by the data exactly as the
+# receiver sent it (aircraft.json, AircraftList.json or binCraft).  Every frame
+# is flushed, so a log that was cut short is readable up to its last complete
+# frame.  Recording again to the same file adds a gzip member, which reads as
+# one continuous log.
+#
+# The "replay" driver feeds a log back through FlightData and the parser of
+# the driver it was recorded with, at the recorded pace or N times as fast.
+# Every frame is replayed, also when the tracker polls less often than the
+# frames were recorded, so no zone crossing of the log is missed; the tracker
+# sleeps replay_speed times shorter to keep up, see scheduler.PollScheduler.
+#
+
+import gzip
+import io
+import struct
+import time
+import zlib
+from urllib.parse import urlsplit
+from urllib.request import url2pathname
+
+import flightdata
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+FRAME = struct.Struct("<dI")  # time.time() of the fetch, length of the data
+
+
+class Recorder:
+    """
+    Appends the data of every refresh to the log at path.
+    """
+
+    def __init__(self, path, compresslevel=6):
+        self.path = path
+        self.file = gzip.open(path, "ab", compresslevel=compresslevel)
+        self.frames = 0
+
+    def write(self, raw_data, when=None):
+        self.file.write(FRAME.pack(when or time.time(), len(raw_data)))
+        self.file.write(raw_data)
+        self.file.flush()
+        self.frames += 1
+
+    def tee(self, stream):
+        """
+        Returns stream, which writes a frame of all data read from it when it
+        is closed after a complete read.  For FlightData in streaming mode.
+        """
+        return _Tee(self, stream)
+
+    def close(self):
+        self.file.close()
+
+
+class _Tee:
+    """
+    A stream of the data source that keeps a copy of what is read, for the log.
+    """
+
+    def __init__(self, recorder, stream):
+        self.recorder = recorder
+        self.stream = stream
+        self.copy = io.BytesIO()
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.copy.write(data)
+        return data
+
+    def __enter__(self):
+        self.stream.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # A refresh that failed halfway isn't recorded, like in update().
+        if exc_type is None:
+            self.recorder.write(self.copy.getvalue())
+        return self.stream.__exit__(exc_type, exc, tb)
+
+
+def read_frames(path):
+    """
+    Yields (time, data) of every frame of the log at path, up to the first one
+    that is incomplete.
+    """
+    with gzip.open(path, "rb") as f:
+        try:
+            while True:
+                header = f.read(FRAME.size)
+                if len(header) < FRAME.size:
+                    return
+                when, size = FRAME.unpack(header)
+                data = f.read(size)
+                if len(data) < size:
+                    return
+                yield when, data
+        except (EOFError, gzip.BadGzipFile, zlib.error) as e:
+            logger.warning(f"Log {path} ends with an incomplete frame: {e}")
+
+
+class LogFetcher:
+    """
+    Stands in for the HTTPFetcher of a FlightData, fetch() returns the data of
+    the log instead.
+
+    With speed 0 every fetch() returns the next frame.  Otherwise the frames
+    follow a clock that runs speed times as fast as the recording: fetch()
+    returns the next frame once it is due, or None when it isn't yet.  A
+    frame is never skipped: when the fetches fall behind the clock, each one
+    returns the next frame until they have caught up.  finished is set once
+    all frames have been returned.
+    """
+
+    def __init__(self, path, speed=1):
+        self.path = path
+        self.speed = speed
+        self.frames = read_frames(path)
+        self.next = next(self.frames, None)
+        self.start = None  # (time.monotonic(), time of the first frame)
+        self.finished = False
+        self.requests = 0
+        self.bytes_saved = 0
+
+    def fetch(self):
+        if self.next is None:
+            self.finished = True
+            return None
+        self.requests += 1
+        if self.speed <= 0:
+            frame = self.next
+            self.next = next(self.frames, None)
+            return frame[1]
+
+        now = time.monotonic()
+        if self.start is None:
+            self.start = (now, self.next[0])
+        clock = self.start[1] + (now - self.start[0]) * self.speed
+        if self.next[0] > clock:
+            return None
+        frame = self.next
+        self.next = next(self.frames, None)
+        return frame[1]
+
+    def invalidate(self):
+        pass
+
+    def close(self):
+        self.frames.close()
+
+
+class ReplayFlightData(flightdata.FlightData):
+    """
+    FlightData that replays a log written by Recorder, data_url is its path
+    or file:// URL.
+    """
+
+    def __init__(self, data_url=None, parser=None, speed=1):
+        path = data_url
+        if urlsplit(data_url).scheme == "file":
+            path = url2pathname(urlsplit(data_url).path)
+        super().__init__(
+            data_url=data_url, parser=parser, fetcher=LogFetcher(path, speed)
+        )
+
+    @property
+    def finished(self):
+        return self.fetcher.finished
@@ -0,0 +1,193 @@
+#
+# sbs.py
+#
+# Push based data source: the SBS-1 (BaseStation) output of dump1090/readsb.
+#
+# Instead of polling aircraft.json, SBSFlightData keeps a TCP connection to the
+# SBS port (30003) open and updates an aircraft table with every message as it
+# arrives.  refresh() only takes a snapshot of that table, so the tracker can
+# poll it as often as it likes without any network traffic.
+#
+# Format of a message (fields that aren't used are left out):
+#
+#   MSG,3,1,1,4840D6,1,2024/01/27,14:30:00.000,2024/01/27,14:30:00.000,,15000,,,53.30000,6.60000,,,0,0,0,0
+#    0  1       4                                                    10  11 12 13   14       15  16 17    21
+#
+#   1: transmission type, 4: ICAO hex, 10: callsign, 11: altitude (ft),
+#   12: ground speed (kt), 13: track, 14/15: lat/lon, 16: vertical rate (ft/min),
+#   17: squawk, 21: on the ground
+#
+
+import socket
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import flightdata
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 30003
+RECONNECT_DELAY = 5  # seconds between connection attempts
+EXPIRE_AFTER = 60  # seconds without messages before an aircraft is dropped
+
+# SBS field -> (aircraft.json key, conversion)
+FIELDS = {
+    10: ("flight", str),
+    11: ("alt_baro", int),
+    12: ("gs", float),
+    13: ("track", float),
+    14: ("lat", float),
+    15: ("lon", float),
+    16: ("vert_rate", int),
+    17: ("squawk", str),
+}
+
+
+def apply_message(table, line, now):
+    """
+    Updates the aircraft table (hex -> state) with one SBS message received
+    at time now.  The state uses the aircraft.json keys, so it can be parsed
+    by Dump1090DataParser.  Returns False for lines that aren't a MSG.
+    """
+    fields = line.strip().split(",")
+    if len(fields) < 18 or fields[0] != "MSG" or not fields[4]:
+        return False
+    hexcode = fields[4].lower()
+    state = table.get(hexcode)
+    if state is None:
+        state = table[hexcode] = {"hex": hexcode, "messages": 0}
+    state["messages"] += 1
+    state["last_msg"] = now
+    for i, (key, convert) in FIELDS.items():
+        value = fields[i].strip()
+        if value:
+            try:
+                state[key] = convert(value)
+            except ValueError:
+                continue
+            if key == "lat":
+                state["last_pos"] = now
+    if len(fields) > 21 and fields[21].strip() in ("-1", "1"):
+        state["alt_baro"] = "ground"
+    return True
+
+
+def snapshot(state, now):
+    """
+    Returns the aircraft.json entry for a table state at time now.
+    """
+    a = {k: v for k, v in state.items() if k not in ("last_msg", "last_pos")}
+    a["seen"] = round(now - state["last_msg"], 1)
+    if "last_pos" in state:
+        a["seen_pos"] = round(now - state["last_pos"], 1)
+    return a
+
+
+class SBSDataParser(flightdata.Dump1090DataParser):
+    """
+    Parses the snapshots of SBSFlightData, which look like aircraft.json.
+    """
+
+
+class SBSFlightData:
+    """
+    FlightData that is fed by an SBS-1 TCP stream, data_url is
+    tcp://<host>:30003.  A background thread keeps the connection open,
+    reconnecting when it drops, and keeps the aircraft table up to date.
+    """
+
+    def __init__(self, data_url=None, parser=None, timeout=10):
+        self.data_url = data_url
+        self.parser = parser
+        self.timeout = timeout
+        parts = urlsplit(data_url)
+        self.address = (parts.hostname, parts.port or DEFAULT_PORT)
+        self.table = {}
+        self.lock = threading.Lock()
+        self.messages = 0
+        self.connected = threading.Event()
+        self._stop = threading.Event()
+        self.sock = None
+        self.aircraft = None
+        self.time = None
+        self.delta = flightdata.Delta()
+        self.index = {}
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        self.refresh()
+
+    def refresh(self):
+        now = time.time()
+        with self.lock:
+            for hexcode in [
+                h for h, s in self.table.items() if now - s["last_msg"] > EXPIRE_AFTER
+            ]:
+                del self.table[hexcode]
+            states = [snapshot(s, now) for s in self.table.values()]
+        self.json_data = {"now": now, "messages": self.messages, "aircraft": states}
+        self.time = datetime.fromtimestamp(now)
+        try:
+            self.aircraft = self.parser.aircraft_data(self.json_data, self.time)
+        except Exception as e:
+            logger.error("Invalid SBS aircraft table: %s", e, exc_info=True)
+            self.fail()
+            return
+        self.delta = self.parser.delta
+        self.index = self.parser.index
+
+    def fail(self):
+        self.aircraft = []
+        # All aircraft are gone, they enter again on the next good refresh.
+        self.delta = self.parser.clear()
+        self.index = {}
+
+    def close(self):
+        self._stop.set()
+        sock = self.sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                with socket.create_connection(self.address, self.timeout) as sock:
+                    logger.info("Connected to SBS feed at %s:%s", *self.address)
+                    self.sock = sock
+                    self.connected.set()
+                    self._read(sock)
+            except OSError as e:
+                if not self._stop.is_set():
+                    logger.error(f"SBS feed at {self.data_url} failed: {e}")
+            self.sock = None
+            self.connected.clear()
+            self._stop.wait(RECONNECT_DELAY)
+
+    def _read(self, sock):
+        # Short timeouts so close() doesn't have to wait for the next message.
+        sock.settimeout(1.0)
+        buf = b""
+        while not self._stop.is_set():
+            try:
+                data = sock.recv(65536)
+            except TimeoutError:
+                continue
+            if not data:
+                if self._stop.is_set():
+                    return
+                logger.error(f"SBS feed at {self.data_url} closed the connection")
+                return
+            lines = (buf + data).split(b"\n")
+            buf = lines.pop()
+            now = time.time()
+            with self.lock:
+                for line in lines:
+                    if apply_message(self.table, line.decode("ascii", "replace"), now):
+                        self.messages += 1
@@ -0,0 +1,130 @@
+#
+# scheduler.py
+#
+# When to refresh the flight data next.
+#
+# Polling every sleep_time seconds is only needed while an aircraft is in or
+# close to the alarm zone.  PollScheduler predicts from the track, speed and
+# position of every aircraft how soon it can reach the zone, and polls at
+# min_interval when that is soon, backing off to max_interval when the sky
+# around the receiver is empty.
+#
+# The refreshes follow a schedule on the monotonic clock: each wait ends
+# interval seconds after the previous deadline rather than after the refresh,
+# so the time a refresh takes doesn't add up.  A refresh that overran its
+# deadline restarts the schedule instead of being followed by a burst.
+#
+
+import math
+import time
+
+# Poll at least this many times before an aircraft can reach the alarm zone.
+POLLS_AHEAD = 4
+
+# No aircraft flies faster (mph over the ground) or higher (feet), and no
+# position is older (seconds), for reach().
+MAX_SPEED = 800
+MAX_ALTITUDE = 60000
+MAX_POSITION_AGE = 60
+
+
+class PollScheduler:
+    """
+    Sleeps between the refreshes, between min_interval and max_interval
+    seconds depending on the aircraft around the alarm zone.  When the flight
+    data runs speed times as fast as the clock, as in a replay, it sleeps
+    speed times shorter; with speed 0 it doesn't sleep.
+    """
+
+    def __init__(
+        self,
+        zone,
+        min_interval,
+        max_interval,
+        clock=time.monotonic,
+        sleep=time.sleep,
+        speed=1,
+    ):
+        self.zone = zone
+        self.speed = speed
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.interval = self.max_interval
+        self.clock = clock
+        self._sleep = sleep
+        self.deadline = None
+        self.overruns = 0  # refreshes that took longer than the interval
+
+    def time_to_zone(self, a):
+        """
+        Returns the seconds aircraft a needs at least to reach the alarm zone,
+        flying straight on at its speed.  0 when it's inside, math.inf when it
+        can't be predicted or is flying away.
+        """
+        if a.lat is None or a.lon is None or a.track is None or not a.speed:
+            return math.inf
+        zone = self.zone
+        # Towards the receiver, in miles in the flat plane of the zone.
+        east = (zone.lon - a.lon) * zone.kx
+        north = (zone.lat - a.lat) * zone.ky
+        distance = math.hypot(east, north)
+        gap = distance - zone.radius(a.altitude)
+        if gap <= 0:
+            return 0
+        track = math.radians(a.track)
+        # Speed towards the receiver, in mph like a.speed.
+        closing = (
+            a.speed * (east * math.sin(track) + north * math.cos(track)) / distance
+        )
+        if closing <= 0:
+            return math.inf
+        # The position is seen_pos seconds old already.
+        return max(0, gap / closing * 3600 - (a.seen_pos or 0))
+
+    def reach(self, seconds):
+        """
+        Returns the distance (miles) from the receiver beyond which no aircraft
+        can reach the alarm zone within seconds, with 10% to spare for the
+        flat plane of time_to_zone().  math.inf when the zone has no bounds.
+        """
+        radius = self.zone.radius(MAX_ALTITUDE)
+        return 1.1 * (radius + MAX_SPEED * (seconds + MAX_POSITION_AGE) / 3600)
+
+    def horizon(self):
+        """
+        Returns the seconds beyond which the time to the zone of an aircraft
+        no longer changes the interval.
+        """
+        return self.max_interval * POLLS_AHEAD
+
+    def plan(self, aircraft, inside=(), pending=()):
+        """
+        Sets the interval until the next refresh from the aircraft of the last
+        one, or only those within reach(horizon()) of the receiver.  inside is
+        true when any of them is in an alarm zone, pending when any alarm
+        still counts down to its post.  Returns it.
+        """
+        # The wait_x_updates countdown and the screenshot after it need the
+        # refreshes at min_interval, also once the aircraft has left the zone.
+        if inside or pending or self.min_interval >= self.max_interval:
+            self.interval = self.min_interval
+        else:
+            soonest = min(map(self.time_to_zone, aircraft or ()), default=math.inf)
+            self.interval = min(
+                max(soonest / POLLS_AHEAD, self.min_interval), self.max_interval
+            )
+        return self.interval
+
+    def sleep(self):
+        """
+        Sleeps until the next refresh is due.
+        """
+        now = self.clock()
+        if self.deadline is None:
+            self.deadline = now
+        self.deadline += self.interval / self.speed if self.speed > 0 else 0
+        if self.deadline < now:
+            self.overruns += 1
+            self.deadline = now
+        else:
+            self._sleep(self.deadline - now)
@@ -5,9 +5,51 @@ Pytest configuration and shared fixtures for AboveGRQ tests.
 import pytest
 from datetime import datetime
 from configparser import ConfigParser
+from unittest.mock import patch
+import math
 import shutil
 import os
 
+# The receiver of test-config.ini, (latitude, longitude).
+RECEIVER = (53.215119, 6.570963)
+
+
+def make_aircraft(north=0, east=0, **fields):
+    """
+    Returns an AircraftData north and east miles from the receiver, flying
+    east at 3000 ft, with the given fields instead.  The fields not given
+    are unknown.
+    """
+    # flightdata reads config.ini on import, which pytest_configure creates.
+    import alarmzone
+    import flightdata
+
+    kx = alarmzone.MI_PER_DEG_LAT * math.cos(math.radians(RECEIVER[0]))
+    values = dict(
+        dhex="ABC123",
+        squawk=None,
+        flight=None,
+        registration=None,
+        lat=RECEIVER[0] + north / alarmzone.MI_PER_DEG_LAT,
+        lon=RECEIVER[1] + east / kx,
+        altitude=3000,
+        vert_rate=0,
+        track=90,
+        speed=300,
+        messages=None,
+        seen=None,
+        mlat=None,
+        nucp=None,
+        seen_pos=None,
+        rssi=None,
+        dist=-1,
+        az=0,
+        el=0,
+        time=datetime(2024, 1, 27),
+    )
+    values.update(fields)
+    return flightdata.AircraftData(**values)
+
 
 def pytest_configure(config):
     """
@@ -50,6 +92,31 @@ def receiver_coords():
     return (lat, lon)
 
 
+@pytest.fixture
+def at_receiver():
+    """
+    Fixture placing the receiver of flightdata at RECEIVER, with the exact
+    geometry, whatever config.ini says.  Returns RECEIVER.
+    """
+    with (
+        patch("flightdata.receiver_latitude", RECEIVER[0]),
+        patch("flightdata.receiver_longitude", RECEIVER[1]),
+        patch("flightdata.receiver_frame", None),
+    ):
+        yield RECEIVER
+
+
+@pytest.fixture
+def locate(at_receiver):
+    """
+    Fixture returning a function that locates an aircraft from RECEIVER the
+    way the parsers do, and returns it.
+    """
+    import flightdata
+
+    return flightdata.Dump1090DataParser()._locate
+
+
 @pytest.fixture
 def mock_aircraft_data():
     """
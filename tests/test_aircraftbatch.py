@@ -0,0 +1,143 @@
+"""
+Tests for aircraftbatch.py - vectorized distance, bearing and elevation.
+
+Checks the NumPy results against the scalar code path in flightdata.py.
+"""
+
+import random
+from unittest.mock import patch
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import aircraftbatch
+import flightdata
+import geomath
+from tests.conftest import RECEIVER, make_aircraft
+
+
+def scattered(n, seed=42):
+    rnd = random.Random(seed)
+    return [
+        make_aircraft(
+            dhex="{:06X}".format(i),
+            lat=RECEIVER[0] + rnd.uniform(-2, 2),
+            lon=RECEIVER[1] + rnd.uniform(-3, 3),
+            altitude=rnd.uniform(0, 40000),
+            track=rnd.uniform(0, 360),
+            speed=rnd.uniform(100, 600),
+        )
+        for i in range(n)
+    ]
+
+
+class TestAircraftBatch:
+    """Tests for AircraftBatch."""
+
+    def test_locate_matches_scalar(self, locate):
+        """Test that the vectorized pass gives the scalar results."""
+        batch_aircraft = scattered(200)
+        scalar_aircraft = scattered(200)
+
+        for a in scalar_aircraft:
+            locate(a)
+        aircraftbatch.AircraftBatch(batch_aircraft).locate(*RECEIVER)
+
+        for b, s in zip(batch_aircraft, scalar_aircraft):
+            assert b.distance == pytest.approx(s.distance, rel=1e-9)
+            assert b.az == pytest.approx(s.az, abs=1e-9)
+            assert b.el == pytest.approx(s.el, abs=1e-9)
+            assert b.slant == pytest.approx(s.slant, rel=1e-9)
+
+    def test_local_frame_matches_scalar(self, locate):
+        """Test the flat frame in the vectorized pass and in _locate()."""
+        batch_aircraft = scattered(200)
+        scalar_aircraft = scattered(200)
+        frame = geomath.LocalFrame(*RECEIVER)
+
+        with patch("flightdata.receiver_frame", frame):
+            for a in scalar_aircraft:
+                locate(a)
+        aircraftbatch.AircraftBatch(batch_aircraft).locate(*RECEIVER, frame=frame)
+
+        for b, s in zip(batch_aircraft, scalar_aircraft):
+            assert s.distance == frame.locate(s.lat, s.lon, s.altitude)[0]
+            assert b.distance == pytest.approx(s.distance, rel=1e-9)
+            assert b.az == pytest.approx(s.az, abs=1e-9)
+            assert b.el == pytest.approx(s.el, abs=1e-9)
+
+    def test_ecef_matches_scalar(self, locate):
+        """Test the ECEF frame in the vectorized pass and in _locate()."""
+        batch_aircraft = scattered(200)
+        scalar_aircraft = scattered(200)
+        frame = geomath.EcefFrame(*RECEIVER, altitude=30)
+
+        with patch("flightdata.receiver_frame", frame):
+            for a in scalar_aircraft:
+                locate(a)
+        batch = aircraftbatch.AircraftBatch(batch_aircraft).locate(
+            *RECEIVER, frame=frame
+        )
+
+        for b, s in zip(batch_aircraft, scalar_aircraft):
+            assert s.slant == frame.locate(s.lat, s.lon, s.altitude)[3]
+            assert b.distance == pytest.approx(s.distance, rel=1e-9)
+            assert b.az == pytest.approx(s.az, abs=1e-9)
+            assert b.el == pytest.approx(s.el, abs=1e-9)
+            assert b.slant == pytest.approx(s.slant, rel=1e-9)
+        assert batch.slant.tolist() == [a.slant for a in batch_aircraft]
+
+    def test_columns(self):
+        """Test that the columns hold the aircraft values."""
+        aircraft = scattered(3)
+        batch = aircraftbatch.AircraftBatch(aircraft)
+
+        assert len(batch) == 3
+        assert batch[1] is aircraft[1]
+        assert batch.lat.tolist() == [a.lat for a in aircraft]
+        assert batch.track.tolist() == [a.track for a in aircraft]
+
+    def test_aircraft_without_position(self):
+        """Test aircraft without lat/lon and right above the receiver."""
+        aircraft = scattered(3)
+        aircraft[0].lat = aircraft[0].lon = None
+        aircraft[1].lat, aircraft[1].lon = RECEIVER
+
+        batch = aircraftbatch.AircraftBatch(aircraft).locate(*RECEIVER)
+
+        assert (aircraft[0].distance, aircraft[0].az, aircraft[0].el) == (-1, 0, 0)
+        assert aircraft[1].distance == 0
+        assert aircraft[1].el == 0
+        assert aircraft[2].distance > 0
+        assert batch.distance[0] == -1
+
+    def test_parser_uses_batch(self, at_receiver, sample_datetime):
+        """Test that the parsers locate large refreshes as a batch."""
+        data = {
+            "now": 1706360400.0,
+            "aircraft": [
+                {"hex": "{:06x}".format(i), "lat": 53.3, "lon": 6.6, "altitude": 5000}
+                for i in range(aircraftbatch.MIN_BATCH_SIZE)
+            ],
+        }
+        parser = flightdata.Dump1090DataParser()
+
+        with patch.object(
+            aircraftbatch.AircraftBatch,
+            "locate",
+            autospec=True,
+            side_effect=aircraftbatch.AircraftBatch.locate,
+        ) as mock_locate:
+            aircraft_list = parser.aircraft_data(data, sample_datetime)
+
+        mock_locate.assert_called_once()
+        assert all(a.distance > 0 for a in aircraft_list)
+
+    def test_receiver_trig_cached(self):
+        """Test that the receiver trig is only computed once."""
+        aircraftbatch.receiver_trig.cache_clear()
+        aircraftbatch.receiver_trig(*RECEIVER)
+        aircraftbatch.receiver_trig(*RECEIVER)
+
+        assert aircraftbatch.receiver_trig.cache_info().hits == 1
@@ -5,7 +5,12 @@ These tests mock HTTP requests to avoid actual API calls.
 """
 
 from unittest.mock import Mock, patch
+
+import requests
+
 import aircraftdata
+import circuitbreaker
+import lookupcache
 
 
 class TestRegis:
@@ -13,20 +18,22 @@ class TestRegis:
 
     def test_regis_valid_hex(self, mock_http_responses):
         """Test registration lookup with valid hex code."""
-        with patch("aircraftdata.requests.get") as mock_get:
-            mock_response = Mock()
+        with patch("aircraftdata.session.get") as mock_get:
+            mock_response = Mock(status_code=200)
             mock_response.text = mock_http_responses["hex-reg"]["abc123"]
             mock_get.return_value = mock_response
 
             result = aircraftdata.regis("abc123")
 
             assert result == "PH-BXA"
-            mock_get.assert_called_once_with("https://hexdb.io/hex-reg?hex=abc123")
+            mock_get.assert_called_once_with(
+                "https://hexdb.io/hex-reg?hex=abc123", timeout=aircraftdata.TIMEOUT
+            )
 
     def test_regis_unknown_hex(self):
         """Test registration lookup with unknown hex code."""
-        with patch("aircraftdata.requests.get") as mock_get:
-            mock_response = Mock()
+        with patch("aircraftdata.session.get") as mock_get:
+            mock_response = Mock(status_code=200)
             mock_response.text = "n/a"
             mock_get.return_value = mock_response
 
@@ -45,20 +52,22 @@ class TestPlane:
 
     def test_plane_valid_hex(self, mock_http_responses):
         """Test aircraft type lookup with valid hex code."""
-        with patch("aircraftdata.requests.get") as mock_get:
-            mock_response = Mock()
+        with patch("aircraftdata.session.get") as mock_get:
+            mock_response = Mock(status_code=200)
             mock_response.text = mock_http_responses["hex-type"]["abc123"]
             mock_get.return_value = mock_response
 
             result = aircraftdata.plane("abc123")
 
             assert result == "Boeing 737-800"
-            mock_get.assert_called_once_with("https://hexdb.io/hex-type?hex=abc123")
+            mock_get.assert_called_once_with(
+                "https://hexdb.io/hex-type?hex=abc123", timeout=aircraftdata.TIMEOUT
+            )
 
     def test_plane_unknown_hex(self):
         """Test aircraft type lookup with unknown hex code."""
-        with patch("aircraftdata.requests.get") as mock_get:
-            mock_response = Mock()
+        with patch("aircraftdata.session.get") as mock_get:
+            mock_response = Mock(status_code=200)
             mock_response.text = "n/a"
             mock_get.return_value = mock_response
 
@@ -77,20 +86,22 @@ class TestOper:
 
     def test_oper_valid_hex(self, mock_http_responses):
         """Test airline lookup with valid hex code."""
-        with patch("aircraftdata.requests.get") as mock_get:
-            mock_response = Mock()
+        with patch("aircraftdata.session.get") as mock_get:
+            mock_response = Mock(status_code=200)
             mock_response.text = mock_http_responses["hex-airline"]["abc123"]
             mock_get.return_value = mock_response
 
             result = aircraftdata.oper("abc123")
 
             assert result == "KLM Royal Dutch Airlines"
-            mock_get.assert_called_once_with("https://hexdb.io/hex-airline?hex=abc123")
+            mock_get.assert_called_once_with(
+                "https://hexdb.io/hex-airline?hex=abc123", timeout=aircraftdata.TIMEOUT
+            )
 
     def test_oper_unknown_hex(self):
         """Test airline lookup with unknown hex code."""
-        with patch("aircraftdata.requests.get") as mock_get:
-            mock_response = Mock()
+        with patch("aircraftdata.session.get") as mock_get:
+            mock_response = Mock(status_code=200)
             mock_response.text = "n/a"
             mock_get.return_value = mock_response
 
@@ -109,10 +120,10 @@ class TestRoute:
 
     def test_route_valid_flight(self, mock_http_responses):
         """Test route lookup with valid flight callsign."""
-        with patch("aircraftdata.requests.get") as mock_get:
+        with patch("aircraftdata.session.get") as mock_get:
             # Create a side effect function to return different responses
-            def get_response(url):
-                mock_resp = Mock()
+            def get_response(url, timeout):
+                mock_resp = Mock(status_code=200)
                 if "callsign-origin_icao" in url:
                     mock_resp.text = "EHAM"
                 elif "callsign-des_icao" in url:
@@ -136,8 +147,8 @@ class TestRoute:
 
     def test_route_unknown_flight(self):
         """Test route lookup with unknown flight."""
-        with patch("aircraftdata.requests.get") as mock_get:
-            mock_response = Mock()
+        with patch("aircraftdata.session.get") as mock_get:
+            mock_response = Mock(status_code=200)
             mock_response.text = "n/a"
             mock_get.return_value = mock_response
 
@@ -152,10 +163,10 @@ class TestRoute:
 
     def test_route_domestic_flight(self):
         """Test route lookup for a domestic flight."""
-        with patch("aircraftdata.requests.get") as mock_get:
+        with patch("aircraftdata.session.get") as mock_get:
 
-            def get_response(url):
-                mock_resp = Mock()
+            def get_response(url, timeout):
+                mock_resp = Mock(status_code=200)
                 if "callsign-origin_icao" in url:
                     mock_resp.text = "EGLL"
                 elif "callsign-des_icao" in url:
@@ -184,10 +195,10 @@ class TestIntegration:
         """Test complete aircraft information lookup."""
         hex_code = "abc123"
 
-        with patch("aircraftdata.requests.get") as mock_get:
+        with patch("aircraftdata.session.get") as mock_get:
 
-            def get_response(url):
-                mock_resp = Mock()
+            def get_response(url, timeout):
+                mock_resp = Mock(status_code=200)
                 if "hex-reg" in url:
                     mock_resp.text = "PH-BXA"
                 elif "hex-type" in url:
@@ -214,10 +225,10 @@ class TestIntegration:
             ("789xyz", "G-EUUU", "Airbus A320"),
         ]
 
-        with patch("aircraftdata.requests.get") as mock_get:
+        with patch("aircraftdata.session.get") as mock_get:
 
-            def get_response(url):
-                mock_resp = Mock()
+            def get_response(url, timeout):
+                mock_resp = Mock(status_code=200)
                 if "abc123" in url:
                     if "hex-reg" in url:
                         mock_resp.text = "PH-BXA"
@@ -242,3 +253,158 @@ class TestIntegration:
                 plane_type = aircraftdata.plane(hex_code)
                 assert reg == expected_reg
                 assert plane_type == expected_type
+
+    def test_lookup_all(self):
+        """Test all four lookups at the same time, the route in two rounds."""
+        answers = {
+            "hex-reg": "PH-BXA",
+            "hex-type": "Boeing 737-800",
+            "hex-airline": "KLM",
+            "callsign-origin_icao": "EHAM",
+            "callsign-des_icao": "KJFK",
+        }
+
+        def get_response(url, timeout):
+            assert timeout == aircraftdata.TIMEOUT
+            path, _, query = url.rpartition("/")[2].partition("?")
+            if path == "icao-iata":
+                return Mock(status_code=200, text=query[-4:][1:])
+            if path == "icao-airport":
+                return Mock(status_code=200, text=query[-4:])
+            return Mock(status_code=200, text=answers[path])
+
+        with (
+            patch("aircraftdata.session.get", side_effect=get_response) as mock_get,
+            patch("aircraftdata._get_all", wraps=aircraftdata._get_all) as get_all,
+        ):
+            found = aircraftdata.lookup_all("abc123", "KLM1234")
+
+        assert found == {
+            "regis": "PH-BXA",
+            "plane": "Boeing 737-800",
+            "oper": "KLM",
+            "route": "HAM-JFK EHAM to KJFK",
+        }
+        assert mock_get.call_count == 3 + 6
+        assert get_all.call_count == 2
+
+    def test_lookup_all_none(self):
+        """Test lookup_all without hex or callsign."""
+        with patch("aircraftdata.session.get") as mock_get:
+            assert aircraftdata.lookup_all(None, None) == {
+                "regis": None,
+                "plane": None,
+                "oper": None,
+                "route": None,
+            }
+            mock_get.assert_not_called()
+
+
+class TestCache:
+    """Tests for the cache of the hexdb.io answers."""
+
+    def test_cached_answer(self, mock_http_responses):
+        """Test an aircraft looked up before costs no requests."""
+        with (
+            patch("aircraftdata.cache", lookupcache.LookupCache()),
+            patch("aircraftdata.session.get") as mock_get,
+        ):
+            mock_get.return_value = Mock(
+                status_code=200, text=mock_http_responses["hex-reg"]["abc123"]
+            )
+            assert aircraftdata.regis("abc123") == "PH-BXA"
+            assert aircraftdata.regis("abc123") == "PH-BXA"
+            assert aircraftdata.route("KLM1234") == aircraftdata.route("KLM1234")
+            assert mock_get.call_count == 1 + 6
+
+            assert aircraftdata.cache_summary() == (
+                "hexdb.io cache: 2 of 4 lookups cached (0 from disk), 7 requests saved"
+            )
+
+    def test_unknown_cached_shorter(self):
+        """Test n/a answers are asked again after the shorter time to live."""
+        now = [1706360400.0]
+        with (
+            patch("aircraftdata.cache", lookupcache.LookupCache(clock=lambda: now[0])),
+            patch("aircraftdata.session.get") as mock_get,
+        ):
+            mock_get.return_value = Mock(status_code=200, text="n/a")
+            assert aircraftdata.plane("unknown") == "n/a"
+            assert aircraftdata.plane("unknown") == "n/a"
+            assert mock_get.call_count == 1
+            now[0] += lookupcache.UNKNOWN_TTL
+            assert aircraftdata.plane("unknown") == "n/a"
+            assert mock_get.call_count == 2
+
+    def test_no_cache(self):
+        """Test the summary without a cache."""
+        assert aircraftdata.cache is None
+        assert aircraftdata.cache_summary() == "hexdb.io lookups are not cached"
+
+
+class TestBreaker:
+    """Tests for the lookups while hexdb.io is down."""
+
+    def test_placeholder_when_down(self):
+        """Test failed requests give the placeholder, which isn't cached."""
+        breaker = circuitbreaker.CircuitBreaker("hexdb.io", lambda: False, 2, 3600)
+        with (
+            patch("aircraftdata.breaker", breaker),
+            patch("aircraftdata.cache", lookupcache.LookupCache()),
+            patch("aircraftdata.session.get") as mock_get,
+        ):
+            mock_get.side_effect = requests.Timeout()
+            assert aircraftdata.regis("abc123") == aircraftdata.PLACEHOLDER
+            assert not breaker.is_open
+            assert aircraftdata.route("KLM1234") == aircraftdata.PLACEHOLDER
+            assert breaker.is_open
+            calls = mock_get.call_count
+
+            # Open: no requests at all.
+            assert aircraftdata.lookup_all("abc123", "KLM1234") == {
+                "regis": "n/a",
+                "plane": "n/a",
+                "oper": "n/a",
+                "route": "n/a",
+            }
+            assert mock_get.call_count == calls
+
+            breaker.close()
+            mock_get.side_effect = None
+            mock_get.return_value = Mock(status_code=200, text="PH-BXA")
+            assert aircraftdata.regis("abc123") == "PH-BXA"
+
+    def test_server_errors(self):
+        """Test a 5xx counts as a failure, a 404 "n/a" doesn't."""
+        breaker = circuitbreaker.CircuitBreaker("hexdb.io", lambda: False, 2, 3600)
+        with (
+            patch("aircraftdata.breaker", breaker),
+            patch("aircraftdata.session.get") as mock_get,
+        ):
+            mock_get.return_value = Mock(text="n/a", status_code=404)
+            assert aircraftdata.plane("unknown") == "n/a"
+            assert breaker.failed == 0
+            mock_get.return_value = Mock(text="<html>", status_code=503)
+            assert aircraftdata.plane("abc123") == aircraftdata.PLACEHOLDER
+            assert breaker.failed == 1
+
+    def test_rate_limited(self):
+        """Test a 429 page is no answer: not cached, counted as a failure."""
+        breaker = circuitbreaker.CircuitBreaker("hexdb.io", lambda: False, 2, 3600)
+        with (
+            patch("aircraftdata.breaker", breaker),
+            patch("aircraftdata.cache", lookupcache.LookupCache()),
+            patch("aircraftdata.session.get") as mock_get,
+        ):
+            mock_get.return_value = Mock(text="Too Many Requests", status_code=429)
+            assert aircraftdata.regis("abc123") == aircraftdata.PLACEHOLDER
+            assert breaker.failed == 1
+            assert len(aircraftdata.cache) == 0
+
+            mock_get.return_value = Mock(text="Not Found", status_code=404)
+            assert aircraftdata.regis("abc123") == aircraftdata.PLACEHOLDER
+            assert breaker.is_open
+            breaker.close()
+
+            mock_get.return_value = Mock(text="PH-BXA", status_code=200)
+            assert aircraftdata.regis("abc123") == "PH-BXA"
@@ -0,0 +1,135 @@
+"""
+Tests for aircraftdb.py - the offline aircraft database.
+
+The datasets are small files written by the tests.
+"""
+
+import gzip
+import os
+import sqlite3
+from unittest.mock import Mock, patch
+
+import pytest
+
+import aircraftdata
+import aircraftdb
+
+AIRCRAFT = [
+    ("484a6e", "PH-BXA", "Boeing 737-800", "KLM"),
+    ("abc123", "PH-HZD", "Boeing 737-700", ""),
+    ("4ca7b5", "EI-DCL", "Boeing 737-8AS", "Ryanair"),
+]
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / "aircraft.db")
+    aircraftdb.write(path, AIRCRAFT)
+    return path
+
+
+class TestAircraftDB:
+    """Tests for writing and reading the database."""
+
+    def test_lookup(self, database):
+        """Test every aircraft is found by its hex, in any case."""
+        db = aircraftdb.AircraftDB(database)
+        assert len(db) == 3
+        for hex, *fields in AIRCRAFT:
+            assert db.lookup(hex) == fields
+        assert db.lookup("4CA7B5") == ["EI-DCL", "Boeing 737-8AS", "Ryanair"]
+        assert db.get("oper", "484a6e") == "KLM"
+        assert db.get("oper", "abc123") is None
+
+    def test_not_found(self, database):
+        """Test unknown and non-ICAO hexes."""
+        db = aircraftdb.AircraftDB(database)
+        for hex in ("000001", "ffffff", "484a6f", "~1234ab", "", None, "1234567"):
+            assert db.lookup(hex) is None
+
+    def test_empty(self, tmp_path):
+        """Test a database without aircraft."""
+        path = str(tmp_path / "aircraft.db")
+        assert aircraftdb.write(path, []) == 0
+        assert aircraftdb.AircraftDB(path).lookup("484a6e") is None
+
+    def test_not_a_database(self, tmp_path):
+        """Test another file is refused."""
+        path = tmp_path / "aircraft.db"
+        path.write_bytes(b"icao;r;t\n")
+        with pytest.raises(ValueError):
+            aircraftdb.AircraftDB(str(path))
+
+    def test_refresh(self, database):
+        """Test a new import replaces the database of a running reader."""
+        db = aircraftdb.AircraftDB(database)
+        assert not db.refresh()
+        aircraftdb.write(database, [("484a6e", "PH-BXB", "Boeing 737-800", "KLM")])
+        assert not os.path.exists(database + ".tmp")
+        assert db.refresh()
+        assert db.lookup("484a6e")[0] == "PH-BXB"
+        assert db.lookup("abc123") is None
+        assert len(db) == 1
+
+
+class TestImport:
+    """Tests for the importers of the datasets."""
+
+    def test_tar1090_csv(self, tmp_path):
+        """Test the aircraft.csv.gz of tar1090-db."""
+        source = str(tmp_path / "aircraft.csv.gz")
+        with gzip.open(source, "wt") as f:
+            f.write("484a6e;PH-BXA;B738;00;BOEING 737-800;2000;KLM;\n")
+            f.write("abc123;N123;C172;00;;;;\n")
+            f.write("~12345;;;;;;;\n")
+        path = str(tmp_path / "aircraft.db")
+
+        assert aircraftdb.import_file(source, path) == 2
+
+        db = aircraftdb.AircraftDB(path)
+        assert db.lookup("484a6e") == ["PH-BXA", "BOEING 737-800", "KLM"]
+        assert db.lookup("abc123") == ["N123", "C172", ""]
+
+    def test_basestation(self, tmp_path):
+        """Test the Aircraft table of a BaseStation.sqb."""
+        source = str(tmp_path / "BaseStation.sqb")
+        with sqlite3.connect(source) as bs:
+            bs.execute(
+                "CREATE TABLE Aircraft (ModeS TEXT, Registration TEXT,"
+                " Manufacturer TEXT, Type TEXT, RegisteredOwners TEXT)"
+            )
+            bs.executemany(
+                "INSERT INTO Aircraft VALUES (?, ?, ?, ?, ?)",
+                [
+                    ("484A6E", "PH-BXA", "Boeing", "737-8K2", "KLM"),
+                    ("4CA7B5", "EI-DCL", "Boeing", "Boeing 737-8AS", "Ryanair"),
+                    ("ABC123", None, None, None, None),
+                ],
+            )
+        bs.close()
+        path = str(tmp_path / "aircraft.db")
+
+        assert aircraftdb.import_file(source, path) == 2
+
+        db = aircraftdb.AircraftDB(path)
+        assert db.lookup("484a6e") == ["PH-BXA", "Boeing 737-8K2", "KLM"]
+        assert db.lookup("4ca7b5") == ["EI-DCL", "Boeing 737-8AS", "Ryanair"]
+
+
+class TestAircraftData:
+    """Tests for the database in front of hexdb.io."""
+
+    def test_offline_first(self, database):
+        """Test hexdb.io is only asked what the database doesn't know."""
+        with (
+            patch("aircraftdata.db", aircraftdb.AircraftDB(database)),
+            patch("aircraftdata.session.get") as mock_get,
+        ):
+            mock_get.return_value = Mock(status_code=200, text="Transavia")
+            assert aircraftdata.regis("484a6e") == "PH-BXA"
+            assert aircraftdata.plane("484a6e") == "Boeing 737-800"
+            assert aircraftdata.oper("484a6e") == "KLM"
+            mock_get.assert_not_called()
+
+            assert aircraftdata.oper("abc123") == "Transavia"
+            assert mock_get.call_count == 1
@@ -0,0 +1,315 @@
+"""
+Tests for alarmzone.py - the compiled alarm zone tests.
+
+The pre-filter must never reject an aircraft the original test
+(distance < distance_alarm or el > elevation_alarm) puts in the zone.
+"""
+
+import configparser
+import math
+import random
+from unittest.mock import patch
+
+import pytest
+
+import alarmzone
+import flightdata
+import geomath
+from tests.conftest import RECEIVER, make_aircraft
+
+
+def random_positions(n, spread, seed=7):
+    rnd = random.Random(seed)
+    for _ in range(n):
+        yield (
+            RECEIVER[0] + rnd.uniform(-spread, spread),
+            RECEIVER[1] + rnd.uniform(-spread, spread),
+            rnd.uniform(0, 45000),
+        )
+
+
+class TestAlarmZone:
+    """Tests for AlarmZone."""
+
+    @pytest.mark.parametrize("distance_alarm, elevation_alarm", [(2, 75), (5, 30)])
+    def test_matches_original_test(self, locate, distance_alarm, elevation_alarm):
+        """Test the pre-filter and contains() against the original test."""
+        zone = alarmzone.AlarmZone(*RECEIVER, distance_alarm, elevation_alarm)
+        inside = 0
+        for lat, lon, alt in random_positions(5000, 0.3):
+            a = locate(make_aircraft(lat=lat, lon=lon, altitude=alt))
+            original = a.distance < distance_alarm or a.el > elevation_alarm
+            if original:
+                inside += 1
+                assert zone.might_contain(lat, lon, alt)
+            assert zone.contains(a) == original
+        assert inside > 0
+
+    @pytest.mark.parametrize(
+        "latitude, elevation_alarm, spread",
+        [(70, 5, (2, 6)), (-70, 5, (2, 6)), (80, 2, (5, 30)), (-80, 2, (5, 30))],
+    )
+    def test_high_latitude_low_elevation(
+        self, locate, latitude, elevation_alarm, spread
+    ):
+        """Test the pre-filter is safe far north and south, 130+ miles out."""
+        zone = alarmzone.AlarmZone(latitude, RECEIVER[1], 2, elevation_alarm)
+        rnd = random.Random(5)
+        inside = 0
+        with patch("flightdata.receiver_latitude", latitude):
+            for _ in range(20000):
+                lat = latitude + rnd.uniform(-spread[0], spread[0])
+                lon = RECEIVER[1] + rnd.uniform(-spread[1], spread[1])
+                alt = rnd.uniform(40000, 60000)
+                a = locate(make_aircraft(lat=lat, lon=lon, altitude=alt))
+                if a.el > elevation_alarm:
+                    inside += 1
+                    assert zone.might_contain(lat, lon, alt)
+                assert zone.contains(a) == (a.el > elevation_alarm)
+        assert inside > 1000
+
+    def test_far_aircraft_rejected(self):
+        """Test that far away and low aircraft are rejected by the pre-filter."""
+        zone = alarmzone.AlarmZone(*RECEIVER, 2, 75)
+
+        assert not zone.might_contain(RECEIVER[0] + 1, RECEIVER[1], 35000)
+        assert not zone.might_contain(RECEIVER[0] + 0.1, RECEIVER[1], 1000)
+        assert zone.might_contain(RECEIVER[0] + 0.01, RECEIVER[1], 1000)
+        # 2.3 miles out, but high enough to be seen above 75 degrees
+        assert zone.might_contain(RECEIVER[0] + 0.033, RECEIVER[1], 45000)
+
+    def test_might_contain_many(self):
+        """Test that the array version agrees with the scalar one."""
+        np = pytest.importorskip("numpy")
+        zone = alarmzone.AlarmZone(*RECEIVER, 2, 75)
+        positions = list(random_positions(2000, 0.1))
+        lat, lon, alt = (np.array(c) for c in zip(*positions))
+
+        expected = [zone.might_contain(*p) for p in positions]
+        assert zone.might_contain_many(lat, lon, alt).tolist() == expected
+
+    def test_elevation_alarm_limits(self, locate):
+        """Test elevation alarms of 0 and 90 degrees."""
+        everywhere = alarmzone.AlarmZone(*RECEIVER, 2, 0)
+        distance_only = alarmzone.AlarmZone(*RECEIVER, 2, 90)
+        far = locate(make_aircraft(lat=RECEIVER[0] + 1, lon=RECEIVER[1], altitude=1000))
+
+        assert everywhere.might_contain(far.lat, far.lon, far.altitude)
+        assert everywhere.contains(far)
+        assert not distance_only.might_contain(far.lat, far.lon, 45000)
+        assert not distance_only.contains(far)
+
+    def test_true_elevation(self, locate):
+        """Test the ecef elevation decides near elevation_alarm."""
+        flat = alarmzone.AlarmZone(*RECEIVER, 2, 30)
+        true = alarmzone.AlarmZone(*RECEIVER, 2, 30, true_elevation=True)
+        with patch("flightdata.receiver_frame", geomath.EcefFrame(*RECEIVER)):
+            # 13.1 miles out at 40000 ft: 30.01 degrees on the flat earth,
+            # 29.89 degrees over the curve.
+            edge = locate(
+                make_aircraft(lat=RECEIVER[0] + 0.19, lon=RECEIVER[1], altitude=40000)
+            )
+            inside = locate(
+                make_aircraft(lat=RECEIVER[0] + 0.185, lon=RECEIVER[1], altitude=40000)
+            )
+        flat_el = math.atan(edge.altitude / (edge.distance * alarmzone.FT_PER_MILE))
+        assert edge.el < 30 < math.degrees(flat_el)
+        assert flat.contains(edge)
+        assert not true.contains(edge)
+        assert inside.el > 30
+        assert true.contains(inside)
+        # Like the flat test, the elevation alarm itself is outside.
+        assert not true.contains(make_aircraft(dist=5, el=30))
+        for a in edge, inside:
+            assert true.might_contain(a.lat, a.lon, a.altitude)
+
+    def test_true_elevation_prefilter(self, locate):
+        """Test the pre-filter never rejects an aircraft above the ecef angle."""
+        zone = alarmzone.AlarmZone(*RECEIVER, 2, 30, true_elevation=True)
+        inside = 0
+        with patch("flightdata.receiver_frame", geomath.EcefFrame(*RECEIVER)):
+            for lat, lon, alt in random_positions(5000, 0.3):
+                a = locate(make_aircraft(lat=lat, lon=lon, altitude=alt))
+                original = a.distance < 2 or a.el > 30
+                if original:
+                    inside += 1
+                    assert zone.might_contain(lat, lon, alt)
+                assert zone.contains(a) == original
+        assert inside > 0
+
+    def test_not_located_aircraft(self, locate):
+        """Test that aircraft without position or distance are outside."""
+        zone = alarmzone.AlarmZone(*RECEIVER, 2, 75)
+        a = locate(make_aircraft(lat=RECEIVER[0], lon=RECEIVER[1], altitude=1000))
+        assert zone.contains(a)
+
+        a.distance = None
+        assert not zone.contains(a)
+        a.lat = None
+        assert not zone.contains(a)
+
+    def test_parser_skips_aircraft_outside_zone(self, at_receiver, mock_aircraft_data):
+        """Test that the parser doesn't locate aircraft rejected by the zone."""
+        zone = alarmzone.AlarmZone(*RECEIVER, 10, 75)
+        parser = flightdata.Dump1090DataParser(zone)
+
+        with patch(
+            "flightdata.geomath.distance", wraps=flightdata.geomath.distance
+        ) as d:
+            aircraft = parser.aircraft_data(mock_aircraft_data, None)
+
+        near, far = aircraft[1], aircraft[2]
+        assert near.distance < 10
+        assert (far.distance, far.az, far.el) == (None, None, None)
+        assert d.call_count == 2  # 789xyz is 14 miles out, nopos1 has no position
+        assert math.isclose(
+            near.az, flightdata.geomath.bearing(RECEIVER, (53.25, 6.55))
+        )
+
+    def test_batch_skips_aircraft_outside_zone(self, locate):
+        """Test that the batch leaves aircraft rejected by the zone unlocated."""
+        aircraftbatch = pytest.importorskip("aircraftbatch")
+        zone = alarmzone.AlarmZone(*RECEIVER, 2, 75)
+        aircraft = [
+            locate(make_aircraft(lat=lat, lon=lon, altitude=alt))
+            for lat, lon, alt in random_positions(100, 0.2)
+        ]
+        expected = [zone.contains(a) for a in aircraft]
+
+        aircraftbatch.AircraftBatch(aircraft).locate(*RECEIVER, zone)
+
+        assert [zone.contains(a) for a in aircraft] == expected
+        assert any(a.distance is None for a in aircraft)
+
+
+# A triangle north-east of the receiver, and a runway approach to the south-east.
+TRIANGLE = [(53.25, 6.60), (53.30, 6.60), (53.25, 6.70)]
+APPROACH = [(53.1445, 6.6870), (53.1155, 6.6240)]
+
+
+class TestPlaneZones:
+    """Tests for polygon and corridor zones."""
+
+    def test_polygon(self):
+        """Test points inside and outside a triangle, and the altitude band."""
+        zone = alarmzone.PolygonZone("t", *RECEIVER, TRIANGLE, max_altitude=5000)
+        assert zone.might_contain(53.26, 6.62, 3000)
+        assert not zone.might_contain(53.29, 6.69, 3000)  # in the box, not inside
+        assert not zone.might_contain(53.26, 6.62, 6000)
+        assert not zone.might_contain(53.0, 6.62, 3000)
+
+    def test_corridor(self):
+        """Test the distance to the path of a corridor."""
+        zone = alarmzone.CorridorZone("c", *RECEIVER, APPROACH, width=1)
+        middle = (
+            (APPROACH[0][0] + APPROACH[1][0]) / 2,
+            (APPROACH[0][1] + APPROACH[1][1]) / 2,
+        )
+        assert zone.might_contain(*middle, 2000)
+        # 0.4 miles north of the middle is inside, 0.6 miles isn't.
+        assert zone.might_contain(
+            middle[0] + 0.4 / alarmzone.MI_PER_DEG_LAT, middle[1], 0
+        )
+        assert not zone.might_contain(
+            middle[0] + 0.8 / alarmzone.MI_PER_DEG_LAT, middle[1], 0
+        )
+        # Round at the ends.
+        assert zone.might_contain(
+            APPROACH[0][0] + 0.4 / alarmzone.MI_PER_DEG_LAT, APPROACH[0][1], 0
+        )
+
+    @pytest.mark.parametrize("kind", ["polygon", "corridor"])
+    def test_many_matches_scalar(self, kind):
+        """Test the batched point-in-zone test agrees with the scalar one."""
+        np = pytest.importorskip("numpy")
+        if kind == "polygon":
+            zone = alarmzone.PolygonZone("t", *RECEIVER, TRIANGLE, max_altitude=30000)
+        else:
+            zone = alarmzone.CorridorZone("c", *RECEIVER, APPROACH, 1.5)
+        positions = list(random_positions(3000, 0.15))
+        lat, lon, alt = (np.array(c) for c in zip(*positions))
+
+        expected = [zone.might_contain(*p) for p in positions]
+        assert any(expected)
+        assert zone.might_contain_many(lat, lon, alt).tolist() == expected
+
+    def test_invalid(self):
+        """Test zones without enough points."""
+        with pytest.raises(ValueError, match="3 points"):
+            alarmzone.PolygonZone("t", *RECEIVER, TRIANGLE[:2])
+        with pytest.raises(ValueError, match="2 points"):
+            alarmzone.CorridorZone("c", *RECEIVER, APPROACH[:1], 1)
+
+
+class TestZoneSet:
+    """Tests for several zones tested as one."""
+
+    @pytest.fixture
+    def zones(self):
+        return alarmzone.ZoneSet(
+            [
+                alarmzone.AlarmZone(*RECEIVER, 2, 75),
+                alarmzone.PolygonZone("triangle", *RECEIVER, TRIANGLE),
+                alarmzone.CorridorZone("approach", *RECEIVER, APPROACH, 1),
+            ]
+        )
+
+    def test_containing(self, zones, locate):
+        """Test which zones a located aircraft is in."""
+        over = locate(make_aircraft(lat=RECEIVER[0], lon=RECEIVER[1], altitude=1000))
+        triangle = locate(make_aircraft(lat=53.26, lon=6.62, altitude=3000))
+        nowhere = locate(make_aircraft(lat=53.5, lon=6.0, altitude=3000))
+
+        assert [z.name for z in zones.containing(over)] == ["aboveme"]
+        assert [z.name for z in zones.containing(triangle)] == ["triangle"]
+        assert zones.containing(nowhere) == []
+        assert zones.might_contain(53.26, 6.62, 3000)
+        assert not zones.might_contain(53.5, 6.0, 3000)
+
+    def test_only_nearby_zones_tested(self, zones):
+        """Test a position is only tested against the zones around it."""
+        assert [z.name for z in zones.candidates(53.5, 6.0)] == []
+        assert [z.name for z in zones.candidates(53.14, 6.69)] == [
+            "aboveme",
+            "approach",
+        ]
+
+    def test_might_contain_many(self, zones):
+        """Test the array version agrees with the scalar one."""
+        np = pytest.importorskip("numpy")
+        positions = list(random_positions(3000, 0.15))
+        lat, lon, alt = (np.array(c) for c in zip(*positions))
+
+        expected = [zones.might_contain(*p) for p in positions]
+        assert zones.might_contain_many(lat, lon, alt).tolist() == expected
+
+    def test_radius(self, zones):
+        """Test the radius holds all zones."""
+        assert zones.radius(0) > alarmzone.AlarmZone(*RECEIVER, 2, 75).radius(0)
+
+    def test_from_config(self):
+        """Test [zone:<name>] sections."""
+        config = configparser.ConfigParser()
+        config.read_string(
+            """
+            [aboveme]
+            distance_alarm = 2
+            [zone:rwy23]
+            type = corridor
+            points = 53.1445,6.6870 53.1155,6.6240
+            width = 1
+            max_altitude = 3000
+            [zone:triangle]
+            points = 53.25,6.60 53.30,6.60 53.25,6.70
+            """
+        )
+        zones = alarmzone.zones_from_config(config, *RECEIVER)
+
+        assert [z.name for z in zones] == ["rwy23", "triangle"]
+        assert isinstance(zones[0], alarmzone.CorridorZone)
+        assert zones[0].max_altitude == 3000
+        assert isinstance(zones[1], alarmzone.PolygonZone)
+
+        config["zone:bad"] = {"type": "circle", "points": "53,6"}
+        with pytest.raises(ValueError, match="unknown type"):
+            alarmzone.zones_from_config(config, *RECEIVER)
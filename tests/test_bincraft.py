@@ -0,0 +1,124 @@
+"""
+Tests for bincraft.py - the readsb / tar1090 binCraft parser.
+
+tests/data/aircraft.binCraft(.zst) hold the same aircraft as
+tests/data/aircraft.json, so both parsers must agree on them.
+"""
+
+import io
+import json
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import bincraft
+import flightdata
+
+DATA = Path(__file__).parent / "data"
+
+
+def parse(parser, data):
+    return parser.aircraft_data(data, datetime.fromtimestamp(data["now"]))
+
+
+@pytest.fixture
+def json_aircraft():
+    with open(DATA / "aircraft.json") as f:
+        return parse(flightdata.Dump1090DataParser(), json.load(f))
+
+
+class TestDecode:
+    """Tests for the binCraft header and records."""
+
+    def test_header(self):
+        """Test now and messages from the header."""
+        data = bincraft.decode((DATA / "aircraft.binCraft").read_bytes())
+        assert data["now"] == 1706360400.0
+        assert data["messages"] == 12345678
+        assert len(list(data["aircraft"])) == 5
+
+    def test_zstd_compressed(self):
+        """Test the zstd compressed file decodes to the same records."""
+        pytest.importorskip("zstandard")
+        plain = bincraft.decode((DATA / "aircraft.binCraft").read_bytes())
+        packed = bincraft.decode((DATA / "aircraft.binCraft.zst").read_bytes())
+        assert list(packed["aircraft"]) == list(plain["aircraft"])
+
+    def test_zstd_without_zstandard(self):
+        """Test compressed data without zstandard installed is an error."""
+        with patch.object(bincraft, "zstandard", None):
+            with pytest.raises(ValueError, match="zstandard"):
+                bincraft.decode((DATA / "aircraft.binCraft.zst").read_bytes())
+
+    def test_truncated(self):
+        """Test a partial record at the end is ignored."""
+        raw = (DATA / "aircraft.binCraft").read_bytes()
+        data = bincraft.decode(raw[:-50])
+        assert len(list(data["aircraft"])) == 4
+
+    def test_too_short(self):
+        """Test data shorter than the header is an error."""
+        with pytest.raises(ValueError):
+            bincraft.decode(b"\0" * 10)
+
+
+class TestBinCraftDataParser:
+    """Tests for BinCraftDataParser against the JSON parser."""
+
+    @pytest.fixture
+    def aircraft(self):
+        parser = bincraft.BinCraftDataParser()
+        return parse(parser, parser.decode((DATA / "aircraft.binCraft").read_bytes()))
+
+    def test_same_as_json(self, aircraft, json_aircraft):
+        """Test the fields match the aircraft.json parse."""
+        assert [a.hex for a in aircraft] == [a.hex for a in json_aircraft]
+        for a, j in zip(aircraft, json_aircraft):
+            assert a.flight == j.flight
+            assert a.squawk == j.squawk
+            assert a.lat == j.lat
+            assert a.lon == j.lon
+            assert a.altitude == j.altitude
+            assert a.track == pytest.approx(j.track, abs=0.01)
+            assert a.speed == pytest.approx(j.speed, abs=0.2)
+            assert a.messages == j.messages
+            assert a.seen == j.seen
+            assert a.seen_pos == j.seen_pos
+            assert a.rssi == pytest.approx(j.rssi, abs=0.5)
+            assert a.distance == pytest.approx(j.distance)
+            assert a.el == pytest.approx(j.el)
+
+    def test_special_cases(self, aircraft):
+        """Test ground, missing position, non-ICAO and MLAT aircraft."""
+        by_hex = {a.hex: a for a in aircraft}
+        assert by_hex["484175"].altitude == 0.0  # on the ground
+        assert by_hex["3C6444"].lat is None
+        assert by_hex["3C6444"].flight is None
+        assert by_hex["~06A1C3"].squawk is None
+        assert by_hex["400A2B"].mlat is True
+        assert by_hex["4840D6"].mlat is False
+        assert by_hex["4840D6"].vert_rate == -1024
+
+    def test_flightdata_refresh(self):
+        """Test FlightData decodes the fetched bytes with the parser."""
+        fetcher = MagicMock()
+        fetcher.fetch.return_value = (DATA / "aircraft.binCraft").read_bytes()
+        fd = flightdata.FlightData(
+            parser=bincraft.BinCraftDataParser(), fetcher=fetcher
+        )
+        assert len(fd.aircraft) == 5
+        assert fd.time == datetime.fromtimestamp(1706360400.0)
+
+    def test_stream(self, aircraft):
+        """Test stream mode reads the whole file and parses it."""
+        fetcher = MagicMock()
+        fetcher.open.return_value = io.BytesIO(
+            (DATA / "aircraft.binCraft").read_bytes()
+        )
+        fd = flightdata.FlightData(
+            parser=bincraft.BinCraftDataParser(), fetcher=fetcher, stream=True
+        )
+        assert [a.hex for a in fd.aircraft] == [a.hex for a in aircraft]
+        assert fd.json_data["messages"] == 12345678
@@ -0,0 +1,66 @@
+"""
+Tests for circuitbreaker.py - failing fast while a service is down.
+
+The probes run every 10 ms, so the tests don't wait long for them.
+"""
+
+import threading
+
+import pytest
+
+import circuitbreaker
+
+
+class Probe:
+    """
+    Fails until up is set, counts the calls.
+    """
+
+    def __init__(self):
+        self.up = False
+        self.calls = 0
+        self.called = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.called.set()
+        if self.up is None:
+            raise OSError("no route to host")
+        return self.up
+
+
+class TestCircuitBreaker:
+    """Tests for CircuitBreaker."""
+
+    def test_opens_after_failures(self):
+        """Test the breaker opens after failures in a row only."""
+        breaker = circuitbreaker.CircuitBreaker("test", Probe(), 3, 3600)
+        breaker.failure()
+        breaker.failure()
+        breaker.success()
+        breaker.failure()
+        breaker.failure()
+        breaker.check()
+        breaker.failure()
+        assert breaker.is_open
+        assert breaker.opened == 1
+        with pytest.raises(circuitbreaker.CircuitOpen):
+            breaker.check()
+        breaker.close()
+
+    def test_probe_closes(self):
+        """Test the background probe closes the breaker when it succeeds."""
+        probe = Probe()
+        probe.up = None
+        breaker = circuitbreaker.CircuitBreaker("test", probe, 1, 0.01)
+        breaker.failure()
+        assert probe.called.wait(5)
+        assert breaker.is_open
+        probe.up = True
+        for _ in range(500):
+            if not breaker.is_open:
+                break
+            threading.Event().wait(0.01)
+        assert not breaker.is_open
+        breaker.check()
+        assert probe.calls >= 2
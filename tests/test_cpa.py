@@ -0,0 +1,94 @@
+"""
+Tests for cpa.py - closest point of approach of the aircraft to the receiver.
+"""
+
+import random
+from unittest.mock import patch
+
+import pytest
+
+import alarmzone
+import cpa
+from tests.conftest import RECEIVER, make_aircraft
+
+
+@pytest.fixture
+def zone():
+    return alarmzone.AlarmZone(*RECEIVER, 2, 75)
+
+
+class TestPredict:
+    """Tests for predicting the closest approach."""
+
+    def test_overhead(self, zone):
+        """Test an aircraft heading straight for the receiver passes overhead."""
+        approach = cpa.predict_one(make_aircraft(north=10, track=180, speed=360), zone)
+        assert approach.time == pytest.approx(100)
+        assert approach.distance == pytest.approx(0, abs=1e-9)
+        assert approach.elevation == pytest.approx(90)
+
+    def test_offset(self, zone):
+        """Test a track passing 3 miles east of the receiver."""
+        approach = cpa.predict_one(
+            make_aircraft(north=10, east=3, track=180, speed=360), zone
+        )
+        assert approach.time == pytest.approx(100)
+        assert approach.distance == pytest.approx(3)
+        assert approach.elevation == pytest.approx(10.7, abs=0.1)
+
+    def test_passed(self, zone):
+        """Test the closest approach of an aircraft flying away has passed."""
+        approach = cpa.predict_one(make_aircraft(north=-1, track=180, speed=360), zone)
+        assert approach.time == pytest.approx(-10)
+
+    def test_vert_rate(self, zone):
+        """Test the altitude at the closest approach follows the vertical rate."""
+        descending = cpa.predict_one(
+            make_aircraft(north=10, east=3, track=180, speed=360, vert_rate=-600), zone
+        )
+        assert descending.altitude == pytest.approx(2000)
+        landed = cpa.predict_one(
+            make_aircraft(north=10, east=3, track=180, speed=360, vert_rate=-6000), zone
+        )
+        assert landed.altitude == 0
+
+    def test_unknown(self, zone):
+        """Test aircraft without track or position are left out."""
+        a = make_aircraft(north=10, track=None)
+        assert cpa.predict_one(a, zone) is None
+        assert cpa.predict(
+            [a, make_aircraft(dhex="DEF456", north=10, track=180)], zone
+        ).keys() == {"DEF456"}
+
+    def test_scalar(self, zone):
+        """Test predict() without NumPy."""
+        with patch("cpa.aircraftbatch", None):
+            approaches = cpa.predict([make_aircraft(north=10, east=3, track=180)], zone)
+        expected = cpa.predict_one(make_aircraft(north=10, east=3, track=180), zone)
+        assert approaches["ABC123"] == expected
+
+    def test_vectorized_matches_scalar(self, zone):
+        """Test the NumPy pass gives the scalar results."""
+        pytest.importorskip("numpy")
+        rnd = random.Random(3)
+        batch = [
+            make_aircraft(
+                dhex=f"{i:06X}",
+                north=rnd.uniform(-30, 30),
+                east=rnd.uniform(-30, 30),
+                track=rnd.uniform(0, 360),
+                speed=rnd.uniform(0, 500),
+                altitude=rnd.uniform(0, 40000),
+                vert_rate=rnd.uniform(-3000, 3000),
+            )
+            for i in range(200)
+        ]
+        batch[0].track = None
+        batch[1].speed = 0
+
+        approaches = cpa.predict(batch, zone)
+
+        assert len(approaches) == 199
+        for a in batch[1:]:
+            expected = cpa.predict_one(a, zone)
+            assert approaches[a.hex] == pytest.approx(expected)
@@ -0,0 +1,168 @@
+"""
+Tests for fanin.py - several receivers merged into one data source.
+"""
+
+import threading
+import time
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+import alarmzone
+import datasource
+import fanin
+import flightdata
+from tests.conftest import RECEIVER
+
+# The aircraft are located from RECEIVER.
+pytestmark = pytest.mark.usefixtures("at_receiver")
+
+
+class FakeSource:
+    """
+    A receiver that returns the given aircraft.json aircraft lists, the last
+    one over and over.  With block set, refresh() waits for it to be cleared.
+    """
+
+    def __init__(self, name, *feeds, zone=None):
+        self.data_url = name
+        self.feeds = list(feeds)
+        self.parser = flightdata.Dump1090DataParser(zone)
+        self.block = threading.Event()
+        self.unblocked = threading.Event()
+        self.unblocked.set()
+        self.fail = False
+        self.refresh()
+
+    def refresh(self):
+        self.unblocked.wait()
+        if self.fail:
+            raise RuntimeError("receiver broke")
+        feed = self.feeds.pop(0) if len(self.feeds) > 1 else self.feeds[0]
+        self.time = datetime.fromtimestamp(1706360400.0)
+        self.aircraft = self.parser.aircraft_data({"aircraft": feed}, self.time)
+
+
+def seen(hex, messages=1, seen_pos=None, rssi=-20.0):
+    a = {"hex": hex, "messages": messages, "rssi": rssi, "seen": 0.1}
+    if seen_pos is not None:
+        a.update(lat=53.3, lon=6.6, seen_pos=seen_pos)
+    return a
+
+
+@pytest.fixture
+def pool_cleanup():
+    sources = []
+    yield sources
+    for fd in sources:
+        fd.close()
+
+
+class TestMultiFlightData:
+    """Tests for merging the receivers."""
+
+    def test_merge_by_hex(self, pool_cleanup):
+        """Test one aircraft per hex, with the freshest position."""
+        a = FakeSource(
+            "a", [seen("abc123", seen_pos=5.0), seen("def456", seen_pos=1.0)]
+        )
+        b = FakeSource("b", [seen("abc123", seen_pos=0.5), seen("789abc")])
+        fd = fanin.MultiFlightData([a, b])
+        pool_cleanup.append(fd)
+
+        by_hex = {ac.hex: ac for ac in fd.aircraft}
+        assert sorted(by_hex) == ["789ABC", "ABC123", "DEF456"]
+        assert by_hex["ABC123"].seen_pos == 0.5
+        assert by_hex["ABC123"] is not b.aircraft[0]  # a copy
+        assert fd.index == by_hex
+
+    def test_deferred_details(self, pool_cleanup):
+        """Test aircraft outside the alarm zone keep their details deferred."""
+        zone = alarmzone.AlarmZone(*RECEIVER, 2, 75)
+        far = dict(seen("abc123", seen_pos=1.0), lat=54.0, flight="KLM1")
+        fd = fanin.MultiFlightData([FakeSource("a", [far], zone=zone)])
+        pool_cleanup.append(fd)
+
+        a = fd.aircraft[0]
+        assert type(a) is flightdata.DeferredAircraftData
+        assert a.distance is None
+        assert a.flight == "KLM1"
+
+    def test_strongest_signal_breaks_tie(self, pool_cleanup):
+        """Test equally fresh positions are decided by rssi."""
+        a = FakeSource("a", [seen("abc123", seen_pos=1.0, rssi=-30.0)])
+        b = FakeSource("b", [seen("abc123", seen_pos=1.0, rssi=-10.0)])
+        c = FakeSource("c", [seen("abc123")])  # no position at all
+        fd = fanin.MultiFlightData([a, b, c])
+        pool_cleanup.append(fd)
+
+        assert [ac.rssi for ac in fd.aircraft] == [-10.0]
+
+    def test_delta(self, pool_cleanup):
+        """Test the merged aircraft enter, leave and change."""
+        a = FakeSource(
+            "a",
+            [seen("abc123", seen_pos=1.0)],
+            [seen("abc123", 2, seen_pos=0.2), seen("def456")],
+        )
+        fd = fanin.MultiFlightData([a])
+        pool_cleanup.append(fd)
+        first = fd.aircraft[0]
+
+        fd.refresh()
+
+        assert fd.aircraft[0] is first
+        assert [ac.hex for ac in fd.delta.entered] == ["DEF456"]
+        assert set(fd.delta.changed["ABC123"]) == {"messages"}
+
+    def test_slow_receiver_does_not_stall(self, pool_cleanup):
+        """Test a late receiver's previous aircraft are used, without waiting."""
+        a = FakeSource("a", [seen("abc123", seen_pos=1.0)])
+        b = FakeSource("b", [seen("def456", seen_pos=1.0)])
+        fd = fanin.MultiFlightData([a, b], deadline=0.1)
+        pool_cleanup.append(fd)
+
+        b.unblocked.clear()
+        start = time.monotonic()
+        fd.refresh()
+        elapsed = time.monotonic() - start
+        b.unblocked.set()
+
+        assert elapsed < 1
+        assert fd.late == 1
+        assert sorted(ac.hex for ac in fd.aircraft) == ["ABC123", "DEF456"]
+        assert not fd.delta.left
+
+    def test_failing_receiver(self, pool_cleanup):
+        """Test a receiver that raises doesn't stop the merge."""
+        a = FakeSource("a", [seen("abc123")])
+        b = FakeSource("b", [seen("def456")])
+        fd = fanin.MultiFlightData([a, b])
+        pool_cleanup.append(fd)
+
+        b.fail = True
+        fd.refresh()
+
+        assert [ac.hex for ac in fd.aircraft] == ["ABC123"]
+
+
+class TestGetDataSource:
+    """Tests for datasource.get_data_source() with several data_urls."""
+
+    def test_multiple_data_urls(self):
+        """Test that more than one data_url gives a MultiFlightData."""
+        urls = ["http://one/aircraft.json", "http://two/aircraft.json"]
+        with (
+            patch("datasource.g_data_urls", urls),
+            patch("datasource.g_driver", "dump1090"),
+            patch("datasource.flightdata.FlightData") as mock_flightdata,
+        ):
+            mock_flightdata.return_value.aircraft = []
+            mock_flightdata.return_value.time = None
+            fd = datasource.get_data_source()
+        fd.close()
+
+        assert isinstance(fd, fanin.MultiFlightData)
+        called = sorted(c.kwargs["data_url"] for c in mock_flightdata.call_args_list)
+        assert called == urls
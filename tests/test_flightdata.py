@@ -6,8 +6,18 @@ Uses mock aircraft data to avoid network dependencies.
 
 from unittest.mock import patch, MagicMock
 from datetime import datetime
+import asyncio
+import io
 import json
+
+import pytest
+
+import alarmzone
 import flightdata
+from tests.conftest import RECEIVER
+
+# The aircraft are located from RECEIVER.
+pytestmark = pytest.mark.usefixtures("at_receiver")
 
 
 class TestAircraftData:
@@ -142,6 +152,23 @@ class TestAircraftData:
         parts = ident.split("/")
         assert len(parts) == 2  # hex and registration only
 
+    def test_aircraft_slots_and_copy(self, sample_datetime):
+        """Test that AircraftData has no __dict__ and copy() is independent."""
+        aircraft = flightdata.AircraftData(
+            "ABC123", "7000", "KLM1234", None, 53.3, 6.6, 15000, 0, 270, 350,
+            150, 0.5, False, 7, 1.0, -25.5, 10.5, 180, 45, sample_datetime,
+        )  # fmt: skip
+
+        assert not hasattr(aircraft, "__dict__")
+
+        snapshot = aircraft.copy()
+        aircraft.distance = 1.0
+
+        assert snapshot is not aircraft
+        assert snapshot.distance == 10.5
+        assert snapshot.hex == "ABC123"
+        assert snapshot.time == sample_datetime
+
 
 class TestDump1090DataParser:
     """Tests for Dump1090DataParser."""
@@ -151,24 +178,20 @@ class TestDump1090DataParser:
         parser = flightdata.Dump1090DataParser()
 
         # Mock the receiver coordinates
-        with (
-            patch("flightdata.receiver_latitude", 53.215119),
-            patch("flightdata.receiver_longitude", 6.570963),
-        ):
-            aircraft_list = parser.aircraft_data(mock_aircraft_data, sample_datetime)
+        aircraft_list = parser.aircraft_data(mock_aircraft_data, sample_datetime)
 
-            # Should parse 3 aircraft (4th has no position)
-            assert len(aircraft_list) == 4
+        # Should parse 3 aircraft (4th has no position)
+        assert len(aircraft_list) == 4
 
-            # Check first aircraft
-            ac1 = aircraft_list[0]
-            assert ac1.hex == "ABC123"
-            assert ac1.squawk == "7000"
-            assert ac1.flight == "KLM1234 "
-            assert ac1.lat == 53.3
-            assert ac1.lon == 6.6
-            assert ac1.altitude == 15000
-            assert ac1.track == 270
+        # Check first aircraft
+        ac1 = aircraft_list[0]
+        assert ac1.hex == "ABC123"
+        assert ac1.squawk == "7000"
+        assert ac1.flight == "KLM1234 "
+        assert ac1.lat == 53.3
+        assert ac1.lon == 6.6
+        assert ac1.altitude == 15000
+        assert ac1.track == 270
 
     def test_parse_aircraft_ground_altitude(self, sample_datetime):
         """Test parsing aircraft with 'ground' altitude."""
@@ -188,14 +211,10 @@ class TestDump1090DataParser:
 
         parser = flightdata.Dump1090DataParser()
 
-        with (
-            patch("flightdata.receiver_latitude", 53.215119),
-            patch("flightdata.receiver_longitude", 6.570963),
-        ):
-            aircraft_list = parser.aircraft_data(data, sample_datetime)
+        aircraft_list = parser.aircraft_data(data, sample_datetime)
 
-            assert len(aircraft_list) == 1
-            assert aircraft_list[0].altitude == 0.0
+        assert len(aircraft_list) == 1
+        assert aircraft_list[0].altitude == 0.0
 
     def test_parse_speed_from_different_fields(self, sample_datetime):
         """Test parsing speed from speed, gs, or mach fields."""
@@ -219,21 +238,17 @@ class TestDump1090DataParser:
 
         parser = flightdata.Dump1090DataParser()
 
-        with (
-            patch("flightdata.receiver_latitude", 53.215119),
-            patch("flightdata.receiver_longitude", 6.570963),
-        ):
-            # Parse speed field
-            ac_speed = parser.aircraft_data(data_speed, sample_datetime)
-            assert ac_speed[0].speed > 300  # Should be converted from knots to mph
+        # Parse speed field
+        ac_speed = parser.aircraft_data(data_speed, sample_datetime)
+        assert ac_speed[0].speed > 300  # Should be converted from knots to mph
 
-            # Parse gs field
-            ac_gs = parser.aircraft_data(data_gs, sample_datetime)
-            assert ac_gs[0].speed > 450
+        # Parse gs field
+        ac_gs = parser.aircraft_data(data_gs, sample_datetime)
+        assert ac_gs[0].speed > 450
 
-            # Parse mach field
-            ac_mach = parser.aircraft_data(data_mach, sample_datetime)
-            assert 650 < ac_mach[0].speed < 660  # Mach 0.85 ≈ 652 mph
+        # Parse mach field
+        ac_mach = parser.aircraft_data(data_mach, sample_datetime)
+        assert 650 < ac_mach[0].speed < 660  # Mach 0.85 ≈ 652 mph
 
     def test_time_extraction(self, mock_aircraft_data):
         """Test extracting timestamp from dump1090 data."""
@@ -253,16 +268,221 @@ class TestDump1090DataParser:
 
         parser = flightdata.Dump1090DataParser()
 
-        with (
-            patch("flightdata.receiver_latitude", 53.215119),
-            patch("flightdata.receiver_longitude", 6.570963),
-        ):
-            aircraft_list = parser.aircraft_data(data, sample_datetime)
+        aircraft_list = parser.aircraft_data(data, sample_datetime)
 
-            assert len(aircraft_list) == 1
-            assert aircraft_list[0].lat is None
-            assert aircraft_list[0].lon is None
-            assert aircraft_list[0].distance == -1
+        assert len(aircraft_list) == 1
+        assert aircraft_list[0].lat is None
+        assert aircraft_list[0].lon is None
+        assert aircraft_list[0].distance == -1
+
+    def test_stream_aircraft_data(self, mock_aircraft_data, sample_datetime):
+        """Test that streaming gives the same aircraft as the full parse."""
+        parser = flightdata.Dump1090DataParser()
+        stream = io.BytesIO(json.dumps(mock_aircraft_data).encode("utf-8"))
+        header = {}
+
+        streamed = list(parser.stream_aircraft_data(stream, header))
+        parsed = parser.aircraft_data(mock_aircraft_data, sample_datetime)
+
+        assert [str(a) for a in streamed] == [str(a) for a in parsed]
+        assert header["now"] == mock_aircraft_data["now"]
+
+    def test_aircraft_reused_between_refreshes(self, sample_datetime):
+        """Test that an aircraft keeps its object from refresh to refresh."""
+        parser = flightdata.Dump1090DataParser()
+        first = {"aircraft": [{"hex": "abc123", "messages": 1}, {"hex": "def456"}]}
+        second = {"aircraft": [{"hex": "abc123", "messages": 2}, {"hex": "789abc"}]}
+
+        before = parser.aircraft_data(first, sample_datetime)
+        after = parser.aircraft_data(second, sample_datetime)
+
+        assert after[0] is before[0]
+        assert after[0].messages == 2
+        assert after[1] is not before[1]
+
+        # def456 was gone for one refresh, so it gets a new object
+        again = parser.aircraft_data(first, sample_datetime)
+        assert again[1] is not before[1]
+
+    def test_duplicate_hex_gets_own_object(self, sample_datetime):
+        """Test that a hex listed twice in one refresh isn't merged."""
+        parser = flightdata.Dump1090DataParser()
+        data = {"aircraft": [{"hex": "abc123", "lat": 53.3}, {"hex": "abc123"}]}
+
+        parser.aircraft_data(data, sample_datetime)
+        aircraft_list = parser.aircraft_data(data, sample_datetime)
+
+        assert aircraft_list[0] is not aircraft_list[1]
+        assert aircraft_list[0].lat == 53.3
+        assert aircraft_list[1].lat is None
+
+    def test_hex_and_flight_interned(self, sample_datetime):
+        """Test that repeated hex and callsign strings share one object."""
+        parser = flightdata.Dump1090DataParser()
+        first = parser.aircraft_data(
+            json.loads('{"aircraft": [{"hex": "abc123", "flight": "KLM1234 "}]}'),
+            sample_datetime,
+        )[0].copy()
+        second = parser.aircraft_data(
+            json.loads('{"aircraft": [{"hex": "abc123", "flight": "KLM1234 "}]}'),
+            sample_datetime,
+        )[0]
+
+        assert first.hex is second.hex
+        assert first.flight is second.flight
+
+
+class TestDelta:
+    """Tests for the per refresh delta of the parsers."""
+
+    def parse(self, parser, aircraft, sample_datetime):
+        return parser.aircraft_data({"aircraft": aircraft}, sample_datetime)
+
+    def test_entered_left_changed(self, sample_datetime):
+        """Test aircraft that enter, leave and change between refreshes."""
+        parser = flightdata.Dump1090DataParser()
+        first = self.parse(
+            parser,
+            [
+                {"hex": "abc123", "messages": 1, "lat": 53.3, "lon": 6.6},
+                {"hex": "def456", "messages": 1},
+            ],
+            sample_datetime,
+        )
+        assert [a.hex for a in parser.delta.entered] == ["ABC123", "DEF456"]
+        assert parser.delta.left == []
+
+        self.parse(
+            parser,
+            [
+                {"hex": "abc123", "messages": 5, "lat": 53.4, "lon": 6.6, "seen": 1},
+                {"hex": "789abc", "messages": 1},
+            ],
+            sample_datetime,
+        )
+        assert [a.hex for a in parser.delta.entered] == ["789ABC"]
+        assert parser.delta.left == [first[1]]
+        assert parser.delta.changed == {"ABC123": ("lat", "messages")}
+        assert set(parser.index) == {"ABC123", "789ABC"}
+
+    def test_unchanged_aircraft_not_parsed(self, sample_datetime):
+        """Test an aircraft without new messages is only aged."""
+        parser = flightdata.Dump1090DataParser()
+        aircraft = {"hex": "abc123", "messages": 7, "lat": 53.3, "lon": 6.6}
+        first = self.parse(parser, [dict(aircraft, seen=0.5)], sample_datetime)[0]
+        distance = first.distance
+
+        with patch.object(parser, "_locate") as mock_locate:
+            second = self.parse(parser, [dict(aircraft, seen=1.5)], sample_datetime)
+
+        mock_locate.assert_not_called()
+        assert second[0] is first
+        assert first.seen == 1.5
+        assert first.distance == distance
+        assert not parser.delta
+
+    def test_vrs_unchanged_aircraft(self, sample_datetime):
+        """Test the VRS parser skips aircraft with the same message count."""
+        parser = flightdata.VRSDataParser()
+        data = {"acList": [{"Icao": "abc123", "CMsgs": 3, "Lat": 53.3, "Long": 6.6}]}
+        parser.aircraft_data(data, sample_datetime)
+        data["acList"][0]["Lat"] = 53.4  # not looked at, no new messages
+        aircraft_list = parser.aircraft_data(data, sample_datetime)
+
+        assert aircraft_list[0].lat == 53.3
+        assert not parser.delta
+
+    def test_clear(self, sample_datetime):
+        """Test clear() lets all aircraft leave."""
+        parser = flightdata.Dump1090DataParser()
+        aircraft = self.parse(parser, [{"hex": "abc123"}], sample_datetime)
+
+        delta = parser.clear()
+
+        assert delta.left == aircraft
+        assert parser.index == {}
+        self.parse(parser, [{"hex": "abc123"}], sample_datetime)
+        assert len(parser.delta.entered) == 1
+
+
+class TestDeferredDetails:
+    """Tests for the details of aircraft outside the alarm zone."""
+
+    def parse(self, parser, aircraft, sample_datetime):
+        return parser.aircraft_data({"aircraft": aircraft}, sample_datetime)
+
+    def zone(self, distance_alarm=2):
+        return alarmzone.AlarmZone(*RECEIVER, distance_alarm, 75)
+
+    def test_outside_deferred(self, mock_aircraft_data, sample_datetime):
+        """Test only the aircraft that might be in the zone are parsed in full."""
+        parser = flightdata.Dump1090DataParser(self.zone(10))
+        aircraft = self.parse(parser, mock_aircraft_data["aircraft"], sample_datetime)
+        by_hex = {a.hex: a for a in aircraft}
+
+        # abc123 is 6 miles out, 789xyz 13 miles.
+        assert type(by_hex["ABC123"]) is flightdata.AircraftData
+        far = by_hex["789XYZ"]
+        assert type(far) is flightdata.DeferredAircraftData
+        assert far.distance is None
+        assert far.altitude == 35000
+
+        assert far.flight == "BAW888  "
+        assert type(far) is flightdata.AircraftData
+        assert far.squawk == "2000"
+
+    def test_same_as_parsed(self, mock_aircraft_data, sample_datetime):
+        """Test deferred details are what the parser without a zone gives."""
+        deferred = self.parse(
+            flightdata.Dump1090DataParser(self.zone()),
+            mock_aircraft_data["aircraft"],
+            sample_datetime,
+        )
+        parsed = self.parse(
+            flightdata.Dump1090DataParser(),
+            mock_aircraft_data["aircraft"],
+            sample_datetime,
+        )
+        for d, p in zip(deferred, parsed):
+            for name in flightdata.AircraftData.__slots__[:16]:
+                assert getattr(d, name) == getattr(p, name)
+            assert d.copy().flight == p.flight
+
+    def test_reused(self, sample_datetime):
+        """Test a reused aircraft gets the details of the new refresh."""
+        parser = flightdata.Dump1090DataParser(self.zone())
+        far = {"hex": "abc123", "messages": 1, "lat": 54.0, "lon": 6.6}
+        a = self.parse(parser, [dict(far, flight="KLM1")], sample_datetime)[0]
+        assert a.flight == "KLM1"
+
+        again = self.parse(
+            parser, [dict(far, flight="KLM2", messages=2, lat=54.1)], sample_datetime
+        )[0]
+        assert again is a
+        assert type(a) is flightdata.DeferredAircraftData
+        assert parser.delta.changed == {"ABC123": ("lat", "messages")}
+        assert a.flight == "KLM2"
+
+    def test_vrs(self, sample_datetime):
+        """Test the VRS parser defers the details too."""
+        parser = flightdata.VRSDataParser(self.zone())
+        data = {
+            "acList": [{"Icao": "abc123", "Call": "KLM1", "Lat": 54.0, "Long": 6.6}]
+        }
+        a = parser.aircraft_data(data, sample_datetime)[0]
+        assert type(a) is flightdata.DeferredAircraftData
+        assert a.lat == 54.0
+        assert a.flight == "KLM1"
+        assert a.mlat is False
+
+    def test_unknown_attribute(self, sample_datetime):
+        """Test other missing attributes still raise AttributeError."""
+        parser = flightdata.Dump1090DataParser(self.zone())
+        a = self.parse(parser, [{"hex": "abc123"}], sample_datetime)[0]
+        with pytest.raises(AttributeError, match="callsign"):
+            assert a.callsign is None
+        # Only the details are loaded on demand, and these weren't.
+        assert type(a) is flightdata.DeferredAircraftData
 
 
 class TestVRSDataParser:
@@ -272,21 +492,17 @@ class TestVRSDataParser:
         """Test parsing VRS data."""
         parser = flightdata.VRSDataParser()
 
-        with (
-            patch("flightdata.receiver_latitude", 53.215119),
-            patch("flightdata.receiver_longitude", 6.570963),
-        ):
-            aircraft_list = parser.aircraft_data(mock_vrs_data, sample_datetime)
+        aircraft_list = parser.aircraft_data(mock_vrs_data, sample_datetime)
 
-            assert len(aircraft_list) == 2
+        assert len(aircraft_list) == 2
 
-            # Check first aircraft
-            ac1 = aircraft_list[0]
-            assert ac1.hex == "ABC123"
-            assert ac1.squawk == "7000"
-            assert ac1.lat == 53.3
-            assert ac1.lon == 6.6
-            assert ac1.altitude == 15000
+        # Check first aircraft
+        ac1 = aircraft_list[0]
+        assert ac1.hex == "ABC123"
+        assert ac1.squawk == "7000"
+        assert ac1.lat == 53.3
+        assert ac1.lon == 6.6
+        assert ac1.altitude == 15000
 
     def test_vrs_time_extraction(self, mock_vrs_data):
         """Test extracting timestamp from VRS data."""
@@ -312,14 +528,10 @@ class TestVRSDataParser:
 
         parser = flightdata.VRSDataParser()
 
-        with (
-            patch("flightdata.receiver_latitude", 53.215119),
-            patch("flightdata.receiver_longitude", 6.570963),
-        ):
-            aircraft_list = parser.aircraft_data(data, sample_datetime)
+        aircraft_list = parser.aircraft_data(data, sample_datetime)
 
-            # 400 knots ≈ 460 mph
-            assert 450 < aircraft_list[0].speed < 470
+        # 400 knots ≈ 460 mph
+        assert 450 < aircraft_list[0].speed < 470
 
 
 class TestFlightData:
@@ -330,16 +542,14 @@ class TestFlightData:
         parser = flightdata.Dump1090DataParser()
 
         with (
-            patch("flightdata.urlopen") as mock_urlopen,
-            patch("flightdata.receiver_latitude", 53.215119),
-            patch("flightdata.receiver_longitude", 6.570963),
+            patch("flightdata.httpfetch.HTTPFetcher") as mock_fetcher_class,
         ):
             # Mock the HTTP response
-            mock_response = MagicMock()
-            mock_response.read.return_value = json.dumps(mock_aircraft_data).encode(
+            mock_fetcher = MagicMock()
+            mock_fetcher.fetch.return_value = json.dumps(mock_aircraft_data).encode(
                 "utf-8"
             )
-            mock_urlopen.return_value = mock_response
+            mock_fetcher_class.return_value = mock_fetcher
 
             # Create FlightData
             fd = flightdata.FlightData(
@@ -356,15 +566,13 @@ class TestFlightData:
         parser = flightdata.Dump1090DataParser()
 
         with (
-            patch("flightdata.urlopen") as mock_urlopen,
-            patch("flightdata.receiver_latitude", 53.215119),
-            patch("flightdata.receiver_longitude", 6.570963),
+            patch("flightdata.httpfetch.HTTPFetcher") as mock_fetcher_class,
         ):
-            mock_response = MagicMock()
-            mock_response.read.return_value = json.dumps(mock_aircraft_data).encode(
+            mock_fetcher = MagicMock()
+            mock_fetcher.fetch.return_value = json.dumps(mock_aircraft_data).encode(
                 "utf-8"
             )
-            mock_urlopen.return_value = mock_response
+            mock_fetcher_class.return_value = mock_fetcher
 
             fd = flightdata.FlightData(
                 data_url="http://localhost/aircraft.json", parser=parser
@@ -374,7 +582,7 @@ class TestFlightData:
             updated_data = mock_aircraft_data.copy()
             updated_data["now"] = 1706360500.0  # 100 seconds later
 
-            mock_response.read.return_value = json.dumps(updated_data).encode("utf-8")
+            mock_fetcher.fetch.return_value = json.dumps(updated_data).encode("utf-8")
 
             fd.refresh()
 
@@ -386,14 +594,14 @@ class TestFlightData:
         parser = flightdata.Dump1090DataParser()
 
         with (
-            patch("flightdata.urlopen") as mock_urlopen,
-            patch("flightdata.receiver_latitude", 53.215119),
-            patch("flightdata.receiver_longitude", 6.570963),
+            patch("flightdata.httpfetch.HTTPFetcher") as mock_fetcher_class,
         ):
             # Simulate network error
             from urllib.error import URLError
 
-            mock_urlopen.side_effect = URLError("Connection refused")
+            mock_fetcher_class.return_value.fetch.side_effect = URLError(
+                "Connection refused"
+            )
 
             fd = flightdata.FlightData(
                 data_url="http://localhost/aircraft.json", parser=parser
@@ -407,13 +615,11 @@ class TestFlightData:
         parser = flightdata.Dump1090DataParser()
 
         with (
-            patch("flightdata.urlopen") as mock_urlopen,
-            patch("flightdata.receiver_latitude", 53.215119),
-            patch("flightdata.receiver_longitude", 6.570963),
+            patch("flightdata.httpfetch.HTTPFetcher") as mock_fetcher_class,
         ):
-            mock_response = MagicMock()
-            mock_response.read.return_value = b"invalid json {"
-            mock_urlopen.return_value = mock_response
+            mock_fetcher = MagicMock()
+            mock_fetcher.fetch.return_value = b"invalid json {"
+            mock_fetcher_class.return_value = mock_fetcher
 
             fd = flightdata.FlightData(
                 data_url="http://localhost/aircraft.json", parser=parser
@@ -422,6 +628,219 @@ class TestFlightData:
             # Should return empty list on JSON decode error
             assert fd.aircraft == []
 
+    def test_flightdata_not_modified(self, mock_aircraft_data):
+        """Test that a 304 keeps the last aircraft and skips the parse."""
+        parser = flightdata.Dump1090DataParser()
+
+        with (
+            patch("flightdata.httpfetch.HTTPFetcher") as mock_fetcher_class,
+        ):
+            mock_fetcher = MagicMock()
+            mock_fetcher.fetch.return_value = json.dumps(mock_aircraft_data).encode(
+                "utf-8"
+            )
+            mock_fetcher_class.return_value = mock_fetcher
+
+            fd = flightdata.FlightData(
+                data_url="http://localhost/aircraft.json", parser=parser
+            )
+            aircraft, time = fd.aircraft, fd.time
+
+            # The fetcher returns None when the server answers 304
+            mock_fetcher.fetch.return_value = None
+            fd.refresh()
+
+            assert fd.aircraft is aircraft
+            assert fd.time == time
+            assert fd.parses_skipped == 1
+
+    def test_flightdata_delta(self, mock_aircraft_data):
+        """Test FlightData publishes the delta and index of each refresh."""
+        mock_fetcher = MagicMock()
+        mock_fetcher.fetch.return_value = json.dumps(mock_aircraft_data).encode()
+
+        fd = flightdata.FlightData(
+            parser=flightdata.Dump1090DataParser(), fetcher=mock_fetcher
+        )
+        assert len(fd.delta.entered) == 4
+        assert set(fd.index) == {a.hex for a in fd.aircraft}
+
+        mock_fetcher.fetch.return_value = None
+        fd.refresh()
+        assert not fd.delta
+
+        mock_fetcher.fetch.side_effect = OSError("unreachable")
+        fd.refresh()
+        assert len(fd.delta.left) == 4
+        assert fd.index == {}
+
+    def test_flightdata_error_invalidates_fetcher(self):
+        """Test that an error forces a full download on the next refresh."""
+        parser = flightdata.Dump1090DataParser()
+
+        with patch("flightdata.httpfetch.HTTPFetcher") as mock_fetcher_class:
+            mock_fetcher = MagicMock()
+            mock_fetcher.fetch.return_value = b"invalid json {"
+            mock_fetcher_class.return_value = mock_fetcher
+
+            flightdata.FlightData(
+                data_url="http://localhost/aircraft.json", parser=parser
+            )
+
+            mock_fetcher.invalidate.assert_called_once()
+
+    def test_flightdata_stream(self, mock_aircraft_data):
+        """Test refreshing in streaming mode."""
+        parser = flightdata.Dump1090DataParser()
+
+        with (
+            patch("flightdata.httpfetch.HTTPFetcher") as mock_fetcher_class,
+        ):
+            mock_fetcher = MagicMock()
+            mock_fetcher.open.return_value = io.BytesIO(
+                json.dumps(mock_aircraft_data).encode("utf-8")
+            )
+            mock_fetcher_class.return_value = mock_fetcher
+
+            fd = flightdata.FlightData(
+                data_url="http://localhost/aircraft.json", parser=parser, stream=True
+            )
+
+            assert len(fd.aircraft) == 4
+            assert fd.time == datetime.fromtimestamp(mock_aircraft_data["now"])
+            mock_fetcher.fetch.assert_not_called()
+
+            # Not modified
+            mock_fetcher.open.return_value = None
+            fd.refresh()
+            assert len(fd.aircraft) == 4
+            assert fd.parses_skipped == 1
+
+            # Truncated download
+            mock_fetcher.open.return_value = io.BytesIO(b'{"now": 1, "aircraft": [{')
+            fd.refresh()
+            assert fd.aircraft == []
+            assert len(fd.delta.left) == 4
+
+    def test_clear_after_truncated_refresh(self, mock_aircraft_data):
+        """Test the aircraft of the last good refresh leave when one fails."""
+        raw = json.dumps(mock_aircraft_data).encode()
+        # Cut off after the first aircraft, which is parsed already.
+        truncated = raw[: raw.index(b"}, {") + 3]
+
+        with (
+            patch("flightdata.httpfetch.HTTPFetcher") as mock_fetcher_class,
+        ):
+            mock_fetcher = mock_fetcher_class.return_value
+            mock_fetcher.open.return_value = io.BytesIO(raw)
+            fd = flightdata.FlightData(
+                data_url="http://localhost/aircraft.json",
+                parser=flightdata.Dump1090DataParser(),
+                stream=True,
+            )
+            before = {a.hex for a in fd.aircraft}
+            assert len(before) == 4
+
+            mock_fetcher.open.return_value = io.BytesIO(truncated)
+            fd.refresh()
+
+        assert fd.aircraft == []
+        assert {a.hex for a in fd.delta.left} == before
+        assert fd.delta.entered == []
+
+
+class FakeAsyncFetcher:
+    """
+    Async fetcher that returns the given bodies, or raises them, optionally
+    after a delay.
+    """
+
+    def __init__(self, *bodies, delay=0):
+        self.bodies = list(bodies)
+        self.delay = delay
+        self.closed = 0
+
+    async def fetch(self):
+        await asyncio.sleep(self.delay)
+        body = self.bodies.pop(0)
+        if isinstance(body, Exception):
+            raise body
+        return body
+
+    def invalidate(self):
+        pass
+
+    def close(self):
+        self.closed += 1
+
+
+class TestAsyncFlightData:
+    """Tests for AsyncFlightData."""
+
+    def test_refresh(self, mock_aircraft_data):
+        """Test that fetched data is parsed like FlightData does."""
+        body = json.dumps(mock_aircraft_data).encode()
+        fd = flightdata.AsyncFlightData(
+            parser=flightdata.Dump1090DataParser(),
+            fetcher=FakeAsyncFetcher(body, None),
+        )
+        assert len(fd.aircraft) == 4
+
+        fd.refresh()
+        assert fd.parses_skipped == 1
+        assert len(fd.aircraft) == 4
+        fd.close()
+
+    def test_deadline_keeps_last_good(self, mock_aircraft_data):
+        """Test that a late refresh is cancelled and the last aircraft kept."""
+        body = json.dumps(mock_aircraft_data).encode()
+        fetcher = FakeAsyncFetcher(body, body)
+        fd = flightdata.AsyncFlightData(
+            parser=flightdata.Dump1090DataParser(), fetcher=fetcher, deadline=0.05
+        )
+        aircraft, time = fd.aircraft, fd.time
+
+        fetcher.delay = 1
+        fd.refresh()
+
+        assert fd.deadlines_missed == 1
+        assert fetcher.closed == 1
+        assert fd.aircraft is aircraft
+        assert fd.time == time
+        assert not fd.delta
+        fd.close()
+
+    def test_stale_data_expires(self, mock_aircraft_data):
+        """Test that the last good aircraft are dropped after max_stale."""
+        body = json.dumps(mock_aircraft_data).encode()
+        fd = flightdata.AsyncFlightData(
+            parser=flightdata.Dump1090DataParser(),
+            fetcher=FakeAsyncFetcher(body, OSError("down"), OSError("down")),
+            max_stale=60,
+        )
+
+        fd.refresh()
+        assert len(fd.aircraft) == 4
+
+        fd.last_good -= 61
+        fd.refresh()
+        assert fd.aircraft == []
+        assert len(fd.delta.left) == 4
+        fd.close()
+
+    def test_refresh_async(self, mock_aircraft_data):
+        """Test that refresh_async() runs on another event loop too."""
+        body = json.dumps(mock_aircraft_data).encode()
+        fetcher = FakeAsyncFetcher(body, body)
+        fd = flightdata.AsyncFlightData(
+            parser=flightdata.Dump1090DataParser(), fetcher=fetcher
+        )
+
+        asyncio.run(fd.refresh_async())
+
+        assert fetcher.bodies == []
+        fd.close()
+
 
 class TestIntegration:
     """Integration tests for flight data parsing."""
@@ -431,15 +850,13 @@ class TestIntegration:
         parser = flightdata.Dump1090DataParser()
 
         with (
-            patch("flightdata.urlopen") as mock_urlopen,
-            patch("flightdata.receiver_latitude", 53.215119),
-            patch("flightdata.receiver_longitude", 6.570963),
+            patch("flightdata.httpfetch.HTTPFetcher") as mock_fetcher_class,
         ):
-            mock_response = MagicMock()
-            mock_response.read.return_value = json.dumps(mock_aircraft_data).encode(
+            mock_fetcher = MagicMock()
+            mock_fetcher.fetch.return_value = json.dumps(mock_aircraft_data).encode(
                 "utf-8"
             )
-            mock_urlopen.return_value = mock_response
+            mock_fetcher_class.return_value = mock_fetcher
 
             fd = flightdata.FlightData(
                 data_url="http://localhost/aircraft.json", parser=parser
@@ -2,8 +2,12 @@
 Tests for geomath.py - geographic calculations and unit conversions.
 """
 
+import math
+import random
+
 import pytest
 import geomath
+from tests.conftest import RECEIVER
 
 
 class TestHeadingString:
@@ -98,7 +102,7 @@ class TestDistance:
 
     def test_distance_same_point(self):
         # Distance from a point to itself should be 0
-        point = (53.215119, 6.570963)
+        point = RECEIVER
         assert geomath.distance(point, point) == 0
 
     def test_distance_short(self, receiver_coords):
@@ -187,12 +191,121 @@ class TestBearing:
 
     def test_bearing_same_point(self):
         # Bearing from a point to itself
-        point = (53.215119, 6.570963)
+        point = RECEIVER
         bearing = geomath.bearing(point, point)
         # Should be 0 or close to it (may have floating point imprecision)
         assert 0 <= bearing < 360
 
 
+class TestLocalFrame:
+    """Tests for LocalFrame, the flat frame at the receiver."""
+
+    @pytest.mark.parametrize(
+        "latitude, miles, distance_error, azimuth_error",
+        [
+            (RECEIVER[0], 10, 1e-6, 1e-4),
+            (RECEIVER[0], 25, 7e-6, 3e-4),
+            (RECEIVER[0], 100, 1e-4, 5e-3),
+            (70.0, 10, 3e-6, 1e-4),
+            (70.0, 25, 2e-5, 3e-4),
+            (70.0, 100, 3e-4, 5e-3),
+        ],
+    )
+    def test_error_bound(self, latitude, miles, distance_error, azimuth_error):
+        """Test the documented error against distance() and bearing()."""
+        receiver = (latitude, RECEIVER[1])
+        frame = geomath.LocalFrame(*receiver)
+        assert frame.distance_error(miles) <= distance_error
+        rnd = random.Random(miles)
+        for _ in range(2000):
+            b = rnd.uniform(0, 2 * math.pi)
+            d = rnd.uniform(0.1, miles)
+            pos = (
+                receiver[0] + d * math.cos(b) / frame.ky,
+                receiver[1] + d * math.sin(b) / frame.kx,
+            )
+            distance, az, el, _ = frame.locate(*pos, 10000)
+
+            expected = geomath.distance(receiver, pos)
+            error = frame.distance_error(expected)
+            assert abs(distance - expected) <= error * expected
+            expected_az = geomath.bearing(receiver, pos)
+            assert abs((az - expected_az + 180) % 360 - 180) <= azimuth_error
+            assert el == pytest.approx(
+                math.degrees(math.atan(10000 / (distance * 5280)))
+            )
+
+    def test_error_grows_to_the_pole(self):
+        """Test the bound holds at 80 degrees, where it is 30 times larger."""
+        receiver = (80.0, RECEIVER[1])
+        frame = geomath.LocalFrame(*receiver)
+        assert frame.distance_error(100) > 30 * geomath.DISTANCE_ERROR * 100
+        for bearing in range(0, 360, 15):
+            b = math.radians(bearing)
+            pos = (
+                receiver[0] + 100 * math.cos(b) / frame.ky,
+                receiver[1] + 100 * math.sin(b) / frame.kx,
+            )
+            expected = geomath.distance(receiver, pos)
+            distance = frame.locate(*pos, 0)[0]
+            assert abs(distance - expected) <= frame.distance_error(expected) * expected
+
+    def test_at_receiver(self):
+        """Test an aircraft right above the receiver."""
+        frame = geomath.LocalFrame(*RECEIVER)
+        assert frame.locate(*RECEIVER, 5280) == (0.0, 0.0, 0.0, 1.0)
+
+
+class TestEcefFrame:
+    """Tests for EcefFrame, true elevation and slant range."""
+
+    def test_great_circle(self):
+        """Test the distance and azimuth are those of distance() and bearing()."""
+        frame = geomath.EcefFrame(*RECEIVER)
+        rnd = random.Random(7)
+        for _ in range(1000):
+            pos = (
+                RECEIVER[0] + rnd.uniform(-3, 3),
+                RECEIVER[1] + rnd.uniform(-5, 5),
+            )
+            distance, az, _, _ = frame.locate(*pos, 10000)
+            assert distance == pytest.approx(geomath.distance(RECEIVER, pos))
+            expected_az = geomath.bearing(RECEIVER, pos)
+            assert abs((az - expected_az + 180) % 360 - 180) < 1e-9
+
+    def test_nearby(self):
+        """Test nearby aircraft are where the flat elevation puts them."""
+        frame = geomath.EcefFrame(*RECEIVER)
+        distance, _, el, slant = frame.locate(RECEIVER[0] + 0.02, 6.57, 5000)
+        flat = math.degrees(math.atan(5000 / (distance * 5280)))
+        assert el == pytest.approx(flat, abs=0.05)
+        assert slant == pytest.approx(math.hypot(distance, 5000 / 5280), rel=1e-4)
+
+    def test_overhead(self):
+        """Test an aircraft right above the receiver."""
+        frame = geomath.EcefFrame(*RECEIVER, altitude=100)
+        distance, _, el, slant = frame.locate(*RECEIVER, 5380)
+        assert distance == 0
+        assert el == 90
+        assert slant == pytest.approx(1)
+
+    def test_below_horizon(self):
+        """Test the curvature of the earth hides a low aircraft far away."""
+        frame = geomath.EcefFrame(*RECEIVER)
+        pos = (RECEIVER[0] + 1.5, RECEIVER[1])
+        _, _, el, _ = frame.locate(*pos, 3000)
+        assert el < 0
+        _, _, el, _ = frame.locate(*pos, 35000)
+        assert 0 < el < math.degrees(math.atan(35000 / (103.5 * 5280)))
+
+    def test_receiver_altitude(self):
+        """Test a receiver on a hill sees the aircraft lower."""
+        pos = (RECEIVER[0] + 0.2, RECEIVER[1])
+        _, _, low, _ = geomath.EcefFrame(*RECEIVER).locate(*pos, 3000)
+        _, _, high, _ = geomath.EcefFrame(*RECEIVER, 2000).locate(*pos, 3000)
+        assert high < low
+
+
 class TestIntegration:
     """Integration tests combining multiple functions."""
 
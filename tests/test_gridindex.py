@@ -0,0 +1,113 @@
+"""
+Tests for gridindex.py - the aircraft in a uniform lat/lon grid.
+
+The queries must give the same aircraft as a scan of all of them.
+"""
+
+import random
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+import flightdata
+import geomath
+import gridindex
+from tests.conftest import RECEIVER, make_aircraft
+
+
+def refresh(entered=(), left=(), changed=None, index=None):
+    """A data source right after a refresh."""
+    return SimpleNamespace(
+        delta=flightdata.Delta(list(entered), list(left), changed or {}),
+        index=index or {},
+    )
+
+
+@pytest.fixture
+def scattered():
+    rnd = random.Random(11)
+    return [
+        make_aircraft(
+            dhex=f"{i:06X}",
+            lat=RECEIVER[0] + rnd.uniform(-2, 2),
+            lon=RECEIVER[1] + rnd.uniform(-3, 3),
+        )
+        for i in range(2000)
+    ]
+
+
+class TestGridIndex:
+    """Tests for GridIndex."""
+
+    def test_radius_matches_scan(self, scattered):
+        """Test a radius query finds exactly the aircraft a full scan finds."""
+        grid = gridindex.GridIndex()
+        grid.update(refresh(entered=scattered))
+        assert len(grid) == 2000
+
+        for miles in (0.5, 5, 20, 80):
+            found = grid.radius(*RECEIVER, miles)
+            expected = {
+                a.hex
+                for a in scattered
+                if geomath.distance(RECEIVER, (a.lat, a.lon)) <= miles
+            }
+            assert {a.hex for _, a in found} == expected
+            distances = [d for d, _ in found]
+            assert distances == sorted(distances)
+
+    def test_box_matches_scan(self, scattered):
+        """Test a box query finds exactly the aircraft inside it."""
+        grid = gridindex.GridIndex(cell_degrees=0.25)
+        grid.update(refresh(entered=scattered))
+        box = (52.9, 53.6, 5.0, 7.1)
+        expected = {
+            a.hex
+            for a in scattered
+            if box[0] <= a.lat <= box[1] and box[2] <= a.lon <= box[3]
+        }
+        assert {a.hex for a in grid.box(*box)} == expected
+
+    def test_follows_delta(self):
+        """Test aircraft that moved, left or lost their position are refiled."""
+        a = make_aircraft(dhex="ABC123", lat=53.2, lon=6.5)
+        b = make_aircraft(dhex="DEF456", lat=53.2, lon=6.5)
+        grid = gridindex.GridIndex()
+        grid.update(refresh(entered=[a, b]))
+
+        a.lat, a.lon = 54.2, 8.5  # updated in place by the parser
+        b.lat = b.lon = None
+        grid.update(
+            refresh(
+                changed={"ABC123": ("lat", "lon"), "DEF456": ("lat", "lon")},
+                index={"ABC123": a, "DEF456": b},
+            )
+        )
+        assert grid.box(53, 53.5, 6, 7) == []
+        assert grid.box(54, 54.5, 8, 9) == [a]
+        assert len(grid) == 1
+
+        grid.update(refresh(left=[a]))
+        assert len(grid) == 0
+        assert grid.cells == {}
+
+    def test_parser_delta(self, mock_aircraft_data):
+        """Test the index of a parsed refresh."""
+        parser = flightdata.Dump1090DataParser()
+        parser.aircraft_data(mock_aircraft_data, datetime(2024, 1, 27))
+        grid = gridindex.GridIndex()
+        grid.update(SimpleNamespace(delta=parser.delta, index=parser.index))
+        # The aircraft without a position isn't indexed.
+        assert len(grid) == 3
+        assert [a.hex for _, a in grid.radius(53.25, 6.55, 1)] == ["DEF456"]
+
+    def test_antimeridian(self):
+        """Test boxes and radii across 180 degrees longitude."""
+        east = make_aircraft(dhex="ABC123", lat=10, lon=179.95)
+        west = make_aircraft(dhex="DEF456", lat=10, lon=-179.95)
+        grid = gridindex.GridIndex()
+        grid.update(refresh(entered=[east, west]))
+
+        assert {a.hex for a in grid.box(9, 11, 179.9, -179.9)} == {"ABC123", "DEF456"}
+        assert {a.hex for _, a in grid.radius(10, 180, 10)} == {"ABC123", "DEF456"}
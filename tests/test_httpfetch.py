@@ -0,0 +1,303 @@
+"""
+Tests for httpfetch.py - keep-alive, conditional and gzip fetching.
+
+Runs a throwaway HTTP server on localhost, no external network is used.
+"""
+
+import asyncio
+import gzip
+import http.client
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import HTTPError
+
+import pytest
+
+import flightdata
+import httpfetch
+
+BODY = b'{"now": 1706360400.0, "aircraft": []}' * 50
+ETAG = '"abc"'
+LAST_MODIFIED = "Sat, 27 Jan 2024 14:30:00 GMT"
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.connections.add(self.client_address)
+        self.server.headers_seen.append(dict(self.headers))
+        if self.path == "/slow":
+            time.sleep(1)
+        if self.path == "/chunked":
+            self.send_response(200)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i in range(0, len(BODY), 500):
+                chunk = BODY[i : i + 500]
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+            return
+        if self.path == "/garbage":
+            self.wfile.write(b"garbage\r\n\r\n")
+            self.close_connection = True
+            return
+        if self.path == "/truncated":
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(BODY)))
+            self.end_headers()
+            self.wfile.write(BODY[:100])
+            self.close_connection = True
+            return
+        if self.path == "/bad-gzip":
+            body = gzip.compress(BODY)[:-10]
+            self.send_response(200)
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if self.path == "/missing":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.send_header("ETag", ETAG)
+            self.end_headers()
+            return
+        body = BODY
+        self.send_response(200)
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(BODY)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("ETag", ETAG)
+        self.send_header("Last-Modified", LAST_MODIFIED)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        if self.path == "/idle-timeout":
+            # Drop the connection without announcing it, like an idle timeout.
+            self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.connections = set()
+    httpd.headers_seen = []
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def url(server, path="/aircraft.json"):
+    return "http://127.0.0.1:{}{}".format(server.server_address[1], path)
+
+
+class TestHTTPFetcher:
+    """Tests for HTTPFetcher."""
+
+    def test_fetch_decompresses_gzip(self, server):
+        """Test that gzip is negotiated and the body is decompressed."""
+        fetcher = httpfetch.HTTPFetcher(url(server))
+        body = fetcher.fetch()
+
+        assert body == BODY
+        assert server.headers_seen[0]["Accept-Encoding"] == "gzip"
+        assert fetcher.bytes_received < len(BODY)
+        assert fetcher.bytes_saved == len(BODY) - fetcher.bytes_received
+
+    def test_fetch_not_modified(self, server):
+        """Test that validators are sent and a 304 returns None."""
+        fetcher = httpfetch.HTTPFetcher(url(server))
+        fetcher.fetch()
+        wire_size = fetcher.bytes_received
+        saved = fetcher.bytes_saved
+
+        assert fetcher.fetch() is None
+        assert server.headers_seen[1]["If-None-Match"] == ETAG
+        assert server.headers_seen[1]["If-Modified-Since"] == LAST_MODIFIED
+        assert fetcher.not_modified == 1
+        assert fetcher.bytes_saved == saved + wire_size
+
+    def test_fetch_reuses_connection(self, server):
+        """Test that consecutive fetches share one keep-alive connection."""
+        fetcher = httpfetch.HTTPFetcher(url(server))
+        for _ in range(3):
+            fetcher.fetch()
+
+        assert fetcher.requests == 3
+        assert len(server.connections) == 1
+
+    def test_invalidate_forces_download(self, server):
+        """Test that invalidate() drops the validators."""
+        fetcher = httpfetch.HTTPFetcher(url(server))
+        fetcher.fetch()
+        fetcher.invalidate()
+
+        assert fetcher.fetch() == BODY
+        assert "If-None-Match" not in server.headers_seen[1]
+
+    def test_reconnects_after_server_close(self, server):
+        """Test that a closed keep-alive connection is transparently reopened."""
+        fetcher = httpfetch.HTTPFetcher(url(server, "/idle-timeout"))
+        fetcher.fetch()
+        fetcher.invalidate()
+
+        assert fetcher.fetch() == BODY
+        assert len(server.connections) == 2
+
+    def test_open_streams_gzip(self, server):
+        """Test reading a gzipped body in chunks through open()."""
+        fetcher = httpfetch.HTTPFetcher(url(server))
+        chunks = []
+        with fetcher.open() as stream:
+            while chunk := stream.read(100):
+                chunks.append(chunk)
+
+        assert b"".join(chunks) == BODY
+        assert len(chunks) > 1
+        assert fetcher.bytes_saved == len(BODY) - fetcher.bytes_received
+
+    def test_open_partial_read_keeps_connection(self, server):
+        """Test that closing a half read stream leaves the connection usable."""
+        fetcher = httpfetch.HTTPFetcher(url(server))
+        with fetcher.open() as stream:
+            stream.read(10)
+        fetcher.invalidate()
+
+        assert fetcher.fetch() == BODY
+        assert len(server.connections) == 1
+
+    def test_http_error(self, server):
+        """Test that non-200 answers raise HTTPError."""
+        fetcher = httpfetch.HTTPFetcher(url(server, "/missing"))
+        with pytest.raises(HTTPError):
+            fetcher.fetch()
+
+    def test_file_url(self, tmp_path):
+        """Test that non-http URLs are read with urlopen."""
+        path = tmp_path / "aircraft.json"
+        path.write_bytes(BODY)
+        fetcher = httpfetch.HTTPFetcher(path.as_uri())
+
+        assert fetcher.fetch() == BODY
+        assert fetcher.fetch() == BODY
+
+
+class TestAsyncHTTPFetcher:
+    """Tests for AsyncHTTPFetcher."""
+
+    def fetch(self, fetcher, times=1):
+        async def run():
+            return [await fetcher.fetch() for _ in range(times)]
+
+        return asyncio.run(run())
+
+    def test_fetch_gzip_and_not_modified(self, server):
+        """Test gzip, validators and 304 like HTTPFetcher."""
+        fetcher = httpfetch.AsyncHTTPFetcher(url(server))
+
+        assert self.fetch(fetcher, 2) == [BODY, None]
+        assert server.headers_seen[1]["If-None-Match"] == ETAG
+        assert fetcher.not_modified == 1
+        assert fetcher.bytes_received < len(BODY)
+        assert len(server.connections) == 1
+
+    def test_chunked(self, server):
+        """Test a chunked body."""
+        fetcher = httpfetch.AsyncHTTPFetcher(url(server, "/chunked"))
+
+        assert self.fetch(fetcher, 2) == [BODY, BODY]
+        assert len(server.connections) == 1
+
+    def test_reconnects_after_server_close(self, server):
+        """Test that a closed keep-alive connection is reopened."""
+        fetcher = httpfetch.AsyncHTTPFetcher(url(server, "/idle-timeout"))
+
+        async def run():
+            await fetcher.fetch()
+            fetcher.invalidate()
+            await asyncio.sleep(0.1)  # let the close arrive
+            return await fetcher.fetch()
+
+        assert asyncio.run(run()) == BODY
+        assert len(server.connections) == 2
+
+    def test_http_error(self, server):
+        """Test that non-200 answers raise HTTPError."""
+        fetcher = httpfetch.AsyncHTTPFetcher(url(server, "/missing"))
+        with pytest.raises(HTTPError):
+            self.fetch(fetcher)
+
+    def test_truncated_body(self, server):
+        """Test a body cut short on a fresh connection is an HTTPException."""
+        fetcher = httpfetch.AsyncHTTPFetcher(url(server, "/truncated"))
+        with pytest.raises(http.client.IncompleteRead):
+            self.fetch(fetcher)
+        assert fetcher.writer is None
+
+    def test_garbage_status_line(self, server):
+        """Test an invalid status line is an HTTPException."""
+        fetcher = httpfetch.AsyncHTTPFetcher(url(server, "/garbage"))
+        with pytest.raises(http.client.BadStatusLine):
+            self.fetch(fetcher)
+        assert fetcher.writer is None
+
+    def test_bad_gzip(self, server):
+        """Test a gzip body cut short raises EOFError, not an HTTPException."""
+        fetcher = httpfetch.AsyncHTTPFetcher(url(server, "/bad-gzip"))
+        with pytest.raises(EOFError):
+            self.fetch(fetcher)
+
+    def test_host_header(self, server):
+        """Test the Host header names the port unless it is the default."""
+        fetcher = httpfetch.AsyncHTTPFetcher(url(server))
+        self.fetch(fetcher)
+
+        port = server.server_address[1]
+        assert server.headers_seen[0]["Host"] == f"127.0.0.1:{port}"
+        for address, host in (
+            ("http://example.com/a", "example.com"),
+            ("http://example.com:80/a", "example.com"),
+            ("https://example.com/a", "example.com"),
+            ("https://example.com:8443/a", "example.com:8443"),
+            ("http://[::1]:8080/a", "[::1]:8080"),
+        ):
+            assert httpfetch.AsyncHTTPFetcher(address).host_header == host
+
+    def test_async_flight_data_survives(self, server):
+        """Test AsyncFlightData keeps running on all of them, like FlightData."""
+        for path in ("/truncated", "/garbage", "/bad-gzip"):
+            fd = flightdata.AsyncFlightData(
+                parser=flightdata.Dump1090DataParser(),
+                fetcher=httpfetch.AsyncHTTPFetcher(url(server, path)),
+            )
+            fd.refresh()
+            assert fd.aircraft == []
+            fd.close()
+
+    def test_cancelled_fetch_closes_connection(self, server):
+        """Test that a fetch cancelled by a deadline drops the connection."""
+        fetcher = httpfetch.AsyncHTTPFetcher(url(server, "/slow"))
+
+        async def run():
+            with pytest.raises(TimeoutError):
+                async with asyncio.timeout(0.1):
+                    await fetcher.fetch()
+
+        asyncio.run(run())
+        assert fetcher.writer is None
+
+    def test_only_http(self, tmp_path):
+        """Test that other schemes are refused."""
+        with pytest.raises(ValueError):
+            httpfetch.AsyncHTTPFetcher((tmp_path / "aircraft.json").as_uri())
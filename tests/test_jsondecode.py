@@ -0,0 +1,104 @@
+"""
+Tests for jsondecode.py - the JSON decoder backends.
+"""
+
+import json
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+import alarmzone
+import flightdata
+import jsondecode
+from tests.conftest import RECEIVER
+
+DATA = Path(__file__).parent / "data"
+
+
+class TestGetDecoder:
+    """Tests for picking the decoder."""
+
+    def test_fallback(self):
+        """Test the json module is used when nothing faster is installed."""
+        with patch("jsondecode.orjson", None), patch("jsondecode.msgspec", None):
+            assert list(jsondecode.backends()) == ["json"]
+            assert jsondecode.get_decoder() is json.loads
+
+    def test_orjson_first(self):
+        """Test auto prefers orjson."""
+        orjson = pytest.importorskip("orjson")
+        assert jsondecode.get_decoder("auto") is orjson.loads
+        assert jsondecode.get_decoder("json") is json.loads
+
+    def test_unknown(self):
+        """Test unknown and missing decoders are configuration errors."""
+        with pytest.raises(ValueError, match="Unknown json_decoder"):
+            jsondecode.get_decoder("simdjson")
+        with patch("jsondecode.msgspec", None):
+            with pytest.raises(ValueError, match="not installed"):
+                jsondecode.get_decoder("msgspec")
+
+
+class TestBackends:
+    """Tests that every installed backend decodes the same."""
+
+    @pytest.mark.parametrize("name", list(jsondecode.backends()))
+    def test_same_document(self, name):
+        """Test the bytes of aircraft.json decode to what json.loads gives."""
+        raw = (DATA / "aircraft.json").read_bytes()
+        assert jsondecode.get_decoder(name)(raw) == json.loads(raw)
+
+    @pytest.mark.parametrize("name", list(jsondecode.backends()))
+    def test_invalid(self, name):
+        """Test invalid JSON raises DecodeError."""
+        with pytest.raises(jsondecode.DecodeError):
+            jsondecode.get_decoder(name)(b'{"aircraft": [')
+
+
+class TestDump1090Decoder:
+    """Tests for decoding aircraft.json into typed structs."""
+
+    def test_only_msgspec(self):
+        """Test the typed decoder is only used with msgspec."""
+        assert jsondecode.get_dump1090_decoder("json") is None
+        assert jsondecode.get_dump1090_decoder("orjson") is None
+        with patch("jsondecode.msgspec", None):
+            assert jsondecode.get_dump1090_decoder("auto") is None
+
+    @pytest.mark.parametrize("zone", [False, True])
+    def test_same_aircraft(self, at_receiver, sample_datetime, zone):
+        """Test the structs parse into the aircraft of the decoded dicts."""
+        pytest.importorskip("msgspec")
+        raw = (DATA / "aircraft.json").read_bytes()
+        document = json.loads(raw)
+        # Also every way an altitude and a speed can be given.
+        document["aircraft"] += [
+            {"hex": "aaa001", "alt_baro": "ground", "gs": 12.5},
+            {"hex": "aaa002", "altitude": 1500, "speed": 120},
+            {"hex": "aaa003", "alt_baro": 35000, "mach": 0.78, "mlat": ["lat"]},
+            {"flight": "NOHEX   ", "nucp": 7, "squawk": "7700"},
+        ]
+        raw = json.dumps(document).encode()
+        typed = jsondecode.get_dump1090_decoder("msgspec")(raw)
+        parsers = [
+            flightdata.Dump1090DataParser(
+                alarmzone.AlarmZone(*RECEIVER, 2, 75) if zone else None
+            )
+            for _ in range(2)
+        ]
+        expected = parsers[0].aircraft_data(json.loads(raw), sample_datetime)
+        found = parsers[1].aircraft_data(typed, sample_datetime)
+        assert parsers[1].time(typed) == parsers[0].time(json.loads(raw))
+        assert len(found) == len(expected) > 4
+        for a, b in zip(found, expected):
+            for name in flightdata.AircraftData.__slots__:
+                if name != "_pending":
+                    assert getattr(a, name) == getattr(b, name), name
+
+    def test_wrong_type(self):
+        """Test a member of the wrong type fails like invalid JSON."""
+        pytest.importorskip("msgspec")
+        decode = jsondecode.get_dump1090_decoder("msgspec")
+        with pytest.raises(jsondecode.DecodeError):
+            decode(b'{"now": 1, "aircraft": [{"hex": "abc123", "lat": "north"}]}')
@@ -0,0 +1,88 @@
+"""
+Tests for jsonstream.py - incremental walking of a JSON array.
+"""
+
+import io
+import json
+
+import pytest
+
+import jsonstream
+
+
+def stream_of(doc):
+    return io.BytesIO(json.dumps(doc).encode("utf-8"))
+
+
+class TestIterArray:
+    """Tests for iter_array()."""
+
+    @pytest.mark.parametrize("chunk_size", [1, 7, 64, 65536])
+    def test_elements_and_header(self, mock_aircraft_data, chunk_size):
+        """Test that every chunk size gives the same elements and header."""
+        header = {}
+        elements = list(
+            jsonstream.iter_array(
+                stream_of(mock_aircraft_data), "aircraft", header, chunk_size
+            )
+        )
+
+        assert elements == mock_aircraft_data["aircraft"]
+        assert header == {"now": 1706360400.0, "messages": 12345678}
+
+    def test_numbers_split_across_chunks(self):
+        """Test that a number cut by a chunk boundary is read in full."""
+        doc = b'{"now": 1706360400.125, "aircraft": [12345, 67890]}'
+        header = {}
+        elements = list(jsonstream.iter_array(io.BytesIO(doc), "aircraft", header, 3))
+
+        assert elements == [12345, 67890]
+        assert header["now"] == 1706360400.125
+
+    def test_multibyte_characters_split_across_chunks(self):
+        """Test that UTF-8 sequences cut by a chunk boundary are decoded."""
+        doc = {"aircraft": [{"flight": "ÆØÅ✈"}]}
+        elements = list(jsonstream.iter_array(stream_of(doc), "aircraft", None, 1))
+
+        assert elements == [{"flight": "ÆØÅ✈"}]
+
+    def test_header_available_at_first_element(self, mock_aircraft_data):
+        """Test that members before the array are known when it starts."""
+        header = {}
+        elements = jsonstream.iter_array(
+            stream_of(mock_aircraft_data), "aircraft", header, 16
+        )
+        next(elements)
+
+        assert header["now"] == 1706360400.0
+
+    def test_element_yielded_before_end_of_stream(self):
+        """Test that elements are handed out before the stream is read in full."""
+        doc = b'{"aircraft": [{"hex": "abc123"}, {"hex": "def456"}]}'
+        stream = io.BytesIO(doc)
+        elements = jsonstream.iter_array(stream, "aircraft", None, 8)
+
+        assert next(elements) == {"hex": "abc123"}
+        assert stream.tell() < len(doc)
+
+    def test_empty_array_and_object(self):
+        """Test empty arrays and empty documents."""
+        assert (
+            list(jsonstream.iter_array(io.BytesIO(b'{"aircraft": []}'), "aircraft"))
+            == []
+        )
+        assert list(jsonstream.iter_array(io.BytesIO(b"{}"), "aircraft")) == []
+
+    def test_truncated_document(self):
+        """Test that truncated input raises JSONDecodeError."""
+        doc = b'{"now": 1, "aircraft": [{"hex": "abc123"}, {"hex": "de'
+        elements = jsonstream.iter_array(io.BytesIO(doc), "aircraft")
+
+        assert next(elements) == {"hex": "abc123"}
+        with pytest.raises(json.JSONDecodeError):
+            next(elements)
+
+    def test_invalid_document(self):
+        """Test that input that isn't an object raises JSONDecodeError."""
+        with pytest.raises(json.JSONDecodeError):
+            list(jsonstream.iter_array(io.BytesIO(b"invalid json {"), "aircraft"))
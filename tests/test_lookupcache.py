@@ -0,0 +1,109 @@
+"""
+Tests for lookupcache.py - the cache of the hexdb.io answers.
+
+The clock is a fake one, so the answers expire without waiting.
+"""
+
+import sqlite3
+
+import pytest
+
+import lookupcache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1706360400.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+class TestLookupCache:
+    """Tests for LookupCache."""
+
+    def test_hit_and_miss(self, clock):
+        """Test answers are found by kind and key, and counted."""
+        cache = lookupcache.LookupCache(clock=clock)
+        assert cache.get("regis", "ABC123") is None
+        cache.put("regis", "ABC123", "PH-BXA")
+
+        assert cache.get("regis", "ABC123") == "PH-BXA"
+        assert cache.get("plane", "ABC123") is None
+        assert cache.hits == {"regis": 1}
+        assert cache.misses == {"regis": 1, "plane": 1}
+
+    def test_ttl_by_kind(self, clock):
+        """Test a route expires long before a registration does."""
+        cache = lookupcache.LookupCache(clock=clock, ttls={"oper": 60})
+        cache.put("regis", "ABC123", "PH-BXA")
+        cache.put("route", "KLM1234", "AMS-JFK")
+        cache.put("oper", "ABC123", "KLM")
+
+        clock.now += 61
+        assert cache.get("oper", "ABC123") is None
+        clock.now += 2 * lookupcache.TTLS["route"]
+        assert cache.get("route", "KLM1234") is None
+        assert cache.get("regis", "ABC123") == "PH-BXA"
+
+    def test_unknown_ttl(self, clock):
+        """Test an unknown answer expires first, but not after its kind."""
+        cache = lookupcache.LookupCache(clock=clock, unknown_ttl=60)
+        cache.put("regis", "ABC123", "n/a", unknown=True)
+        cache.put("route", "KLM1234", "n/a", unknown=True)
+        cache.put("plane", "ABC123", "Boeing 737-800")
+        assert cache.get("regis", "ABC123") == "n/a"
+
+        clock.now += 61
+        assert cache.get("regis", "ABC123") is None
+        assert cache.get("route", "KLM1234") is None
+        assert cache.get("plane", "ABC123") == "Boeing 737-800"
+
+    def test_lru(self, clock):
+        """Test the least recently used answers leave memory first."""
+        cache = lookupcache.LookupCache(capacity=2, clock=clock)
+        cache.put("regis", "A", "1")
+        cache.put("regis", "B", "2")
+        cache.get("regis", "A")
+        cache.put("regis", "C", "3")
+
+        assert len(cache) == 2
+        assert cache.get("regis", "B") is None
+        assert cache.get("regis", "A") == "1"
+        assert cache.get("regis", "C") == "3"
+
+    def test_survives_restart(self, clock, tmp_path):
+        """Test the answers are read back from the database after a restart."""
+        path = tmp_path / "hexdb.sqlite"
+        cache = lookupcache.LookupCache(path, clock=clock)
+        cache.put("regis", "ABC123", "PH-BXA")
+        cache.put("route", "KLM1234", "AMS-JFK")
+        cache.close()
+
+        clock.now += 2 * lookupcache.TTLS["route"]
+        cache = lookupcache.LookupCache(path, clock=clock)
+        assert len(cache) == 0
+        assert cache.get("regis", "ABC123") == "PH-BXA"
+        assert cache.disk_hits == {"regis": 1}
+        assert cache.get("regis", "ABC123") == "PH-BXA"
+        assert cache.hits == {"regis": 1}
+        cache.close()
+
+        # Expired answers are removed when the database is opened.
+        with sqlite3.connect(path) as db:
+            assert db.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+            assert db.execute("SELECT kind FROM lookups").fetchall() == [("regis",)]
+
+    def test_memory_evicted_read_from_disk(self, clock, tmp_path):
+        """Test an answer dropped from memory is still on disk."""
+        cache = lookupcache.LookupCache(tmp_path / "hexdb.sqlite", 1, clock=clock)
+        cache.put("regis", "A", "1")
+        cache.put("regis", "B", "2")
+        assert cache.get("regis", "A") == "1"
+        assert cache.disk_hits == {"regis": 1}
+        cache.close()
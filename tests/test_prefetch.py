@@ -0,0 +1,109 @@
+"""
+Tests for prefetch.py - the lookups in the background.
+
+The lookups are fake ones that wait for the test to let them finish.
+"""
+
+import threading
+from unittest.mock import Mock, patch
+
+import pytest
+
+import aircraftdata
+import lookupcache
+import prefetch
+from tests.conftest import make_aircraft
+
+
+class Lookups:
+    """
+    Records the lookups, which finish when release() is called.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.released = threading.Event()
+
+    def __call__(self, hex, flight):
+        self.calls.append((hex, flight))
+        assert self.released.wait(5)
+
+    def release(self):
+        self.released.set()
+
+
+@pytest.fixture
+def lookups():
+    return Lookups()
+
+
+class TestPrefetcher:
+    """Tests for Prefetcher."""
+
+    def test_deduplicated(self, lookups):
+        """Test an aircraft is looked up once, again with a callsign."""
+        prefetcher = prefetch.Prefetcher(lookups)
+        assert prefetcher.submit("abc123", "KLM1234")
+        assert not prefetcher.submit("abc123", "KLM1234")
+        lookups.release()
+        prefetcher.wait("abc123", "KLM1234", 5)
+        assert not prefetcher.submit("abc123", "KLM1234")
+        assert prefetcher.submit("abc123", "KLM1235")
+        prefetcher.wait("abc123", "KLM1235", 5)
+        assert lookups.calls == [("abc123", "KLM1234"), ("abc123", "KLM1235")]
+        assert prefetcher.pending == 0
+
+    def test_bounded(self, lookups):
+        """Test a busy sky can't queue more than max_pending lookups."""
+        prefetcher = prefetch.Prefetcher(lookups, workers=1, max_pending=3)
+        started = [prefetcher.submit(f"{i:06x}", None) for i in range(10)]
+        assert started == [True] * 3 + [False] * 7
+        assert prefetcher.dropped == 7
+        assert prefetcher.pending == 3
+        lookups.release()
+        prefetcher.wait("000002", None, 5)
+        assert prefetcher.pending == 0
+        # The dropped ones are looked up when they are seen again.
+        assert prefetcher.submit("000005", None)
+        prefetcher.close()
+
+    def test_watch(self, lookups):
+        """Test only the aircraft that can reach the zone soon are looked up."""
+        lookups.release()
+        prefetcher = prefetch.Prefetcher(lookups, lead=300)
+        eta = {"abc123": 0, "def456": 120, "789abc": 600}
+        prefetcher.watch(
+            [
+                make_aircraft(dhex="abc123", flight="KLM1234 "),
+                make_aircraft(dhex="def456"),
+                make_aircraft(dhex="789abc", flight="EZY12"),
+            ],
+            lambda a: eta[a.hex],
+        )
+        prefetcher.wait("abc123", "KLM1234", 5)
+        prefetcher.wait("def456", "def456", 5)
+        assert sorted(lookups.calls) == [("abc123", "KLM1234"), ("def456", "def456")]
+
+    def test_failed(self):
+        """Test a failing lookup is counted and not asked again."""
+        prefetcher = prefetch.Prefetcher(Mock(side_effect=OSError("timeout")))
+        prefetcher.submit("abc123", "KLM1234")
+        prefetcher.wait("abc123", "KLM1234", 5)
+        assert prefetcher.failed == 1
+        assert prefetcher.pending == 0
+        assert not prefetcher.submit("abc123", "KLM1234")
+
+    def test_warm_cache(self):
+        """Test the post finds the prefetched answers in the cache."""
+        with (
+            patch("aircraftdata.cache", lookupcache.LookupCache()),
+            patch("aircraftdata.session.get") as mock_get,
+        ):
+            mock_get.return_value = Mock(status_code=200, text="PH-BXA")
+            prefetcher = prefetch.Prefetcher()
+            prefetcher.submit("abc123", "KLM1234")
+            prefetcher.wait("abc123", "KLM1234", 5)
+            assert mock_get.call_count == 3 + 6
+
+            aircraftdata.lookup_all("abc123", "KLM1234")
+            assert mock_get.call_count == 3 + 6
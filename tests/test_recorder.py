@@ -0,0 +1,208 @@
+"""
+Tests for recorder.py - recording the flight data and replaying it.
+"""
+
+import gzip
+import io
+import json
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import alarmzone
+import datasource
+import flightdata
+import recorder
+import scheduler
+from tests.conftest import RECEIVER
+
+DATA = Path(__file__).parent / "data"
+
+
+def snapshot(now, *hexes):
+    aircraft = [{"hex": h, "messages": int(now), "seen": 0.1} for h in hexes]
+    return json.dumps({"now": now, "aircraft": aircraft}).encode()
+
+
+@pytest.fixture
+def log(tmp_path):
+    """A log of four snapshots, one second apart."""
+    path = tmp_path / "flightdata.log.gz"
+    rec = recorder.Recorder(path)
+    rec.write(snapshot(1000, "abc123"), when=1000.0)
+    rec.write(snapshot(1001, "abc123", "def456"), when=1001.0)
+    rec.write(snapshot(1002, "def456"), when=1002.0)
+    rec.write(snapshot(1003), when=1003.0)
+    rec.close()
+    return path
+
+
+class TestRecorder:
+    """Tests for writing and reading the log."""
+
+    def test_round_trip(self, log):
+        """Test the frames are read back as written."""
+        frames = list(recorder.read_frames(log))
+        assert [when for when, _ in frames] == [1000.0, 1001.0, 1002.0, 1003.0]
+        assert frames[1][1] == snapshot(1001, "abc123", "def456")
+
+    def test_append(self, log):
+        """Test recording again adds to the log."""
+        rec = recorder.Recorder(log)
+        rec.write(snapshot(1004, "abc123"), when=1004.0)
+        rec.close()
+        assert len(list(recorder.read_frames(log))) == 5
+
+    def test_cut_short(self, log, tmp_path):
+        """Test a log without its end is read up to the last complete frame."""
+        path = tmp_path / "short.log.gz"
+        rec = recorder.Recorder(path)
+        for when, data in recorder.read_frames(log):
+            rec.write(data, when=when)
+        # Not closed, like after a crash: the gzip trailer is missing.
+        path.write_bytes(path.read_bytes()[:-5])
+
+        frames = list(recorder.read_frames(path))
+        assert 0 < len(frames) <= 4
+        assert frames[0][0] == 1000.0
+
+    def test_flightdata_records(self, tmp_path):
+        """Test FlightData writes every fetched snapshot to the recorder."""
+        raw = (DATA / "aircraft.json").read_bytes()
+        fetcher = MagicMock()
+        fetcher.fetch.return_value = raw
+        rec = recorder.Recorder(tmp_path / "rec.log.gz")
+        fd = flightdata.FlightData(
+            parser=flightdata.Dump1090DataParser(), fetcher=fetcher, recorder=rec
+        )
+        fd.refresh()
+        rec.close()
+
+        assert rec.frames == 2
+        assert [data for _, data in recorder.read_frames(rec.path)] == [raw, raw]
+
+    def test_flightdata_stream_records(self, tmp_path):
+        """Test streaming mode records what it read, only complete refreshes."""
+        raw = (DATA / "aircraft.json").read_bytes()
+        fetcher = MagicMock()
+        fetcher.open.side_effect = lambda: io.BytesIO(raw)
+        rec = recorder.Recorder(tmp_path / "rec.log.gz")
+        fd = flightdata.FlightData(
+            parser=flightdata.Dump1090DataParser(),
+            fetcher=fetcher,
+            stream=True,
+            recorder=rec,
+        )
+        fetcher.open.side_effect = lambda: io.BytesIO(raw[: len(raw) // 2])
+        fd.refresh()
+        rec.close()
+
+        assert fd.aircraft == []
+        assert [data for _, data in recorder.read_frames(rec.path)] == [raw]
+
+    def test_is_gzip(self, log):
+        """Test the log is plain gzip."""
+        with gzip.open(log) as f:
+            assert len(f.read()) > 0
+
+
+class TestReplay:
+    """Tests for feeding a log back through FlightData."""
+
+    def test_as_fast_as_possible(self, log):
+        """Test speed 0 gives the next snapshot every refresh, then finishes."""
+        fd = recorder.ReplayFlightData(
+            str(log), flightdata.Dump1090DataParser(), speed=0
+        )
+        assert fd.time == datetime.fromtimestamp(1000)
+        assert [a.hex for a in fd.delta.entered] == ["ABC123"]
+
+        fd.refresh()
+        assert [a.hex for a in fd.delta.entered] == ["DEF456"]
+        fd.refresh()
+        assert [a.hex for a in fd.delta.left] == ["ABC123"]
+        fd.refresh()
+        assert fd.aircraft == []
+        assert not fd.finished
+
+        fd.refresh()
+        assert fd.finished
+        assert not fd.delta
+
+    def test_paced(self, log):
+        """Test the snapshots follow the clock, without skipping any."""
+        clock = MagicMock(return_value=50.0)
+        with patch("recorder.time.monotonic", clock):
+            fd = recorder.ReplayFlightData(
+                f"file://{log}", flightdata.Dump1090DataParser(), speed=10
+            )
+            assert fd.time == datetime.fromtimestamp(1000)
+
+            clock.return_value = 50.05  # half a recorded second later
+            fd.refresh()
+            assert fd.time == datetime.fromtimestamp(1000)
+            assert fd.parses_skipped == 1
+
+            clock.return_value = 50.25  # 2.5 recorded seconds later
+            fd.refresh()
+            assert fd.time == datetime.fromtimestamp(1001)
+            fd.refresh()
+            assert fd.time == datetime.fromtimestamp(1002)
+            fd.refresh()
+            assert fd.time == datetime.fromtimestamp(1002)
+            assert fd.parses_skipped == 2
+
+    def test_crossing_at_speed(self, at_receiver, tmp_path):
+        """Test a short zone crossing is seen when replayed 60 times as fast."""
+        # 40 snapshots a second apart of an aircraft flying north over the
+        # receiver, 3.5 miles a second: only the one at 20 s is in the zone.
+        path = tmp_path / "crossing.log.gz"
+        rec = recorder.Recorder(path)
+        for i in range(40):
+            a = {
+                "hex": "abc123",
+                "lat": RECEIVER[0] + (i - 20) * 0.05,
+                "lon": RECEIVER[1],
+                "alt_baro": 1000,
+                "messages": i,
+            }
+            document = {"now": 1000 + i, "aircraft": [a]}
+            rec.write(json.dumps(document).encode(), when=1000.0 + i)
+        rec.close()
+
+        zone = alarmzone.AlarmZone(*RECEIVER, 2, 75)
+        polls = scheduler.PollScheduler(zone, 1, 1, speed=60)
+        fd = recorder.ReplayFlightData(
+            str(path), flightdata.Dump1090DataParser(), speed=60
+        )
+        seen = []
+        while not fd.finished:
+            polls.sleep()
+            fd.refresh()
+            seen += [fd.time.timestamp() for a in fd.aircraft if zone.contains(a)]
+        assert seen == [1020]
+
+    def test_get_data_source(self, log):
+        """Test the replay driver uses the parser of replay_driver."""
+        with (
+            patch("datasource.g_driver", "replay"),
+            patch("datasource.g_data_url", str(log)),
+            patch("datasource.g_replay_driver", "dump1090"),
+            patch("datasource.g_replay_speed", 0),
+        ):
+            fd = datasource.get_data_source()
+
+        assert isinstance(fd, recorder.ReplayFlightData)
+        assert isinstance(fd.parser, flightdata.Dump1090DataParser)
+        assert [a.hex for a in fd.aircraft] == ["ABC123"]
+
+    def test_sbs_not_recorded(self, tmp_path):
+        """Test recording the sbs driver is refused instead of logging nothing."""
+        with (
+            patch("datasource.g_driver", "sbs"),
+            patch("datasource.g_record", str(tmp_path / "rec.log.gz")),
+            pytest.raises(datasource.Error),
+        ):
+            datasource.get_data_source()
@@ -0,0 +1,160 @@
+"""
+Tests for sbs.py - the SBS-1 (BaseStation) push data source.
+
+Replays recorded messages from tests/data/sbs_sample.txt over a local socket.
+"""
+
+import socket
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+import sbs
+
+SAMPLE = Path(__file__).parent / "data" / "sbs_sample.txt"
+
+
+@pytest.fixture
+def sbs_server():
+    """
+    A local SBS port that sends the recorded messages to the first client,
+    in two parts to exercise lines split across reads.
+    """
+    server = socket.create_server(("127.0.0.1", 0))
+    data = SAMPLE.read_bytes()
+
+    def serve():
+        conn, _ = server.accept()
+        with conn:
+            conn.sendall(data[:100])
+            time.sleep(0.05)
+            conn.sendall(data[100:])
+            time.sleep(2)
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    yield "tcp://127.0.0.1:{}".format(server.getsockname()[1])
+    server.close()
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+class TestApplyMessage:
+    """Tests for apply_message()."""
+
+    def test_builds_aircraft_state(self):
+        """Test that messages of different types end up in one state."""
+        table = {}
+        for line in SAMPLE.read_text().splitlines()[:4]:
+            assert sbs.apply_message(table, line, 100.0)
+
+        state = table["4840d6"]
+        assert state["flight"] == "KLM1234"
+        assert state["alt_baro"] == 15000
+        assert (state["lat"], state["lon"]) == (53.3, 6.6)
+        assert (state["gs"], state["track"], state["vert_rate"]) == (350, 270, -1024)
+        assert state["squawk"] == "7000"
+        assert state["messages"] == 4
+        assert state["last_pos"] == 100.0
+
+    def test_ignores_other_lines(self):
+        """Test that non-MSG and broken lines are skipped."""
+        table = {}
+        assert not sbs.apply_message(table, "STA,,1,1,400AE7,1,,,,,RM", 100.0)
+        assert not sbs.apply_message(table, "garbage", 100.0)
+        assert table == {}
+
+    def test_on_ground(self):
+        """Test the on-the-ground flag."""
+        table = {}
+        sbs.apply_message(table, SAMPLE.read_text().splitlines()[-1], 100.0)
+        assert table["3c6586"]["alt_baro"] == "ground"
+
+    def test_snapshot_seen(self):
+        """Test that the snapshot has seen / seen_pos and no internal keys."""
+        table = {}
+        lines = SAMPLE.read_text().splitlines()
+        sbs.apply_message(table, lines[1], 100.0)
+        sbs.apply_message(table, lines[2], 101.0)
+
+        a = sbs.snapshot(table["4840d6"], 103.0)
+        assert a["seen"] == 2.0
+        assert a["seen_pos"] == 3.0
+        assert "last_msg" not in a
+
+
+class TestSBSFlightData:
+    """Tests for SBSFlightData against a local socket."""
+
+    def test_replayed_feed(self, at_receiver, sbs_server):
+        """Test that the replayed messages show up as aircraft."""
+        fd = sbs.SBSFlightData(data_url=sbs_server, parser=sbs.SBSDataParser())
+        try:
+            wait_for(lambda: fd.messages == 10)
+            fd.refresh()
+        finally:
+            fd.close()
+
+        aircraft = {a.hex: a for a in fd.aircraft}
+        assert set(aircraft) == {"4840D6", "484CB8", "3C6586"}
+        klm = aircraft["4840D6"]
+        assert klm.flight == "KLM1234"
+        assert klm.altitude == 14975
+        assert klm.lon == 6.59
+        assert klm.messages == 5
+        assert 5 < klm.distance < 7
+        assert aircraft["3C6586"].altitude == 0.0
+        assert fd.time is not None
+
+    def test_expired_aircraft_dropped(self, sbs_server):
+        """Test that aircraft without recent messages are removed."""
+        fd = sbs.SBSFlightData(data_url=sbs_server, parser=sbs.SBSDataParser())
+        try:
+            wait_for(lambda: fd.messages == 10)
+            with patch("sbs.time.time", return_value=time.time() + 120):
+                fd.refresh()
+        finally:
+            fd.close()
+
+        assert fd.aircraft == []
+        assert fd.table == {}
+
+    def test_parse_error(self, at_receiver, sbs_server):
+        """Test a refresh that can't be parsed lets all aircraft leave."""
+        parser = sbs.SBSDataParser()
+        fd = sbs.SBSFlightData(data_url=sbs_server, parser=parser)
+        try:
+            wait_for(lambda: fd.messages == 10)
+            fd.refresh()
+            before = {a.hex for a in fd.aircraft}
+            with patch.object(parser, "_parse_aircraft_data", side_effect=KeyError):
+                fd.refresh()
+        finally:
+            fd.close()
+
+        assert fd.aircraft == []
+        assert {a.hex for a in fd.delta.left} == before
+        assert fd.index == {}
+        assert parser.index == {}
+
+    def test_connection_refused(self):
+        """Test that an unreachable feed gives no aircraft instead of failing."""
+        server = socket.create_server(("127.0.0.1", 0))
+        port = server.getsockname()[1]
+        server.close()
+
+        fd = sbs.SBSFlightData(
+            data_url="tcp://127.0.0.1:{}".format(port), parser=sbs.SBSDataParser()
+        )
+        fd.close()
+
+        assert fd.aircraft == []
+        assert not fd.connected.is_set()
@@ -0,0 +1,159 @@
+"""
+Tests for scheduler.py - adaptive polling driven by the aircraft near the zone.
+"""
+
+import math
+
+import pytest
+
+import alarmzone
+import scheduler
+from tests.conftest import RECEIVER, make_aircraft
+
+
+class FakeClock:
+    """A monotonic clock that only moves when slept on or told to."""
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def zone():
+    return alarmzone.AlarmZone(*RECEIVER, 2, 75)
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+class TestTimeToZone:
+    """Tests for the prediction of when an aircraft reaches the zone."""
+
+    def test_approaching(self, zone):
+        """Test 10 miles out at 360 mph, 8 miles from the zone: 80 seconds."""
+        polls = scheduler.PollScheduler(zone, 1, 10)
+        a = make_aircraft(north=10, track=180, speed=360)
+        assert polls.time_to_zone(a) == pytest.approx(80, rel=0.01)
+
+    def test_seen_pos(self, zone):
+        """Test the age of the position is taken off."""
+        polls = scheduler.PollScheduler(zone, 1, 10)
+        a = make_aircraft(north=10, track=180, speed=360, seen_pos=5)
+        assert polls.time_to_zone(a) == pytest.approx(75, rel=0.01)
+
+    def test_flying_away(self, zone):
+        """Test an aircraft flying away never reaches the zone."""
+        polls = scheduler.PollScheduler(zone, 1, 10)
+        assert polls.time_to_zone(make_aircraft(north=10, track=0)) == math.inf
+        assert polls.time_to_zone(make_aircraft(north=10, track=90)) == math.inf
+
+    def test_inside_and_unknown(self, zone):
+        """Test inside is 0, without track or position it's unknown."""
+        polls = scheduler.PollScheduler(zone, 1, 10)
+        assert polls.time_to_zone(make_aircraft(north=1, track=0)) == 0
+        assert polls.time_to_zone(make_aircraft(north=10, track=None)) == math.inf
+        a = make_aircraft(north=10, track=180)
+        a.lat = None
+        assert polls.time_to_zone(a) == math.inf
+
+    def test_reach(self, zone):
+        """Test no aircraft beyond reach(seconds) gets there within seconds."""
+        polls = scheduler.PollScheduler(zone, 1, 10)
+        miles = polls.reach(60)
+        edge = make_aircraft(north=miles, track=180, speed=800, altitude=59000)
+        assert polls.time_to_zone(edge) > 60
+        assert polls.time_to_zone(make_aircraft(north=10, track=180, speed=800)) < 60
+        unbounded = alarmzone.AlarmZone(*RECEIVER, 2, 0)
+        assert scheduler.PollScheduler(unbounded, 1, 10).reach(60) == math.inf
+
+    def test_high_aircraft_reach_further(self, zone):
+        """Test the elevation alarm makes the zone wider for high aircraft."""
+        polls = scheduler.PollScheduler(zone, 1, 10)
+        low = polls.time_to_zone(make_aircraft(north=10, track=180, altitude=3000))
+        high = polls.time_to_zone(make_aircraft(north=10, track=180, altitude=40000))
+        assert high < low
+
+
+class TestPlan:
+    """Tests for choosing the interval."""
+
+    def test_empty_sky(self, zone):
+        """Test no aircraft backs off to max_interval."""
+        polls = scheduler.PollScheduler(zone, 1, 10)
+        assert polls.plan([]) == 10
+        assert polls.plan([make_aircraft(north=10, track=0)]) == 10
+
+    def test_approaching(self, zone):
+        """Test the soonest aircraft sets the interval."""
+        polls = scheduler.PollScheduler(zone, 1, 30)
+        far = make_aircraft(north=50, track=180)
+        near = make_aircraft(north=10, track=180, speed=360)
+        assert polls.plan([far, near]) == pytest.approx(
+            80 / scheduler.POLLS_AHEAD, 0.01
+        )
+        assert polls.plan([make_aircraft(north=2.2, track=180)]) == 1
+
+    def test_inside(self, zone):
+        """Test an aircraft in the alarm zone polls at min_interval."""
+        polls = scheduler.PollScheduler(zone, 1, 10)
+        a = make_aircraft(north=50, track=0)
+        assert polls.plan([a], {a.hex: a}) == 1
+
+    def test_pending_alarm(self, zone):
+        """Test an alarm counting down to its post keeps min_interval."""
+        polls = scheduler.PollScheduler(zone, 1, 10)
+        gone = make_aircraft(north=50, track=0)
+        assert polls.plan([gone], {}, {gone.hex: (gone, 1)}) == 1
+        assert polls.plan([gone], {}, {}) == 10
+
+    def test_fixed(self, zone):
+        """Test equal intervals, like sleep_time alone, always poll the same."""
+        polls = scheduler.PollScheduler(zone, 1, 1)
+        assert polls.plan([]) == 1
+
+
+class TestSleep:
+    """Tests for the monotonic schedule."""
+
+    def test_drift_compensation(self, zone, clock):
+        """Test the time the refresh takes is taken off the next sleep."""
+        polls = scheduler.PollScheduler(zone, 1, 1, clock=clock, sleep=clock.sleep)
+        for _ in range(3):
+            polls.sleep()
+            clock.now += 0.25  # the refresh
+        assert clock.sleeps == [1, 0.75, 0.75]
+        assert clock.now == pytest.approx(103.25)
+
+    def test_overrun(self, zone, clock):
+        """Test a refresh that overran restarts the schedule, no burst after."""
+        polls = scheduler.PollScheduler(zone, 1, 1, clock=clock, sleep=clock.sleep)
+        polls.sleep()
+        clock.now += 3.5
+        polls.sleep()
+        polls.sleep()
+        assert clock.sleeps == [1, 1]
+        assert polls.overruns == 1
+
+    def test_replay_speed(self, zone, clock):
+        """Test a replay at 60 times the speed sleeps 60 times shorter."""
+        polls = scheduler.PollScheduler(
+            zone, 1, 10, clock=clock, sleep=clock.sleep, speed=60
+        )
+        polls.interval = 6
+        polls.sleep()
+        polls.sleep()
+        assert clock.sleeps == pytest.approx([0.1, 0.1])
+
+        polls.speed = 0  # as fast as possible
+        polls.sleep()
+        assert clock.sleeps[-1] == 0
@@ -4,9 +4,16 @@ Tests for tracker.py - main tracking loop and Bluesky posting.
 Uses mocked dependencies to avoid actual API calls and browser automation.
 """
 
+import math
+import random
 from unittest.mock import patch, MagicMock, mock_open
+import alarmzone
+import cpa
+import gridindex
+import scheduler
 import tracker
 import flightdata
+from tests.conftest import RECEIVER, make_aircraft
 
 
 class TestPostAircraftUpdate:
@@ -118,6 +125,42 @@ class TestPostAircraftUpdate:
             # Check that text doesn't exceed 300 characters
             assert len(text) <= 300
 
+    def test_dry_run(self, sample_datetime, mock_config, capsys):
+        """Test a dry run only prints the post."""
+        aircraft = flightdata.AircraftData(
+            dhex="abc123",
+            squawk="7000",
+            flight="KLM1234",
+            registration="PH-BXA",
+            lat=53.3,
+            lon=6.6,
+            altitude=3000,
+            vert_rate=0,
+            track=270,
+            speed=200,
+            messages=150,
+            seen=0.5,
+            mlat=False,
+            nucp=7,
+            seen_pos=1.0,
+            rssi=-25.5,
+            dist=1.5,
+            az=180,
+            el=45,
+            time=sample_datetime,
+        )
+
+        with (
+            patch("tracker.parser", mock_config),
+            patch("tracker.aboveme_dry_run", True),
+            patch("tracker.aircraftdata.lookup_all", return_value={}),
+            patch("tracker.Client") as mock_client_class,
+        ):
+            tracker.post_aircraft_update(aircraft, havescreenshot=False)
+
+        mock_client_class.assert_not_called()
+        assert "KLM1234" in capsys.readouterr().out
+
 
 class TestTemplateSubstitution:
     """Tests for template variable substitution."""
@@ -216,3 +259,138 @@ class TestImageAspectRatio:
 
             # Verify AspectRatio was called with patched values
             mock_aspect.assert_called_once_with(height=800, width=780)
+
+
+class TestUpdateInside:
+    """Tests for update_inside(), the alarm zone bookkeeping per refresh."""
+
+    def test_follows_delta(self, at_receiver, sample_datetime):
+        """Test aircraft are added, moved out and dropped by the delta."""
+        parser = flightdata.Dump1090DataParser()
+        fd = MagicMock()
+        zone = alarmzone.AlarmZone(*RECEIVER, 2, 75)
+        inside = {}
+        near = {"hex": "abc123", "lat": 53.22, "lon": 6.57, "track": 90}
+        far = {"hex": "def456", "lat": 53.5, "lon": 6.57, "track": 90}
+
+        def refresh(*aircraft):
+            parser.aircraft_data({"aircraft": list(aircraft)}, sample_datetime)
+            fd.delta = parser.delta
+            fd.index = parser.index
+            tracker.update_inside(inside, fd, zone)
+
+        refresh(dict(near, messages=1), dict(far, messages=1))
+        assert list(inside) == ["ABC123"]
+
+        # No new messages: stays inside without being looked at.
+        refresh(dict(near, messages=1), dict(far, messages=1))
+        assert list(inside) == ["ABC123"]
+
+        refresh(dict(near, messages=2, lat=53.4), dict(far, messages=2, lat=53.22))
+        assert list(inside) == ["DEF456"]
+
+        refresh()
+        assert inside == {}
+
+
+class TestUpdateZones:
+    """Tests for update_zones(), the bookkeeping of every alarm zone."""
+
+    def test_each_zone(self, at_receiver, sample_datetime):
+        """Test aircraft are kept per zone, and move between zones."""
+        parser = flightdata.Dump1090DataParser()
+        fd = MagicMock()
+        zones = alarmzone.ZoneSet(
+            [
+                alarmzone.AlarmZone(*RECEIVER, 2, 75),
+                alarmzone.PolygonZone(
+                    "triangle",
+                    *RECEIVER,
+                    [(53.25, 6.60), (53.30, 6.60), (53.25, 6.70)],
+                ),
+            ]
+        )
+        inside = {z.name: {} for z in zones}
+        near = {"hex": "abc123", "lat": 53.22, "lon": 6.57, "track": 90}
+
+        def refresh(*aircraft):
+            parser.aircraft_data({"aircraft": list(aircraft)}, sample_datetime)
+            fd.delta = parser.delta
+            fd.index = parser.index
+            tracker.update_zones(inside, fd, zones)
+
+        refresh(dict(near, messages=1))
+        assert {name: list(m) for name, m in inside.items()} == {
+            "aboveme": ["ABC123"],
+            "triangle": [],
+        }
+
+        refresh(dict(near, messages=2, lat=53.26, lon=6.62))
+        assert {name: list(m) for name, m in inside.items()} == {
+            "aboveme": [],
+            "triangle": ["ABC123"],
+        }
+
+        refresh()
+        assert inside == {"aboveme": {}, "triangle": {}}
+
+
+class TestPassedClosest:
+    """Tests for passed_closest(), posting right after the closest approach."""
+
+    def test_only_aboveme(self):
+        """Test only the zone around the receiver posts after the approach."""
+        zone = alarmzone.AlarmZone(*RECEIVER, 2, 75)
+        polygon = alarmzone.PolygonZone(
+            "triangle", *RECEIVER, [(53.25, 6.60), (53.30, 6.60), (53.25, 6.70)]
+        )
+        passed = cpa.predict_one(make_aircraft(north=-1, track=180), zone)
+        coming = cpa.predict_one(make_aircraft(north=1, track=180), zone)
+
+        with patch("tracker.aboveme_post_after_cpa", True):
+            assert tracker.passed_closest(zone, passed)
+            assert not tracker.passed_closest(zone, coming)
+            assert not tracker.passed_closest(zone, None)
+            assert not tracker.passed_closest(polygon, passed)
+        with patch("tracker.aboveme_post_after_cpa", False):
+            assert not tracker.passed_closest(zone, passed)
+
+
+class TestNearby:
+    """Tests for nearby(), the aircraft the scheduler and prefetches look at."""
+
+    def test_same_plan(self, at_receiver, sample_datetime):
+        """Test the grid gives the same interval as all aircraft."""
+        rnd = random.Random(3)
+        parser = flightdata.Dump1090DataParser()
+        feed = [
+            {
+                "hex": f"{i:06x}",
+                "lat": RECEIVER[0] + rnd.uniform(-3, 3),
+                "lon": RECEIVER[1] + rnd.uniform(-5, 5),
+                "altitude": rnd.uniform(0, 40000),
+                "track": rnd.uniform(0, 360),
+                "speed": rnd.uniform(100, 600),
+                "messages": 1,
+            }
+            for i in range(2000)
+        ]
+        aircraft = parser.aircraft_data({"aircraft": feed}, sample_datetime)
+        fd = MagicMock(delta=parser.delta, index=parser.index, aircraft=aircraft)
+        zones = alarmzone.ZoneSet([alarmzone.AlarmZone(*RECEIVER, 2, 75)])
+        grid = gridindex.GridIndex()
+        grid.update(fd)
+        polls = scheduler.PollScheduler(zones, 1, 60)
+
+        near = tracker.nearby(grid, zones, polls.reach(polls.horizon()), aircraft)
+
+        assert len(near) < len(aircraft) / 4
+        assert polls.plan(near) == polls.plan(aircraft) < 60
+        soon = {a.hex for a in aircraft if polls.time_to_zone(a) <= 300}
+        near = tracker.nearby(grid, zones, polls.reach(300), aircraft)
+        assert soon <= {a.hex for a in near}
+
+    def test_unbounded(self):
+        """Test all aircraft when the zone has no bounds."""
+        aircraft = [object()]
+        assert tracker.nearby(None, None, math.inf, aircraft) is aircraft
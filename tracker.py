@@ -4,18 +4,27 @@
 # kevinabrandon@gmail.com
 #
 
+import math
 import os
 import sys
 import traceback
 import time
-from time import sleep
 from configparser import ConfigParser
 from string import Template
 from atproto import Client, models
 
+import alarmzone
 import datasource
+import flightdata
 import geomath
+import gridindex
 import aircraftdata
+import aircraftdb
+import circuitbreaker
+import cpa
+import lookupcache
+import prefetch
+import scheduler
 
 # Read the configuration file for this application.
 parser = ConfigParser()
@@ -34,6 +43,58 @@ aboveme_wait_x_updates = int(
 aboveme_sleep_time = float(
     parser.get("aboveme", "sleep_time")
 )  # Time between each loop.
+# Poll faster when an aircraft is about to reach the alarm zone, slower when
+# there is none nearby.  Both default to sleep_time: a fixed interval.
+aboveme_min_sleep_time = parser.getfloat(
+    "aboveme", "min_sleep_time", fallback=aboveme_sleep_time
+)
+aboveme_max_sleep_time = parser.getfloat(
+    "aboveme", "max_sleep_time", fallback=aboveme_sleep_time
+)
+# Post as soon as an aircraft has passed its predicted closest approach,
+# instead of wait_x_updates updates after it has left the alarm zone.
+aboveme_post_after_cpa = parser.getboolean("aboveme", "post_after_cpa", fallback=False)
+# Only print what would be posted: no browser, screenshots or posts to
+# Bluesky.  On by default when replaying a log.
+aboveme_dry_run = parser.getboolean(
+    "aboveme", "dry_run", fallback=datasource.g_driver == "replay"
+)
+receiver_latitude = float(parser.get("receiver", "latitude"))
+receiver_longitude = float(parser.get("receiver", "longitude"))
+# Cache of the hexdb.io answers, see lookupcache.py.  The time to live of each
+# kind of answer (ttl_regis, ttl_plane, ttl_oper, ttl_route) and of the "n/a"
+# answers (ttl_unknown) is in hours.
+hexdb_cache = parser.get("hexdb", "cache", fallback=None)
+hexdb_cache_size = parser.getint("hexdb", "cache_size", fallback=lookupcache.CAPACITY)
+hexdb_ttls = {
+    kind: parser.getfloat("hexdb", f"ttl_{kind}") * lookupcache.HOUR
+    for kind in lookupcache.TTLS
+    if parser.has_option("hexdb", f"ttl_{kind}")
+}
+hexdb_unknown_ttl = (
+    parser.getfloat(
+        "hexdb", "ttl_unknown", fallback=lookupcache.UNKNOWN_TTL / lookupcache.HOUR
+    )
+    * lookupcache.HOUR
+)
+
+# After breaker_failures failed requests in a row hexdb.io is not asked until
+# it answers again, which is tried every breaker_interval seconds.
+hexdb_breaker_failures = parser.getint(
+    "hexdb", "breaker_failures", fallback=circuitbreaker.FAILURES
+)
+hexdb_breaker_interval = parser.getfloat(
+    "hexdb", "breaker_interval", fallback=circuitbreaker.INTERVAL
+)
+
+# Offline aircraft database built by aircraftdb.py, asked before hexdb.io.
+hexdb_database = parser.get("hexdb", "database", fallback=None)
+
+# Look up the aircraft that can reach the alarm zone within prefetch_lead
+# seconds in the background, see prefetch.py.
+hexdb_prefetch = parser.getboolean("hexdb", "prefetch", fallback=False)
+hexdb_prefetch_lead = parser.getfloat("hexdb", "prefetch_lead", fallback=prefetch.LEAD)
+prefetcher = None
 
 bsky_handle = os.getenv("BSKY_HANDLE")
 bsky_password = os.getenv("BSKY_PASSWORD")
@@ -47,25 +108,24 @@ crop_height = parser.getint("crop", "crop_height")
 
 # Given an aircraft 'a' post / skeet.
 # If we have a screenshot, upload it with the post.
-def post_aircraft_update(a, havescreenshot):
+def post_aircraft_update(a, havescreenshot, zone="aboveme"):
     """
     Post an aircraft update to Bluesky.
 
     Args:
         a: The aircraft object with flight data.
         havescreenshot: True if a screenshot image is available.
+        zone: Name of the alarm zone the aircraft was in.
     """
     # compile the template arguments
     templateArgs = dict()
-    flight = a.flight or a.hex
-    flight = flight.replace(" ", "")
+    flight = prefetch.flight_key(a)
     templateArgs["flight"] = flight
     templateArgs["icao"] = a.hex
     templateArgs["icao"] = templateArgs["icao"].replace(" ", "")
-    templateArgs["regis"] = aircraftdata.regis(a.hex)
-    templateArgs["plane"] = aircraftdata.plane(a.hex)
-    templateArgs["oper"] = aircraftdata.oper(a.hex)
-    templateArgs["route"] = aircraftdata.route(flight)
+    if prefetcher is not None:
+        prefetcher.wait(a.hex, flight)
+    templateArgs.update(aircraftdata.lookup_all(a.hex, flight))
     templateArgs["dist_mi"] = "%.1f" % a.distance
     templateArgs["dist_km"] = "%.1f" % geomath.mi2km(a.distance)
     templateArgs["dist_nm"] = "%.1f" % geomath.mi2nm(a.distance)
@@ -82,6 +142,7 @@ def post_aircraft_update(a, havescreenshot):
     templateArgs["vert_rate_ftpm"] = a.vert_rate
     templateArgs["vert_rate_mpm"] = "%.1f" % geomath.ft2m(a.vert_rate)
     templateArgs["rssi"] = a.rssi
+    templateArgs["zone"] = zone
 
     tweet = Template(parser.get("tweet", "tweet_template")).substitute(templateArgs)
     # conditional hashtags:
@@ -124,6 +185,9 @@ def post_aircraft_update(a, havescreenshot):
                 hashtags.append(hash_with_space)
 
     print(tweet)
+    if aboveme_dry_run:
+        print("Dry run, not posted")
+        return
 
     # Send to Bluesky
     # Reference: https://github.com/MarshalX/atproto/blob/main/examples/send_image.py
@@ -182,46 +246,188 @@ def post_aircraft_update(a, havescreenshot):
     )
 
 
+def in_alarm_zone(a, zone):
+    """
+    Returns True if aircraft a is inside the alarm zone.
+    """
+    # if they don't have lat/lon or a heading skip them
+    if a.lat is None or a.lon is None or a.track is None:
+        return False
+    return zone.contains(a)
+
+
+def update_inside(inside, fd, zone):
+    """
+    Updates inside, the aircraft in the alarm zone by hex, with what changed
+    in the last refresh of fd.  Aircraft without new data keep their place.
+    """
+    for a in fd.delta.left:
+        inside.pop(a.hex, None)
+    for a in fd.delta.entered:
+        if in_alarm_zone(a, zone):
+            inside[a.hex] = a
+    for h in fd.delta.changed:
+        a = fd.index[h]
+        if in_alarm_zone(a, zone):
+            inside[h] = a
+        else:
+            inside.pop(h, None)
+
+
+def update_zones(inside, fd, zones):
+    """
+    update_inside() for every zone of the alarmzone.ZoneSet zones, inside is
+    {zone name: {hex: aircraft}}.  An aircraft is only tested against the
+    zones around it.
+    """
+    for a in fd.delta.left:
+        for members in inside.values():
+            members.pop(a.hex, None)
+    changed = [fd.index[h] for h in fd.delta.changed]
+    for a in fd.delta.entered + changed:
+        now = ()
+        if a.lat is not None and a.lon is not None and a.track is not None:
+            now = {z.name for z in zones.containing(a)}
+        for name, members in inside.items():
+            if name in now:
+                members[a.hex] = a
+            else:
+                members.pop(a.hex, None)
+
+
+def passed_closest(zone, approach):
+    """
+    True if post_after_cpa is set and the aircraft passed its closest approach
+    to the receiver.  Only for the AlarmZone around the receiver: the approach
+    says nothing about when an aircraft leaves a polygon or corridor zone.
+    """
+    return (
+        aboveme_post_after_cpa
+        and isinstance(zone, alarmzone.AlarmZone)
+        and approach is not None
+        and approach.time < 0
+    )
+
+
+def nearby(grid, zones, miles, aircraft):
+    """
+    Returns the aircraft within miles of the receiver from the
+    gridindex.GridIndex grid, or all aircraft when miles is unbounded.
+    """
+    if math.isinf(miles):
+        return aircraft
+    return [a for _, a in grid.radius(zones.lat, zones.lon, miles)]
+
+
 if __name__ == "__main__":
     lastReloadTime = time.time()
-    display = datasource.get_map_source()
-    alarms = dict()  # dictonary of all aircraft that have triggered the alarm
+    display = None if aboveme_dry_run else datasource.get_map_source()
+    if hexdb_database:
+        aircraftdata.db = aircraftdb.AircraftDB(hexdb_database)
+    if hexdb_cache or hexdb_prefetch:
+        aircraftdata.cache = lookupcache.LookupCache(
+            hexdb_cache, hexdb_cache_size, hexdb_ttls, unknown_ttl=hexdb_unknown_ttl
+        )
+    aircraftdata.breaker.failures = hexdb_breaker_failures
+    aircraftdata.breaker.interval = hexdb_breaker_interval
+    if hexdb_prefetch:
+        prefetcher = prefetch.Prefetcher(lead=hexdb_prefetch_lead)
+
+    # Compile the alarm zones once, the parser uses them to skip locating
+    # aircraft that are far away.  The [aboveme] zone around the receiver comes
+    # first, then those of the [zone:<name>] sections.
+    zones = alarmzone.ZoneSet(
+        [
+            alarmzone.AlarmZone(
+                receiver_latitude,
+                receiver_longitude,
+                aboveme_distance_alarm,
+                aboveme_elevation_alarm,
+                true_elevation=flightdata.receiver_geometry == "ecef",
+            ),
+            *alarmzone.zones_from_config(parser, receiver_latitude, receiver_longitude),
+        ]
+    )
+    # Each zone has its own bookkeeping, by zone name:
+    alarms = {z.name: dict() for z in zones}
+    # dictonaries of all aircraft that have triggered the alarm
     # Indexed by it's hex code, each entry contains a tuple of
     # the aircraft data at the closest position so far, and a
     # counter.  Once the airplane is out of the alarm zone,
     # the counter is incremented until we hit [aboveme_wait_x_updates]
     # (defined above), at which point we then Tweet
+    inside = {z.name: dict() for z in zones}  # aircraft inside the zone, by hex
+    posted = {z.name: set() for z in zones}  # posted after CPA, but still inside
 
-    fd = datasource.get_data_source()
+    fd = datasource.get_data_source(zones)
     lastTime = fd.time
+    update_zones(inside, fd, zones)
+    # A replay runs replay_speed times as fast as the recording.
+    polls = scheduler.PollScheduler(
+        zones,
+        aboveme_min_sleep_time,
+        aboveme_max_sleep_time,
+        speed=datasource.g_replay_speed if datasource.g_driver == "replay" else 1,
+    )
+    # The aircraft by position, so the scheduler and the prefetches only look
+    # at those that can reach the zone soon.
+    grid = gridindex.GridIndex()
+    grid.update(fd)
+    polls.plan(
+        nearby(grid, zones, polls.reach(polls.horizon()), fd.aircraft),
+        any(inside.values()),
+        any(alarms.values()),
+    )
 
     while True:
-        if time.time() > lastReloadTime + 3600 and len(alarms) == 0:
+        if (
+            display is not None
+            and time.time() > lastReloadTime + 3600
+            and not any(alarms.values())
+        ):
             print("One hour since last browser reload... reloading now")
             display.reload()
             lastReloadTime = time.time()
 
-        sleep(aboveme_sleep_time)
+        polls.sleep()
         fd.refresh()
+        if getattr(fd, "finished", False):
+            print("End of the replayed flight data")
+            break
+        # Only the aircraft that entered, left or changed are looked at again.
+        update_zones(inside, fd, zones)
+        grid.update(fd)
+        polls.plan(
+            nearby(grid, zones, polls.reach(polls.horizon()), fd.aircraft),
+            any(inside.values()),
+            any(alarms.values()),
+        )
+        if prefetcher is not None:
+            prefetcher.watch(
+                nearby(grid, zones, polls.reach(prefetcher.lead), fd.aircraft),
+                polls.time_to_zone,
+            )
         if fd.time == lastTime:
             continue
         lastTime = fd.time
 
         print("Now: {}".format(fd.time))
 
-        current = dict()  # current aircraft inside alarm zone
-
-        # loop on all the aircarft in the receiver
-        for a in fd.aircraft:
-            # if they don't have lat/lon or a heading skip them
-            if a.lat is None or a.lon is None or a.track is None:
-                continue
-            # check to see if it's in the alarm zone:
-            if a.distance < aboveme_distance_alarm or a.el > aboveme_elevation_alarm:
-                # add it to the current dictionary
-                current[a.hex] = a
+        # When and where every aircraft will be closest to the receiver.
+        approaches = cpa.predict(fd.aircraft, zones)
+
+        for zone in zones:
+            zone_inside = inside[zone.name]
+            zone_alarms = alarms[zone.name]
+            zone_posted = posted[zone.name]
+            zone_posted.intersection_update(zone_inside)
+            prefix = "" if len(zones) == 1 else "[{}] ".format(zone.name)
+
+            # loop on the aircraft inside the alarm zone
+            for a in zone_inside.values():
                 print(
-                    "{}: {}mi, {}az, {}el, {}alt, {}dB, {}seen".format(
+                    "{}{}: {}mi, {}az, {}el, {}alt, {}dB, {}seen".format(
+                        prefix,
                         a.ident_desc(),
                         "%.1f" % a.distance,
                         "%.1f" % a.az,
@@ -231,56 +437,70 @@ if __name__ == "__main__":
                         "%.1f" % (a.seen or 0),
                     )
                 )
-                if a.hex in alarms:
+                approach = approaches.get(a.hex)
+                if approach is not None and approach.time > 0:
+                    print(
+                        "  closest in {}s: {}mi, {}el".format(
+                            "%.0f" % approach.time,
+                            "%.1f" % approach.distance,
+                            "%.1f" % approach.elevation,
+                        )
+                    )
+                if a.hex in zone_posted:
+                    continue
+                # The aircraft objects are updated in place on the next refresh,
+                # so the alarms keep a copy of the closest position.
+                if a.hex in zone_alarms:
                     # if it's already in the alarms dict, check to see if we're closer
-                    if a.distance < alarms[a.hex][0].distance:
+                    if a.distance < zone_alarms[a.hex][0].distance:
                         # if we're closer than the one already there, then overwrite it
-                        alarms[a.hex] = (a, 0)
+                        zone_alarms[a.hex] = (a.copy(), 0)
                 else:
                     # add it to the alarms
-                    alarms[a.hex] = (a, 0)
-
-        finishedalarms = []
-        # loop on all the aircraft in the alarms dict
-        for h, a in alarms.items():
-            found = False
-            # check to see if it's in the current set of aircraft
-            for h2, a2 in current.items():
-                if h2 == h:
+                    zone_alarms[a.hex] = (a.copy(), 0)
+
+            finishedalarms = []
+            # loop on all the aircraft in the alarms dict
+            for h, a in zone_alarms.items():
+                passed = passed_closest(zone, approaches.get(h))
+                # check to see if it's still in the alarm zone
+                if h in zone_inside and not passed:
                     print(
-                        "{} not yet, dist, elv: {}, {}".format(
-                            h, "%.1f" % a[0].distance, "%.1f" % a[0].el
+                        "{}{} not yet, dist, elv: {}, {}".format(
+                            prefix, h, "%.1f" % a[0].distance, "%.1f" % a[0].el
                         )
                     )
-                    found = True
-                    break
-            # if it wasn't in the current set of aircraft, that means it's time to post!
-            if not found:
-                if a[1] < aboveme_wait_x_updates:
-                    alarms[h] = (a[0], a[1] + 1)
+                # if it isn't in the alarm zone anymore, that means it's time to post!
                 else:
-                    havescreenshot = False
-                    if display is not None:
-                        print("Time to create screenshot of {}:".format(a[0]))
-                        hexcode = a[0].hex
-                        hexcode = hexcode.replace(" ", "")
-                        hexcode = hexcode.replace("~", "")
-                        havescreenshot = display.clickOnAirplane(hexcode)
+                    if a[1] < aboveme_wait_x_updates and not passed:
+                        zone_alarms[h] = (a[0], a[1] + 1)
                     else:
-                        faInfo = False
-
-                    print("Time to post!")
-
-                    try:
-                        post_aircraft_update(a[0], havescreenshot)
-                    except Exception:
-                        print("Exception in post_aircraft_update():")
-                        traceback.print_exc()
-                    finishedalarms.append(a[0].hex)
-
-        # for each alarm that is finished, delete it from the dictionary
-        for h in finishedalarms:
-            del alarms[h]
+                        havescreenshot = False
+                        if display is not None:
+                            print("Time to create screenshot of {}:".format(a[0]))
+                            hexcode = a[0].hex
+                            hexcode = hexcode.replace(" ", "")
+                            hexcode = hexcode.replace("~", "")
+                            havescreenshot = display.clickOnAirplane(hexcode)
+                        else:
+                            faInfo = False
+
+                        print("Time to post!")
+
+                        try:
+                            post_aircraft_update(a[0], havescreenshot, zone.name)
+                        except Exception:
+                            print("Exception in post_aircraft_update():")
+                            traceback.print_exc()
+                        if aircraftdata.cache is not None:
+                            print(aircraftdata.cache_summary())
+                        finishedalarms.append(a[0].hex)
+                        if h in zone_inside:
+                            zone_posted.add(h)
+
+            # for each alarm that is finished, delete it from the dictionary
+            for h in finishedalarms:
+                del zone_alarms[h]
 
         # flush output for following in log file
         sys.stdout.flush()